@@ -0,0 +1,286 @@
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+
+from deliveries.models import Delivery, DeliveryEvent
+from menu.models import Dish
+from orders.cart_storage import CART_SESSION_KEY
+from orders.models import Order
+from restaurants.models import Restaurant
+
+HOST = "localhost"
+
+
+def _percentile(latencies, q):
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark: requests/s and p99 latency of the hot read views (tracking "
+        "JSON, cart, restaurant list and detail) under concurrent slow queries, "
+        "for the WSGI deployment (sync views, --workers sync workers) and the "
+        "ASGI one (ASYNC_READ_VIEWS, one event loop). Each deployment runs in "
+        "its own process, driving the Django handler in-process. Creates its "
+        "own data and removes it afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--requests", type=int, default=640)
+        parser.add_argument(
+            "--workers", type=int, default=4, help="WSGI sync workers (gunicorn -w)"
+        )
+        parser.add_argument(
+            "--query-delay",
+            type=float,
+            default=0.05,
+            help="seconds added to every SQL query (simulated slow database)",
+        )
+        # Internal: run one deployment (in a child process)
+        parser.add_argument("--run", choices=["wsgi", "asgi"], help="internal")
+        parser.add_argument("--paths", help="internal")
+        parser.add_argument("--cookie", help="internal")
+
+    def handle(self, *args, **options):
+        if options["run"]:
+            result = self._run(
+                options["run"],
+                json.loads(options["paths"]),
+                options["cookie"],
+                options,
+            )
+            self.stdout.write(json.dumps(result))
+            return
+
+        paths, cookie, cleanup = self._create_data()
+        try:
+            for mode, async_views in (("wsgi", "False"), ("asgi", "True")):
+                result = self._spawn(mode, async_views, paths, cookie, options)
+                label = (
+                    f"wsgi, {options['workers']} sync workers"
+                    if mode == "wsgi"
+                    else "asgi, async views"
+                )
+                self.stdout.write(
+                    f"{label:<26} {result['rps']:>8.1f} req/s   "
+                    f"p50 {result['p50'] * 1000:>7.0f} ms   "
+                    f"p99 {result['p99'] * 1000:>7.0f} ms   "
+                    f"({result['errors']} non-200)"
+                )
+            self.stdout.write(
+                f"note: {options['concurrency']} concurrent clients, "
+                f"{options['query_delay'] * 1000:.0f} ms per SQL query. Threads "
+                "stand in for worker processes, so CPU-bound time is shared "
+                "under the GIL; run against the production database for "
+                "absolute numbers."
+            )
+        finally:
+            cleanup()
+
+    # -- setup -------------------------------------------------------------
+
+    def _create_data(self):
+        User = get_user_model()
+        customer, created = User.objects.get_or_create(username="bench_read_customer")
+        restaurant = Restaurant.objects.create(
+            owner=customer,
+            name="Bench Reads",
+            address="Bench street 3",
+            opening_hours="00:00-23:59",
+        )
+        dishes = [
+            Dish.objects.create(
+                restaurant=restaurant, name=f"Dish {i}", price=Decimal("7.50")
+            )
+            for i in range(20)
+        ]
+        order = Order.objects.create(user=customer, restaurant=restaurant)
+        delivery = Delivery.objects.create(order=order, rider=customer)
+        for i in range(10):
+            DeliveryEvent.objects.create(delivery=delivery, event_type=f"E{i}")
+
+        client = Client()
+        client.force_login(customer)
+        session = client.session
+        session[CART_SESSION_KEY] = {str(dish.id): 2 for dish in dishes[:5]}
+        session.save()
+        cookie = f"{settings.SESSION_COOKIE_NAME}={session.session_key}"
+        paths = [
+            reverse("restaurants:public_list"),
+            reverse("restaurants:public_detail", args=[restaurant.pk]),
+            reverse("orders:cart_detail"),
+            reverse("orders:customer_order_status_json", args=[order.pk]),
+        ]
+
+        def cleanup():
+            session.delete()
+            Order.objects.filter(restaurant=restaurant).delete()
+            restaurant.delete()
+            if created:
+                customer.delete()
+
+        return paths, cookie, cleanup
+
+    def _spawn(self, mode, async_views, paths, cookie, options):
+        command = [sys.executable, "-m", "django", "bench_read_views"]
+        for name in ("concurrency", "requests", "workers", "query_delay"):
+            command += [f"--{name.replace('_', '-')}", str(options[name])]
+        command += ["--run", mode, "--paths", json.dumps(paths), "--cookie", cookie]
+        env = dict(os.environ, ASYNC_READ_VIEWS=async_views)
+        output = subprocess.run(
+            command,
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    # -- one deployment ----------------------------------------------------
+
+    def _run(self, mode, paths, cookie, options):
+        delay = options["query_delay"]
+        settings.RATE_LIMITS = {}  # measure the views, not the throttle
+
+        def slow_query(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def add_delay(sender, connection, **kwargs):
+            connection.execute_wrappers.append(slow_query)
+
+        connection_created.connect(add_delay, weak=False)
+
+        requests = [paths[i % len(paths)] for i in range(options["requests"])]
+        if mode == "wsgi":
+            latencies, statuses, elapsed = self._run_wsgi(requests, cookie, options)
+        else:
+            latencies, statuses, elapsed = asyncio.run(
+                self._run_asgi(requests, cookie, options)
+            )
+        return {
+            "rps": len(requests) / elapsed,
+            "p50": _percentile(latencies, 0.50),
+            "p99": _percentile(latencies, 0.99),
+            "errors": sum(status != 200 for status in statuses),
+        }
+
+    def _run_wsgi(self, requests, cookie, options):
+        handler = WSGIHandler()
+        # Each sync worker serves one request at a time, in arrival order
+        workers = ThreadPoolExecutor(max_workers=options["workers"])
+        lock = threading.Lock()
+        queue = list(requests)
+        latencies, statuses = [], []
+
+        def get(path):
+            environ = {
+                "REQUEST_METHOD": "GET",
+                "PATH_INFO": path,
+                "QUERY_STRING": "",
+                "SERVER_NAME": HOST,
+                "SERVER_PORT": "443",
+                "SERVER_PROTOCOL": "HTTP/1.1",
+                "HTTP_HOST": HOST,
+                "HTTP_COOKIE": cookie,
+                "REMOTE_ADDR": "127.0.0.1",
+                "wsgi.version": (1, 0),
+                "wsgi.url_scheme": "https",
+                "wsgi.input": io.BytesIO(),
+                "wsgi.errors": sys.stderr,
+                "wsgi.multithread": True,
+                "wsgi.multiprocess": False,
+                "wsgi.run_once": False,
+            }
+            started = []
+
+            def start_response(status, headers, exc_info=None):
+                started.append(int(status.split()[0]))
+
+            b"".join(handler(environ, start_response))
+            return started[0]
+
+        def client():
+            while True:
+                with lock:
+                    if not queue:
+                        return
+                    path = queue.pop()
+                began = time.perf_counter()
+                status = workers.submit(get, path).result()
+                with lock:
+                    latencies.append(time.perf_counter() - began)
+                    statuses.append(status)
+
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            for _ in range(options["concurrency"]):
+                pool.submit(client)
+        workers.shutdown()
+        return latencies, statuses, time.perf_counter() - began
+
+    async def _run_asgi(self, requests, cookie, options):
+        handler = ASGIHandler()
+        queue = list(requests)
+        latencies, statuses = [], []
+
+        async def get(path):
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "https",
+                "path": path,
+                "raw_path": path.encode(),
+                "query_string": b"",
+                "headers": [(b"host", HOST.encode()), (b"cookie", cookie.encode())],
+                "client": ("127.0.0.1", 50000),
+                "server": (HOST, 443),
+            }
+            sent_body = asyncio.Event()
+            started = []
+
+            async def receive():
+                if sent_body.is_set():
+                    await asyncio.Future()  # no disconnect until the end
+                sent_body.set()
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    started.append(message["status"])
+
+            await handler(scope, receive, send)
+            return started[0]
+
+        async def client():
+            while queue:
+                path = queue.pop()
+                began = time.perf_counter()
+                status = await get(path)
+                latencies.append(time.perf_counter() - began)
+                statuses.append(status)
+
+        began = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(options["concurrency"])))
+        return latencies, statuses, time.perf_counter() - began
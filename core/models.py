@@ -1,3 +1,95 @@
 from django.db import models
+from django.db.models.signals import post_save
 
 # Create your models here.
+
+# Marks a tracked field whose loaded value is not known (deferred, or the
+# instance was never loaded from / saved to the database)
+_UNKNOWN = object()
+
+
+class FieldTrackerMixin:
+    """
+    Remembers the database values of ``tracked_fields`` when an instance is
+    loaded (``from_db``/``refresh_from_db``) and after each save, so
+    ``pre_save``/``post_save`` code can tell what changed without selecting
+    the row again. Signal handlers run inside ``save()``, before the values
+    are re-recorded, so ``previous()`` there is the value being replaced.
+
+    Changes made with ``QuerySet.update()`` are not seen by loaded instances.
+    """
+
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._record_loaded_values()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._record_loaded_values(fields)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._record_loaded_values(kwargs.get("update_fields"))
+
+    def _record_loaded_values(self, fields=None):
+        loaded = self.__dict__.setdefault("_loaded_values", {})
+        for name in self.tracked_fields:
+            if fields is not None and name not in fields:
+                continue
+            attname = self._meta.get_field(name).attname
+            if attname in self.__dict__:  # deferred fields are not known
+                loaded[name] = self.__dict__[attname]
+
+    def previous(self, name):
+        """Value of ``name`` as last loaded or saved; None when unknown."""
+        value = self.__dict__.get("_loaded_values", {}).get(name, _UNKNOWN)
+        return None if value is _UNKNOWN else value
+
+    def has_changed(self, name):
+        """
+        True when ``name`` differs from its loaded value (or that value is
+        unknown, e.g. for an instance that was never saved).
+        """
+        value = self.__dict__.get("_loaded_values", {}).get(name, _UNKNOWN)
+        attname = self._meta.get_field(name).attname
+        return value is _UNKNOWN or value != getattr(self, attname)
+
+
+class TransitionConflict(ValueError):
+    """A compare-and-swap update found the row no longer in the expected state."""
+
+
+def compare_and_set(instance, expected, **values):
+    """
+    ``UPDATE ... SET <values> WHERE pk = <pk> AND <expected>`` as a single
+    statement, so concurrent writers cannot both pass a check made in
+    Python. Returns False (and leaves the instance alone) when the row no
+    longer matches ``expected``. On success the values are applied to the
+    instance and ``post_save`` is sent as ``save(update_fields=...)`` would.
+    """
+    model = type(instance)
+    using = instance._state.db or "default"
+    matched = (
+        model._base_manager.using(using)
+        .filter(pk=instance.pk, **expected)
+        .update(**values)
+    )
+    if not matched:
+        return False
+    for name, value in values.items():
+        setattr(instance, name, value)
+    post_save.send(
+        sender=model,
+        instance=instance,
+        created=False,
+        update_fields=frozenset(values),
+        raw=False,
+        using=using,
+    )
+    if isinstance(instance, FieldTrackerMixin):
+        instance._record_loaded_values(values)
+    return True
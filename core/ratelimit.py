@@ -0,0 +1,139 @@
+"""
+Token-bucket rate limiting backed by the configured cache.
+
+``RATE_LIMITS`` maps a scope to one bucket per client kind::
+
+    {"tracking": {"user": (12, 60), "ip": (60, 60)}}
+
+``(12, 60)`` is a bucket holding 12 tokens that refills completely in 60
+seconds: bursts of 12 requests, then one every 5 seconds. A request spends
+a token from its user's bucket (when logged in) and its IP's bucket; if
+either is empty it gets a 429 with ``Retry-After`` (seconds until a token
+is available) and ``X-Poll-Interval`` (the sustainable polling interval).
+
+Buckets are read and written with one ``get_many``/``set_many`` each; two
+concurrent requests may both take the last token, which is acceptable
+for throttling. With several workers the cache must be shared.
+"""
+
+import math
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+DEFAULT_RATE_LIMITS = {
+    "tracking": {"user": (12, 60), "ip": (60, 60)},
+    "cart": {"user": (30, 60), "ip": (120, 60)},
+}
+
+
+def client_ip(request):
+    """
+    Client address. Behind ``RATE_LIMIT_PROXY_COUNT`` trusted proxies it is
+    the entry they appended to X-Forwarded-For (earlier ones are spoofable).
+    """
+    proxies = getattr(settings, "RATE_LIMIT_PROXY_COUNT", 0)
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
+    if proxies and forwarded:
+        hops = [hop.strip() for hop in forwarded.split(",")]
+        return hops[-min(proxies, len(hops))]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _buckets(request, scope):
+    """``{cache key: (capacity, refill per second)}`` for the request."""
+    limits = getattr(settings, "RATE_LIMITS", DEFAULT_RATE_LIMITS).get(scope, {})
+    clients = {"ip": client_ip(request)}
+    if request.user.is_authenticated:
+        clients["user"] = request.user.pk
+    return {
+        f"ratelimit:{scope}:{kind}:{clients[kind]}": (burst, burst / seconds)
+        for kind, (burst, seconds) in limits.items()
+        if kind in clients
+    }
+
+
+def take_token(request, scope):
+    """
+    Spend one token from each of the request's buckets for ``scope``.
+    Returns None if allowed, else ``(retry_after, poll_interval)`` in
+    seconds; nothing is spent when any bucket is empty.
+    """
+    buckets = _buckets(request, scope)
+    if not buckets:
+        return None
+    now = time.time()
+    stored = cache.get_many(list(buckets))
+    levels, wait, interval = {}, 0.0, 0.0
+    for key, (capacity, rate) in buckets.items():
+        tokens, at = stored.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - at) * rate)
+        levels[key] = tokens
+        wait = max(wait, (1 - tokens) / rate)
+        interval = max(interval, 1 / rate)
+    allowed = wait <= 0
+    cache.set_many(
+        {
+            key: (tokens - 1 if allowed else tokens, now)
+            for key, tokens in levels.items()
+        },
+        # Idle buckets are full again after capacity / rate seconds
+        timeout=math.ceil(max(cap / rate for cap, rate in buckets.values())),
+    )
+    if allowed:
+        return None
+    return math.ceil(wait), math.ceil(interval)
+
+
+def throttled_response(request, retry_after, poll_interval):
+    message = "Too many requests."
+    if request.headers.get("x-requested-with") == "XMLHttpRequest" or (
+        request.content_type == "application/json"
+    ):
+        response = JsonResponse(
+            {
+                "error": message,
+                "retry_after": retry_after,
+                "poll_interval": poll_interval,
+            },
+            status=429,
+        )
+    else:
+        response = HttpResponse(message, status=429, content_type="text/plain")
+    response["Retry-After"] = str(retry_after)
+    response["X-Poll-Interval"] = str(poll_interval)
+    return response
+
+
+def ratelimit(scope):
+    """
+    View decorator applying the ``scope`` buckets of ``RATE_LIMITS``.
+    Works on sync and async views.
+    """
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+
+            @wraps(view_func)
+            async def _async_wrapped(request, *args, **kwargs):
+                throttled = await sync_to_async(take_token)(request, scope)
+                if throttled is not None:
+                    return throttled_response(request, *throttled)
+                return await view_func(request, *args, **kwargs)
+
+            return _async_wrapped
+
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            throttled = take_token(request, scope)
+            if throttled is not None:
+                return throttled_response(request, *throttled)
+            return view_func(request, *args, **kwargs)
+
+        return _wrapped
+
+    return decorator
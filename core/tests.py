@@ -1,3 +1,158 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.ratelimit import client_ip, take_token
+from orders.models import Order
+from restaurants.models import Restaurant
+
+User = get_user_model()
+
+LIMITS = {"test": {"user": (2, 10), "ip": (3, 10)}}
+
+
+@override_settings(RATE_LIMITS=LIMITS)
+class TokenBucketTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username="u", password="x")
+
+    def _request(self, user=None, ip="10.0.0.1"):
+        request = self.factory.get("/", REMOTE_ADDR=ip)
+        request.user = user or AnonymousUser()
+        return request
+
+    def test_burst_then_throttled_until_refill(self):
+        with mock.patch("core.ratelimit.time.time", return_value=1000.0):
+            self.assertIsNone(take_token(self._request(self.user), "test"))
+            self.assertIsNone(take_token(self._request(self.user), "test"))
+            # One token per 5 seconds for the user bucket
+            self.assertEqual(take_token(self._request(self.user), "test"), (5, 5))
+        with mock.patch("core.ratelimit.time.time", return_value=1005.0):
+            self.assertIsNone(take_token(self._request(self.user), "test"))
+
+    def test_ip_bucket_shared_by_anonymous_clients(self):
+        with mock.patch("core.ratelimit.time.time", return_value=1000.0):
+            for _ in range(3):
+                self.assertIsNone(take_token(self._request(), "test"))
+            self.assertIsNotNone(take_token(self._request(), "test"))
+            self.assertIsNone(take_token(self._request(ip="10.0.0.2"), "test"))
+
+    def test_throttled_request_spends_nothing(self):
+        other = User.objects.create_user(username="v", password="x")
+        with mock.patch("core.ratelimit.time.time", return_value=1000.0):
+            take_token(self._request(self.user), "test")
+            take_token(self._request(self.user), "test")
+            # The user bucket is empty; the IP keeps its last token
+            self.assertIsNotNone(take_token(self._request(self.user), "test"))
+            self.assertIsNone(take_token(self._request(other), "test"))
+
+    def test_unknown_scope_is_unlimited(self):
+        for _ in range(10):
+            self.assertIsNone(take_token(self._request(), "other"))
+
+    @override_settings(RATE_LIMIT_PROXY_COUNT=1)
+    def test_client_ip_behind_proxy(self):
+        request = self.factory.get(
+            "/", REMOTE_ADDR="10.0.0.9", HTTP_X_FORWARDED_FOR="1.1.1.1, 2.2.2.2"
+        )
+        self.assertEqual(client_ip(request), "2.2.2.2")
+        self.assertEqual(
+            client_ip(self.factory.get("/", REMOTE_ADDR="3.3.3.3")), "3.3.3.3"
+        )
+
+
+class RateLimitedViewsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create_user(username="owner", password="x")
+        self.cust = User.objects.create_user(username="cust", password="x")
+        rest = Restaurant.objects.create(
+            owner=owner,
+            name="R",
+            address="A",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+        self.order = Order.objects.create(user=self.cust, restaurant=rest)
+
+    @override_settings(RATE_LIMITS={"tracking": {"user": (2, 60)}})
+    def test_tracking_json_throttled_with_hints(self):
+        self.client.login(username="cust", password="x")
+        url = reverse("orders:customer_order_status_json", args=[self.order.id])
+        for _ in range(2):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        resp = self.client.get(url, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual(resp.status_code, 429)
+        self.assertEqual(resp["Retry-After"], "30")
+        self.assertEqual(resp["X-Poll-Interval"], "30")
+        self.assertEqual(resp.json()["poll_interval"], 30)
+
+    @override_settings(RATE_LIMITS={"cart": {"ip": (1, 60)}})
+    def test_cart_endpoints_throttled(self):
+        url = reverse("orders:cart_remove", args=[1])
+        self.assertEqual(self.client.post(url).status_code, 302)
+        resp = self.client.post(url)
+        self.assertEqual(resp.status_code, 429)
+        self.assertIn("Retry-After", resp)
+
+
+class FieldTrackerTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(username="owner", password="x")
+        self.rest = Restaurant.objects.create(
+            owner=owner,
+            name="R",
+            address="A",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+        self.order = Order.objects.create(user=owner, restaurant=self.rest)
+
+    def test_tracks_loaded_values_until_saved(self):
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertEqual(order.previous("status"), Order.STATUS_CREATED)
+        self.assertFalse(order.has_changed("status"))
+        order.status = Order.STATUS_PAID
+        self.assertTrue(order.has_changed("status"))
+        self.assertEqual(order.previous("status"), Order.STATUS_CREATED)
+        order.save()
+        self.assertFalse(order.has_changed("status"))
+        self.assertEqual(order.previous("status"), Order.STATUS_PAID)
+
+    def test_new_and_deferred_values_are_unknown(self):
+        order = Order(user=self.order.user, restaurant=self.rest)
+        self.assertIsNone(order.previous("status"))
+        self.assertTrue(order.has_changed("status"))
+        deferred = Order.objects.only("id").get(pk=self.order.pk)
+        self.assertIsNone(deferred.previous("status"))
+        # Reading the deferred field loads it from the database
+        deferred.status
+        self.assertEqual(deferred.previous("status"), Order.STATUS_CREATED)
+
+    def test_update_fields_and_refresh(self):
+        order = Order.objects.get(pk=self.order.pk)
+        order.status = Order.STATUS_PAID
+        order.save(update_fields=["updated_at"])
+        self.assertTrue(order.has_changed("status"))
+        Order.objects.filter(pk=order.pk).update(status=Order.STATUS_PREPARING)
+        order.refresh_from_db()
+        self.assertEqual(order.previous("status"), Order.STATUS_PREPARING)
+
+    def test_status_change_does_not_reselect_the_row(self):
+        order = Order.objects.get(pk=self.order.pk)
+        with CaptureQueriesContext(connection) as queries:
+            order.advance_to(Order.STATUS_PAID)
+        selects = [
+            q["sql"]
+            for q in queries
+            if q["sql"].startswith("SELECT") and '"orders_order"' in q["sql"]
+        ]
+        self.assertEqual(selects, [])
@@ -1,9 +1,13 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse
 from django.contrib.auth import get_user_model
 from restaurants.models import Restaurant
+from orders.exports import (
+    export_rows,
+    filter_created_between,
+    parse_date_range,
+    streaming_csv_response,
+)
 from orders.models import Order
-import csv
 
 
 def home(request):
@@ -36,33 +40,42 @@ def operator_assign(request, order_id):
 
 
 def export_csv(request):
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="orders.csv"'
-    writer = csv.writer(response)
-    writer.writerow(
-        [
-            "order_id",
-            "user",
-            "restaurant",
-            "status",
-            "created_at",
-            "total_amount",
-        ]
+    """Stream all orders (optionally ?from=&to= dates) as CSV."""
+    start_date, end_date = parse_date_range(
+        request.GET.get("from"), request.GET.get("to")
+    )
+    qs = filter_created_between(
+        Order.objects.order_by("created_at", "id"), start_date, end_date
+    )
+    fields = (
+        "id",
+        "user__username",
+        "restaurant__name",
+        "status",
+        "created_at",
+        "total_amount",
     )
 
-    for order in Order.objects.all():
-        writer.writerow(
-            [
-                order.id,
-                order.user.username,
-                order.restaurant.name,
-                order.status,
-                order.created_at.strftime("%Y-%m-%d %H:%M"),
-                float(order.total_amount),
+    def rows():
+        for pk, user, restaurant, status, created_at, amount in export_rows(qs, fields):
+            yield [
+                pk,
+                user,
+                restaurant,
+                status,
+                created_at.strftime("%Y-%m-%d %H:%M"),
+                float(amount),
             ]
-        )
 
-    return response
+    header = [
+        "order_id",
+        "user",
+        "restaurant",
+        "status",
+        "created_at",
+        "total_amount",
+    ]
+    return streaming_csv_response("orders.csv", header, rows())
 
 
 def about(request):
@@ -10,19 +10,21 @@ def rider_queryset():
     Return a sensible queryset of riders.
     Prefer users in 'riders' group; fallback to non-staff actives.
     """
-    qs = User.objects.all()
-    try:
-        return User.objects.filter(
-            groups__name__iexact="riders", is_active=True
-        ).order_by("username")
-    except Exception:
-        return User.objects.filter(is_active=True, is_staff=False).order_by("username")
+    riders = User.objects.filter(groups__name__iexact="riders", is_active=True)
+    if not riders.exists():
+        riders = User.objects.filter(is_active=True, is_staff=False)
+    return riders.order_by("username")
 
 
 class AssignRiderForm(forms.Form):
     rider = forms.ModelChoiceField(
         label="Rider",
-        queryset=rider_queryset(),
+        queryset=User.objects.none(),
         required=True,
         widget=forms.Select(attrs={"class": "form-select"}),
     )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Evaluated per form, not once at import
+        self.fields["rider"].queryset = rider_queryset()
@@ -0,0 +1,148 @@
+"""
+Rider location ingest.
+
+Pings never touch the database. Each one overwrites the delivery's
+last-known position in the cache. A point is also appended to a bounded
+ring buffer at most every ``RIDER_LOCATION_SAMPLE_SECONDS``. The
+``flush_rider_locations`` command periodically writes the buffered points
+that are not stored yet to ``DeliveryLocation`` with one bulk insert.
+
+Readers (tracking JSON/SSE) only ever read the cached last position.
+The flush command runs in its own process, so the cache must be shared
+(``CACHES`` in settings: Redis; local memory only in DEBUG runs).
+"""
+
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Delivery, DeliveryLocation
+
+# Sampled points kept per delivery between flushes
+DEFAULT_BUFFER_SIZE = 120
+# Minimum seconds between two sampled (persisted) points
+DEFAULT_SAMPLE_SECONDS = 15
+# Cached positions expire this long after the last ping
+LOCATION_TTL = 60 * 60 * 3
+# How long a delivery -> rider lookup is cached for ping authorization
+RIDER_LOOKUP_TTL = 60
+FLUSH_BATCH_SIZE = 1000
+
+ACTIVE_STATUSES = (Delivery.STATUS_ASSIGNED, Delivery.STATUS_PICKED_UP)
+
+
+def _key(delivery_id, name):
+    return f"riderloc:{delivery_id}:{name}"
+
+
+def active_rider_id(delivery_id):
+    """
+    Rider allowed to report positions for the delivery (None once it is no
+    longer active). Cached briefly so pings usually skip the database.
+    """
+    key = _key(delivery_id, "rider")
+    rider_id = cache.get(key)
+    if rider_id is None:
+        row = (
+            Delivery.objects.filter(pk=delivery_id, status__in=ACTIVE_STATUSES)
+            .values_list("rider_id", flat=True)
+            .first()
+        )
+        rider_id = row or 0
+        cache.set(key, rider_id, RIDER_LOOKUP_TTL)
+    return rider_id or None
+
+
+def forget_rider(delivery_id):
+    """Drop the cached rider lookup (delivery reassigned or finished)."""
+    cache.delete(_key(delivery_id, "rider"))
+
+
+def record_ping(delivery_id, lat, lng, accuracy=None, at=None):
+    """Store the latest position and, if due, a sampled point. Returns the point."""
+    buffer_size = getattr(settings, "RIDER_LOCATION_BUFFER_SIZE", DEFAULT_BUFFER_SIZE)
+    sample_seconds = getattr(
+        settings, "RIDER_LOCATION_SAMPLE_SECONDS", DEFAULT_SAMPLE_SECONDS
+    )
+    point = {
+        "lat": float(lat),
+        "lng": float(lng),
+        "accuracy": accuracy,
+        "at": time.time() if at is None else at,
+    }
+    buffer_key = _key(delivery_id, "buffer")
+    updates = {_key(delivery_id, "last"): point}
+    buffer = cache.get(buffer_key) or []
+    if not buffer or point["at"] - buffer[-1]["at"] >= sample_seconds:
+        buffer.append(point)
+        updates[buffer_key] = buffer[-buffer_size:]
+    cache.set_many(updates, LOCATION_TTL)
+    return point
+
+
+def get_latest_location(delivery_id):
+    """Last-known position as ``{"lat", "lng", "accuracy", "at"}`` (ISO time), or None."""
+    return _format_location(cache.get(_key(delivery_id, "last")))
+
+
+async def aget_latest_location(delivery_id):
+    """Async ``get_latest_location`` (the cache may be the database)."""
+    return _format_location(await cache.aget(_key(delivery_id, "last")))
+
+
+def _format_location(point):
+    if point is None:
+        return None
+    return dict(
+        point, at=datetime.fromtimestamp(point["at"], tz=dt_timezone.utc).isoformat()
+    )
+
+
+def flush_locations(delivery_ids=None):
+    """
+    Write buffered points newer than each delivery's flush mark to
+    ``DeliveryLocation`` in bulk. Defaults to active deliveries plus those
+    finished in the last hour. Returns the number of rows written.
+
+    Points are never removed from the buffer (a ping may be appending
+    concurrently); the per-delivery flush mark makes re-flushing harmless.
+    """
+    if delivery_ids is None:
+        recently = timezone.now() - timedelta(hours=1)
+        delivery_ids = Delivery.objects.filter(
+            Q(status__in=ACTIVE_STATUSES) | Q(updated_at__gte=recently)
+        ).values_list("id", flat=True)
+    delivery_ids = list(delivery_ids)
+    if not delivery_ids:
+        return 0
+
+    keys = [_key(i, name) for i in delivery_ids for name in ("buffer", "flushed")]
+    cached = cache.get_many(keys)
+    rows, marks = [], {}
+    for delivery_id in delivery_ids:
+        mark = cached.get(_key(delivery_id, "flushed"), 0)
+        fresh = [
+            p for p in cached.get(_key(delivery_id, "buffer"), []) if p["at"] > mark
+        ]
+        if not fresh:
+            continue
+        rows.extend(
+            DeliveryLocation(
+                delivery_id=delivery_id,
+                lat=Decimal(str(round(p["lat"], 6))),
+                lng=Decimal(str(round(p["lng"], 6))),
+                accuracy=p["accuracy"],
+                recorded_at=datetime.fromtimestamp(p["at"], tz=dt_timezone.utc),
+            )
+            for p in fresh
+        )
+        marks[_key(delivery_id, "flushed")] = fresh[-1]["at"]
+
+    DeliveryLocation.objects.bulk_create(rows, batch_size=FLUSH_BATCH_SIZE)
+    cache.set_many(marks, LOCATION_TTL)
+    return len(rows)
@@ -0,0 +1,91 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from deliveries.locations import flush_locations, record_ping
+from deliveries.models import Delivery
+from deliveries.views import rider_location
+from orders.models import Order
+from restaurants.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark: sustained rider location pings per second in one worker "
+        "(single thread), through the ingest view and the buffer alone, "
+        "then one batched flush. Creates its own data and removes it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--deliveries", type=int, default=50)
+        parser.add_argument("--seconds", type=float, default=5.0, help="per phase")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        rider, created = User.objects.get_or_create(username="bench_ping_rider")
+        restaurant = Restaurant.objects.create(
+            owner=rider,
+            name="Bench Pings",
+            address="Bench street 2",
+            opening_hours="00:00-23:59",
+        )
+        deliveries = [
+            Delivery.objects.create(
+                order=Order.objects.create(user=rider, restaurant=restaurant),
+                rider=rider,
+            )
+            for _ in range(options["deliveries"])
+        ]
+        ids = [d.id for d in deliveries]
+        factory = RequestFactory()
+
+        def view_ping():
+            pk = random.choice(ids)
+            request = factory.post(
+                f"/deliveries/rider/delivery/{pk}/location/",
+                {"lat": 45 + random.random(), "lng": 9 + random.random()},
+            )
+            request.user = rider
+            return rider_location(request, pk=pk).status_code
+
+        def buffer_ping():
+            record_ping(random.choice(ids), 45 + random.random(), 9 + random.random())
+
+        try:
+            for label, ping in (
+                ("ingest view", view_ping),
+                ("buffer only", buffer_ping),
+            ):
+                count = 0
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    deadline = started + options["seconds"]
+                    while time.perf_counter() < deadline:
+                        ping()
+                        count += 1
+                    elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{label}: {count / elapsed:,.0f} pings/s "
+                    f"({count} pings, {len(queries)} SQL queries)"
+                )
+
+            started = time.perf_counter()
+            written = flush_locations(ids)
+            self.stdout.write(
+                f"flush: {written} sampled points for {len(ids)} deliveries "
+                f"in {time.perf_counter() - started:.3f}s"
+            )
+            self.stdout.write(
+                "note: request auth/session cost is not included; pings use the "
+                "configured cache, so measure with the production cache backend."
+            )
+        finally:
+            Order.objects.filter(restaurant=restaurant).delete()
+            restaurant.delete()
+            if created:
+                rider.delete()
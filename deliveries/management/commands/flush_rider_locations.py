@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from deliveries.locations import flush_locations
+
+
+class Command(BaseCommand):
+    help = "Write buffered rider positions to DeliveryLocation in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop", action="store_true", help="keep flushing every --interval"
+        )
+        parser.add_argument("--interval", type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        while True:
+            written = flush_locations()
+            self.stdout.write(f"Flushed {written} positions.")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,49 @@
+# Generated by Django 4.2 on 2026-10-18 18:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("deliveries", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DeliveryLocation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("lat", models.DecimalField(decimal_places=6, max_digits=9)),
+                ("lng", models.DecimalField(decimal_places=6, max_digits=9)),
+                ("accuracy", models.FloatField(blank=True, null=True)),
+                ("recorded_at", models.DateTimeField()),
+                (
+                    "delivery",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="locations",
+                        to="deliveries.delivery",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["recorded_at"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="deliverylocation",
+            index=models.Index(
+                fields=["delivery", "recorded_at"], name="delivloc_delivery_at_idx"
+            ),
+        ),
+    ]
@@ -1,10 +1,11 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
+from core.models import FieldTrackerMixin, TransitionConflict, compare_and_set
 from orders.models import Order
 
 
-class Delivery(models.Model):
+class Delivery(FieldTrackerMixin, models.Model):
     STATUS_ASSIGNED = "ASSIGNED"
     STATUS_PICKED_UP = "PICKED_UP"
     STATUS_DELIVERED = "DELIVERED"
@@ -33,6 +34,9 @@ class Delivery(models.Model):
     assigned_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Old values read by the status signal handlers (see FieldTrackerMixin)
+    tracked_fields = ("status", "updated_at", "rider")
+
     def __str__(self):
         rid = f"rider={self.rider.username}" if self.rider else "rider=None"
         return f"Delivery(order={self.order_id}, {rid}, status={self.status})"
@@ -49,17 +53,27 @@ class Delivery(models.Model):
         return nxt == cur + 1
 
     def advance_to(self, next_status: str, actor=None) -> None:
-        """Advance status and log an event; raise ValueError if invalid."""
+        """
+        Advance status and log an event; raise ValueError if invalid, or
+        ``TransitionConflict`` (a ValueError) if another request changed
+        the status first. Update and event share one transaction.
+        """
         if not self.can_advance_to(next_status):
             raise ValueError("Invalid status transition")
-        self.status = next_status
-        self.save(update_fields=["status", "updated_at"])
-        DeliveryEvent.objects.create(
-            delivery=self,
-            event_type=DeliveryEvent.EVENT_STATUS_CHANGE,
-            message=f"Status changed to {next_status}",
-            actor=actor,
-        )
+        with transaction.atomic():
+            if not compare_and_set(
+                self,
+                {"status": self.status},
+                status=next_status,
+                updated_at=timezone.now(),
+            ):
+                raise TransitionConflict("Delivery status changed concurrently")
+            DeliveryEvent.objects.create(
+                delivery=self,
+                event_type=DeliveryEvent.EVENT_STATUS_CHANGE,
+                message=f"Status changed to {next_status}",
+                actor=actor,
+            )
 
 
 class DeliveryEvent(models.Model):
@@ -84,3 +98,29 @@ class DeliveryEvent(models.Model):
 
     def __str__(self):
         return f"{self.created_at} - {self.event_type}"
+
+
+class DeliveryLocation(models.Model):
+    """
+    Sampled rider position, written in batches by ``flush_rider_locations``
+    from the cache buffer (see ``deliveries.locations``).
+    """
+
+    delivery = models.ForeignKey(
+        Delivery, on_delete=models.CASCADE, related_name="locations"
+    )
+    lat = models.DecimalField(max_digits=9, decimal_places=6)
+    lng = models.DecimalField(max_digits=9, decimal_places=6)
+    accuracy = models.FloatField(null=True, blank=True)
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["recorded_at"]
+        indexes = [
+            models.Index(
+                fields=["delivery", "recorded_at"], name="delivloc_delivery_at_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.delivery_id} @ {self.lat},{self.lng} ({self.recorded_at})"
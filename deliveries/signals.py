@@ -1,47 +1,77 @@
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.core.mail import send_mail
-from django.conf import settings
-from .models import Delivery
-
-
-@receiver(pre_save, sender=Delivery)
-def _store_old_delivery_status(sender, instance: Delivery, **kwargs):
-    if instance.pk:
-        try:
-            old = Delivery.objects.get(pk=instance.pk)
-            instance._old_status = old.status
-        except Delivery.DoesNotExist:
-            instance._old_status = None
-    else:
-        instance._old_status = None
+from orders import changefeed, eta, notifications
+from .locations import forget_rider
+from .models import Delivery, DeliveryEvent
 
 
 @receiver(post_save, sender=Delivery)
 def _notify_delivery_status_change(sender, instance: Delivery, created, **kwargs):
-    if created:
-        return
-    old = getattr(instance, "_old_status", None)
-    if not old or old == instance.status:
+    old = instance.previous("status")
+    if created or not old or not instance.has_changed("status"):
         return
 
-    order = instance.order
-    recipient_list = (
-        [order.user.email] if order and order.user and order.user.email else []
-    )
-    if not recipient_list:
-        return
+    # Same transaction as the change; sent later by send_outbox_emails
+    notifications.queue_emails([notifications.delivery_status_email(instance)])
 
-    status_lower = instance.status.replace("_", " ").lower()
-    subject = f"Your order #{order.id} has been {status_lower}"
-    message = f"Order #{order.id} status changed to {instance.status}."
-    try:
-        send_mail(
-            subject,
-            message,
-            getattr(settings, "DEFAULT_FROM_EMAIL", None),
-            recipient_list,
-            fail_silently=True,
+
+@receiver(post_save, sender=Delivery)
+def _publish_delivery_change(sender, instance: Delivery, created, **kwargs):
+    old = instance.previous("status")
+    if created or instance.has_changed("rider"):
+        changefeed.publish_change(
+            instance.order_id,
+            changefeed.DELIVERY_ASSIGNED,
+            {
+                "delivery_id": instance.id,
+                "rider_id": instance.rider_id,
+                "status": instance.status,
+            },
+        )
+    if not created and old and instance.has_changed("status"):
+        changefeed.publish_change(
+            instance.order_id,
+            changefeed.DELIVERY_STATUS,
+            {
+                "delivery_id": instance.id,
+                "status": instance.status,
+                "previous": old,
+            },
         )
-    except Exception:
-        pass
+
+
+@receiver(post_save, sender=DeliveryEvent)
+def _publish_delivery_event(sender, instance: DeliveryEvent, created, **kwargs):
+    if not created:
+        return
+    changefeed.publish_change(
+        instance.delivery.order_id,
+        changefeed.DELIVERY_EVENT,
+        {
+            "event_id": instance.id,
+            "type": instance.event_type,
+            "message": instance.message,
+            "at": instance.created_at.isoformat(),
+        },
+    )
+
+
+@receiver(post_save, sender=Delivery)
+def _forget_cached_rider(sender, instance: Delivery, created, **kwargs):
+    if not created:
+        forget_rider(instance.id)
+
+
+@receiver(post_save, sender=Delivery)
+def _record_delivery_stage(sender, instance: Delivery, created, **kwargs):
+    old = instance.previous("status")
+    if created or not old or not instance.has_changed("status"):
+        return
+    eta.record_stage(
+        instance.order.restaurant_id,
+        eta.delivery_stage(old),
+        eta.delivery_entry_time(instance, old),
+        instance.updated_at,
+    )
+    if instance.status == Delivery.STATUS_PICKED_UP:
+        eta.record_kitchen_time(instance.order, instance.updated_at)
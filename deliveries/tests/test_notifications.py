@@ -1,5 +1,8 @@
+from io import StringIO
+
 from django.test import TestCase, override_settings
 from django.core import mail
+from django.core.management import call_command
 from django.contrib.auth import get_user_model
 from decimal import Decimal
 from restaurants.models import Restaurant
@@ -40,5 +43,7 @@ class DeliveryEmailSignalTests(TestCase):
     def test_email_sent_on_delivery_status_change(self):
         self.delivery.status = Delivery.STATUS_PICKED_UP
         self.delivery.save()
+        self.assertEqual(len(mail.outbox), 0)  # queued in the outbox
+        call_command("send_outbox_emails", stdout=StringIO())
         self.assertEqual(len(mail.outbox), 1)
         self.assertIn("picked up", mail.outbox[0].subject.lower())
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from deliveries.locations import flush_locations, get_latest_location, record_ping
+from deliveries.models import Delivery, DeliveryLocation
+from orders.models import Order
+from restaurants.models import Restaurant
+
+User = get_user_model()
+
+
+@override_settings(RIDER_LOCATION_SAMPLE_SECONDS=10, RIDER_LOCATION_BUFFER_SIZE=3)
+class RiderLocationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        owner = User.objects.create_user(username="owner", password="pass123")
+        self.customer = User.objects.create_user(username="cust", password="pass123")
+        self.rider = User.objects.create_user(username="rider", password="pass123")
+        User.objects.create_user(username="other", password="pass123")
+        rest = Restaurant.objects.create(
+            owner=owner,
+            name="R",
+            address="A",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+        self.order = Order.objects.create(user=self.customer, restaurant=rest)
+        self.delivery = Delivery.objects.create(order=self.order, rider=self.rider)
+        self.url = reverse("deliveries:rider_location", args=[self.delivery.pk])
+
+    def test_only_assigned_rider_of_active_delivery_can_ping(self):
+        self.client.login(username="other", password="pass123")
+        resp = self.client.post(self.url, {"lat": 45.1, "lng": 9.2})
+        self.assertEqual(resp.status_code, 403)
+
+        self.client.login(username="rider", password="pass123")
+        resp = self.client.post(
+            self.url, {"lat": 45.1, "lng": 9.2}, content_type="application/json"
+        )
+        self.assertEqual(resp.status_code, 204)
+        resp = self.client.post(self.url, {"lat": 95, "lng": 9.2})
+        self.assertEqual(resp.status_code, 400)
+
+        self.delivery.advance_to(Delivery.STATUS_PICKED_UP)
+        self.delivery.advance_to(Delivery.STATUS_DELIVERED)
+        resp = self.client.post(self.url, {"lat": 45.1, "lng": 9.2})
+        self.assertEqual(resp.status_code, 403)
+
+    def test_pings_skip_database_after_first_lookup(self):
+        self.client.login(username="rider", password="pass123")
+        self.client.post(self.url, {"lat": 45.1, "lng": 9.2})
+        with self.assertNumQueries(2):  # session + user only
+            self.client.post(self.url, {"lat": 45.2, "lng": 9.3})
+        self.assertEqual(get_latest_location(self.delivery.pk)["lat"], 45.2)
+        self.assertFalse(DeliveryLocation.objects.exists())
+
+    def test_sampling_ring_buffer_and_flush(self):
+        pk = self.delivery.pk
+        for second in range(0, 60, 5):  # 12 pings, 6 sampled, 3 kept
+            record_ping(pk, 45 + second / 1000, 9, at=1_700_000_000 + second)
+        self.assertEqual(flush_locations(), 3)
+        stored = list(DeliveryLocation.objects.values_list("lat", flat=True))
+        self.assertEqual([float(lat) for lat in stored], [45.03, 45.04, 45.05])
+
+        # Re-flushing writes nothing; later points are picked up
+        self.assertEqual(flush_locations(), 0)
+        record_ping(pk, 46, 9, at=1_700_000_100)
+        self.assertEqual(flush_locations([pk]), 1)
+
+    def test_tracking_json_reads_cached_position(self):
+        self.client.login(username="cust", password="pass123")
+        url = reverse("orders:customer_order_status_json", args=[self.order.id])
+        resp = self.client.get(url)
+        self.assertIsNone(resp.json()["rider_location"])
+        etag = resp["ETag"]
+
+        record_ping(self.delivery.pk, 45.5, 9.5)
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)  # position changes the ETag
+        self.assertEqual(resp.json()["rider_location"]["lng"], 9.5)
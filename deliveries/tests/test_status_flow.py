@@ -2,7 +2,9 @@ from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.core import mail
+from django.core.management import call_command
 from decimal import Decimal
+from io import StringIO
 
 from restaurants.models import Restaurant
 from menu.models import Dish
@@ -49,6 +51,9 @@ class RiderStatusFlowTests(TestCase):
         # Delivery assigned to rider
         self.delivery = Delivery.objects.create(order=self.order, rider=self.rider)
 
+    def _drain_outbox(self):
+        call_command("send_outbox_emails", stdout=StringIO())
+
     def test_only_assigned_rider_can_update(self):
         # non-assigned user
         self.client.login(username="other", password="pass123")
@@ -81,7 +86,8 @@ class RiderStatusFlowTests(TestCase):
         self.delivery.refresh_from_db()
         self.assertEqual(self.delivery.status, Delivery.STATUS_PICKED_UP)
 
-        # One email sent to customer
+        # One email sent to customer, once the outbox is drained
+        self._drain_outbox()
         self.assertEqual(len(mail.outbox), 1)
         self.assertIn("picked up", mail.outbox[0].subject.lower())
 
@@ -91,6 +97,7 @@ class RiderStatusFlowTests(TestCase):
         self.assertEqual(self.delivery.status, Delivery.STATUS_DELIVERED)
 
         # Two emails in total
+        self._drain_outbox()
         self.assertEqual(len(mail.outbox), 2)
         self.assertIn("delivered", mail.outbox[1].subject.lower())
 
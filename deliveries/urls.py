@@ -15,6 +15,11 @@ urlpatterns = [
         views.operator_assign,
         name="operator_assign",
     ),
+    path(
+        "operator/order/<int:order_id>/assign/",
+        views.assign_rider,
+        name="assign_rider",
+    ),
     path("rider/", views.rider_deliveries, name="rider_deliveries"),
     path(
         "rider/delivery/<int:pk>/",
@@ -31,4 +36,9 @@ urlpatterns = [
         RiderMarkDeliveredView.as_view(),
         name="rider_mark_delivered",
     ),
+    path(
+        "rider/delivery/<int:pk>/location/",
+        views.rider_location,
+        name="rider_location",
+    ),
 ]
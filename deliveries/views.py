@@ -1,29 +1,39 @@
 # deliveries/views.py
-from django.core.mail import send_mail
+import json
+
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.db.models import Prefetch
 from django.views.generic import DetailView
 from django.shortcuts import get_object_or_404, render, redirect
-from orders.models import Order
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_POST
+from core.models import TransitionConflict
+from orders.models import ExportJob, Order
+from .locations import active_rider_id, record_ping
 from .models import Delivery, DeliveryEvent
 from .forms import AssignRiderForm
 from django.views import View
-from django.conf import settings
 
 
 @staff_member_required
 def operator_queue(request):
     """List orders without a delivery yet (CREATED/PREPARING)."""
     qs = (
-        Order.objects.filter(
+        Order.objects.for_listing()
+        .filter(
             status__in=[Order.STATUS_CREATED, Order.STATUS_PREPARING],
         )
         .exclude(delivery__isnull=False)
         .order_by("-created_at")
     )
-    return render(request, "deliveries/operator_queue.html", {"orders": qs})
+    return render(
+        request,
+        "deliveries/operator_queue.html",
+        {"orders": qs, "export_partitions": ExportJob.PARTITION_CHOICES},
+    )
 
 
 @staff_member_required
@@ -59,7 +69,13 @@ def assign_rider(request, order_id):
 @login_required
 def rider_deliveries(request):
     """List deliveries assigned to the current rider."""
-    qs = Delivery.objects.filter(rider=request.user).order_by("-assigned_at")
+    qs = (
+        Delivery.objects.filter(rider=request.user)
+        .prefetch_related(
+            Prefetch("order", queryset=Order.objects.for_listing().with_items())
+        )
+        .order_by("-assigned_at")
+    )
     return render(request, "deliveries/rider_list.html", {"deliveries": qs})
 
 
@@ -92,30 +108,13 @@ class RiderMarkPickedUpView(LoginRequiredMixin, RiderDeliveryPermissionMixin, Vi
         delivery = self.get_object()
         try:
             delivery.advance_to(Delivery.STATUS_PICKED_UP, actor=request.user)
+        except TransitionConflict:
+            messages.info(request, "This delivery was just updated elsewhere.")
+            return redirect("deliveries:rider_detail", pk=delivery.pk)
         except ValueError:
             messages.error(request, "Invalid status transition.")
             return redirect("deliveries:rider_detail", pk=delivery.pk)
 
-        # notify customer
-        order = delivery.order
-        subject = f"Your order #{order.id} has been picked up"
-        message = "Your order is on its way to you."
-        from_email = getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@foodhub.local")
-        recipient_list = (
-            [order.user.email] if getattr(order.user, "email", None) else []
-        )
-        if recipient_list:
-            try:
-                send_mail(
-                    subject,
-                    message,
-                    from_email,
-                    recipient_list,
-                    fail_silently=True,
-                )
-            except Exception:
-                pass
-
         messages.success(request, "Marked as PICKED_UP.")
         return redirect("deliveries:rider_detail", pk=delivery.pk)
 
@@ -127,30 +126,13 @@ class RiderMarkDeliveredView(LoginRequiredMixin, RiderDeliveryPermissionMixin, V
         delivery = self.get_object()
         try:
             delivery.advance_to(Delivery.STATUS_DELIVERED, actor=request.user)
+        except TransitionConflict:
+            messages.info(request, "This delivery was just updated elsewhere.")
+            return redirect("deliveries:rider_detail", pk=delivery.pk)
         except ValueError:
             messages.error(request, "Invalid status transition.")
             return redirect("deliveries:rider_detail", pk=delivery.pk)
 
-        # notify customer
-        order = delivery.order
-        subject = f"Your order #{order.id} has been delivered"
-        message = "Enjoy your meal! Your order has been delivered."
-        from_email = getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@foodhub.local")
-        recipient_list = (
-            [order.user.email] if getattr(order.user, "email", None) else []
-        )
-        if recipient_list:
-            try:
-                send_mail(
-                    subject,
-                    message,
-                    from_email,
-                    recipient_list,
-                    fail_silently=True,
-                )
-            except Exception:
-                pass
-
         messages.success(request, "Marked as DELIVERED.")
         return redirect("deliveries:rider_detail", pk=delivery.pk)
 
@@ -200,3 +182,43 @@ def operator_assign(request, pk):
         "deliveries/operator_assign.html",
         {"delivery": delivery, "form": form},
     )
+
+
+def _parse_ping(request):
+    """Return (lat, lng, accuracy) from a JSON or form body; raise ValueError."""
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except json.JSONDecodeError:
+            raise ValueError("Invalid JSON.")
+    else:
+        data = request.POST
+    try:
+        lat = float(data["lat"])
+        lng = float(data["lng"])
+        accuracy = data.get("accuracy")
+        accuracy = float(accuracy) if accuracy not in (None, "") else None
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("lat and lng are required numbers.")
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("Coordinates out of range.")
+    if accuracy is not None and accuracy < 0:
+        raise ValueError("accuracy must be positive.")
+    return lat, lng, accuracy
+
+
+@login_required
+@require_POST
+def rider_location(request, pk):
+    """
+    Position ping from the assigned rider of an active delivery. Stored in
+    the cache only (see ``deliveries.locations``); answers 204.
+    """
+    if active_rider_id(pk) != request.user.id:
+        return JsonResponse({"error": "Not your active delivery."}, status=403)
+    try:
+        lat, lng, accuracy = _parse_ping(request)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    record_ping(pk, lat, lng, accuracy)
+    return HttpResponse(status=204)
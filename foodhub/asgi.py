@@ -3,6 +3,14 @@ ASGI config for foodhub project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serving through it (e.g. ``gunicorn foodhub.asgi -k uvicorn.workers.UvicornWorker``)
+enables the order tracking event stream (``orders:customer_order_events``);
+under WSGI that endpoint declines and tracking pages poll instead.
+Set ``ASYNC_READ_VIEWS=True`` as well to serve the hottest read views
+(tracking JSON, cart, public restaurant pages) with their async ORM
+implementations, so a slow query no longer holds a whole worker;
+``manage.py bench_read_views`` compares both deployments.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -75,6 +75,7 @@ MIDDLEWARE = [
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
+    "orders.middleware.CartStorageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
@@ -112,6 +113,31 @@ DATABASES = {
     )
 }
 
+# -----------------------------
+# Cache
+# -----------------------------
+# Shared by every process (web and management command workers): rider
+# positions, rate-limit buckets, CacheCartStorage and ETA quantiles live
+# here and are written on hot paths, so it must be an in-memory server
+# (Redis, REDIS_URL). Only DEBUG runs (runserver, the test runner) may do
+# without, on a per-process local-memory cache that other processes,
+# e.g. flush_rider_locations, cannot see
+REDIS_URL = os.getenv("REDIS_URL", "").strip()
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+elif DEBUG:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+else:
+    raise RuntimeError(
+        "REDIS_URL must be set when DEBUG is off: rider locations, rate limits "
+        "and the cache cart need a cache shared by all processes"
+    )
+
 # -----------------------------
 # Authentication
 # -----------------------------
@@ -139,6 +165,70 @@ TIME_ZONE = "UTC"
 USE_I18N = True
 USE_TZ = True
 
+# -----------------------------
+# Cart storage
+# -----------------------------
+# Where the shopping cart lives:
+#   orders.cart_storage.SessionCartStorage (default, inside the session)
+#   orders.cart_storage.CacheCartStorage   (configured cache, no session rewrites)
+#   orders.cart_storage.CookieCartStorage  (signed compact cookie)
+CART_STORAGE = os.getenv("CART_STORAGE", "orders.cart_storage.SessionCartStorage")
+CART_COOKIE_NAME = "foodhub_cart"
+
+# Seconds a checkout Idempotency-Key is remembered (retried POSTs replay it)
+CHECKOUT_IDEMPOTENCY_TTL = 60 * 60 * 24
+
+# Change feed of order transitions:
+#   orders.changefeed.InProcessChangeFeed (default, one process)
+#   orders.changefeed.DatabaseChangeFeed  (shared table, multi-worker)
+CHANGE_FEED_BACKEND = os.getenv(
+    "CHANGE_FEED_BACKEND", "orders.changefeed.InProcessChangeFeed"
+)
+
+# Order tracking server-sent events (served under ASGI only): seconds
+# between change feed reads (one reader per process for all streams),
+# seconds between re-checks of a stream without feed records (rider
+# position, ETA), and lifetime of one stream before the browser reconnects
+TRACKING_SSE_INTERVAL = 2
+TRACKING_SSE_REFRESH = 10
+TRACKING_SSE_MAX_AGE = 300
+
+# Rider location pings are buffered in the shared cache; one point per
+# RIDER_LOCATION_SAMPLE_SECONDS is kept for flush_rider_locations to persist
+RIDER_LOCATION_SAMPLE_SECONDS = 15
+RIDER_LOCATION_BUFFER_SIZE = 120
+
+# Route the hottest read views (tracking JSON, cart, public restaurant
+# pages) to their async ORM implementations; enable when serving
+# foodhub.asgi, under WSGI each async view would run its own event loop
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS", "False") == "True"
+
+# Token-bucket rate limits (core.ratelimit): per scope and client kind,
+# (burst, seconds to refill the whole burst). A request needs a token from
+# both its user's and its IP's bucket.
+RATE_LIMITS = {
+    "tracking": {"user": (12, 60), "ip": (60, 60)},
+    "cart": {"user": (30, 60), "ip": (120, 60)},
+}
+# Reverse proxies in front of the app that append to X-Forwarded-For
+# (0: use REMOTE_ADDR)
+RATE_LIMIT_PROXY_COUNT = int(os.getenv("RATE_LIMIT_PROXY_COUNT", "0"))
+
+# Scratch space of run_export_jobs for the export parts. Finished files go
+# to EXPORT_STORAGE (default: DEFAULT_FILE_STORAGE), which the web
+# processes serve downloads from, so it must not be the dyno's own disk
+EXPORT_ROOT = Path(os.getenv("EXPORT_ROOT", str(BASE_DIR / "exports")))
+# A running export not finished after this many seconds is taken over by
+# another worker (its own worker is assumed dead)
+EXPORT_JOB_TIMEOUT = int(os.getenv("EXPORT_JOB_TIMEOUT", str(60 * 60)))
+
+# Customer emails are queued in the OutboxEmail table by status changes
+# and sent by "manage.py send_outbox_emails --loop" (one SMTP connection,
+# batched): the "outbox" process of the Procfile. Without it nothing is
+# delivered. Rows claimed by a drain that has not finished them after this
+# many seconds are sent again (its worker is assumed dead)
+OUTBOX_CLAIM_TIMEOUT = int(os.getenv("OUTBOX_CLAIM_TIMEOUT", str(10 * 60)))
+
 # -----------------------------
 # Crispy Forms
 # -----------------------------
@@ -176,6 +266,8 @@ if CLOUDINARY_URL:
 
     INSTALLED_APPS += ["cloudinary", "cloudinary_storage"]
     DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
+    # Exports are gzip files, not images
+    EXPORT_STORAGE = "cloudinary_storage.storage.RawMediaCloudinaryStorage"
 
     CLOUDINARY_STORAGE = {
         "CLOUDINARY_URL": CLOUDINARY_URL,
@@ -5,7 +5,7 @@ from .models import Dish
 class DishForm(forms.ModelForm):
     class Meta:
         model = Dish
-        fields = ["name", "description", "price", "available", "photo"]
+        fields = ["name", "description", "price", "available", "stock", "photo"]
         widgets = {
             "name": forms.TextInput(attrs={"placeholder": "Dish name"}),
             "description": forms.Textarea(
@@ -14,6 +14,7 @@ class DishForm(forms.ModelForm):
             "price": forms.NumberInput(
                 attrs={"placeholder": "Price (€)", "step": "0.01", "min": "0.01"}
             ),
+            "stock": forms.NumberInput(attrs={"placeholder": "Unlimited", "min": "0"}),
         }
         labels = {
             "photo": "Dish photo",
@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-18 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu", "0002_dish_category"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dish",
+            name="stock",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Units left. Leave empty for unlimited.",
+                null=True,
+            ),
+        ),
+    ]
@@ -1,8 +1,59 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Value, When
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from restaurants.models import Restaurant
 
 
+class DishQuerySet(models.QuerySet):
+    def decrement_stock(self, quantities, prices=None) -> bool:
+        """
+        Take ``{dish_id: qty}`` out of stock with one conditional UPDATE.
+
+        Only dishes with a stock count are touched; each row is decremented
+        only if it still holds enough units, and flips to unavailable when
+        it reaches zero. With ``prices`` (``{dish_id: price}``) a row must
+        also still be available at that price. All or nothing: when any
+        dish is short, the UPDATE is rolled back to a savepoint and False
+        is returned.
+        """
+        if not quantities:
+            return True
+        enough = Q()
+        for dish_id, qty in quantities.items():
+            if prices is None:
+                enough |= Q(pk=dish_id, stock__gte=qty)
+            else:
+                enough |= Q(
+                    pk=dish_id, stock__gte=qty, available=True, price=prices[dish_id]
+                )
+        with transaction.atomic():
+            updated = self.filter(enough).update(
+                stock=Case(
+                    *[
+                        When(pk=did, then=F("stock") - qty)
+                        for did, qty in quantities.items()
+                    ],
+                    default=F("stock"),
+                    output_field=models.PositiveIntegerField(),
+                ),
+                # Right-hand sides see the old row, so stock == qty means "now 0"
+                available=Case(
+                    *[
+                        When(pk=did, stock=qty, then=Value(False))
+                        for did, qty in quantities.items()
+                    ],
+                    default=F("available"),
+                    output_field=models.BooleanField(),
+                ),
+                updated_at=timezone.now(),
+            )
+            if updated != len(quantities):
+                transaction.set_rollback(True)
+                return False
+        return True
+
+
 class Dish(models.Model):
     restaurant = models.ForeignKey(
         Restaurant, on_delete=models.CASCADE, related_name="dishes"
@@ -14,11 +65,18 @@ class Dish(models.Model):
         max_digits=6, decimal_places=2, validators=[MinValueValidator(0.01)]
     )
     available = models.BooleanField(default=True)
+    stock = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Units left. Leave empty for unlimited.",
+    )
     photo = models.ImageField(upload_to="dishes/", blank=True, null=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = DishQuerySet.as_manager()
+
     class Meta:
         ordering = ["name"]
 
@@ -0,0 +1,210 @@
+"""
+Cart pricing engine.
+
+The cart is a plain mapping ``{"<dish_id>": quantity}``. Views,
+templates and context processors never price it themselves: they ask for
+the request's ``CartSnapshot`` and read lines, totals and flags from it.
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import cached_property
+
+from menu.models import Dish
+from .cart_storage import get_cart_storage
+
+# Attribute used to memoize the snapshot on the current request
+REQUEST_SNAPSHOT_ATTR = "_cart_snapshot"
+
+# Upper bound for a single batch update
+MAX_CART_OPERATIONS = 50
+
+
+@dataclass(frozen=True)
+class CartLine:
+    """One priced cart row."""
+
+    dish: Dish
+    quantity: int
+    line_total: Decimal
+
+    @property
+    def available(self) -> bool:
+        return self.dish.available
+
+
+class CartSnapshot:
+    """
+    Immutable, priced view of a cart at the start of the request.
+
+    Quantities and the item count come straight from the stored mapping,
+    so the navbar counter costs no query. Lines, totals and restaurant /
+    availability flags are priced with a single Dish query on first access
+    and reused for the rest of the request.
+    """
+
+    def __init__(self, cart):
+        quantities = {}
+        for did_str, qty in (cart or {}).items():
+            qty = int(qty)
+            if qty > 0:
+                quantities[int(did_str)] = qty
+        object.__setattr__(self, "_quantities", quantities)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CartSnapshot is immutable")
+
+    def __len__(self):
+        return len(self._quantities)
+
+    def __bool__(self):
+        return bool(self._quantities)
+
+    @property
+    def quantities(self):
+        """Copy of the ``{dish_id: quantity}`` mapping."""
+        return dict(self._quantities)
+
+    @property
+    def item_count(self) -> int:
+        """Sum of quantities (shown as the cart badge)."""
+        return sum(self._quantities.values())
+
+    @cached_property
+    def _priced(self):
+        return self._price(Dish.objects.in_bulk(list(self._quantities)))
+
+    async def aprice(self):
+        """Price the cart with the async ORM (for async views); returns self."""
+        if "_priced" not in self.__dict__:
+            dishes = await Dish.objects.ain_bulk(list(self._quantities))
+            self.__dict__["_priced"] = self._price(dishes)
+        return self
+
+    def _price(self, dishes):
+        lines = []
+        total = Decimal("0.00")
+        for did, qty in self._quantities.items():
+            dish = dishes.get(did)
+            if not dish:
+                continue
+            line_total = dish.price * qty
+            total += line_total
+            lines.append(CartLine(dish=dish, quantity=qty, line_total=line_total))
+        missing = frozenset(did for did in self._quantities if did not in dishes)
+        return tuple(lines), total, missing
+
+    @property
+    def lines(self):
+        return self._priced[0]
+
+    @property
+    def total(self) -> Decimal:
+        return self._priced[1]
+
+    @property
+    def missing_dish_ids(self):
+        """Dish ids stored in the cart that no longer exist."""
+        return self._priced[2]
+
+    @property
+    def restaurant_ids(self):
+        return frozenset(line.dish.restaurant_id for line in self.lines)
+
+    @property
+    def unavailable_dish_ids(self):
+        return frozenset(line.dish.id for line in self.lines if not line.available)
+
+    @property
+    def has_unavailable(self) -> bool:
+        return bool(self.unavailable_dish_ids)
+
+    @property
+    def is_single_restaurant(self) -> bool:
+        return len(self.restaurant_ids) == 1
+
+    def as_json(self) -> dict:
+        """Plain-JSON view of lines and totals (money as strings)."""
+        return {
+            "lines": [
+                {
+                    "dish_id": line.dish.id,
+                    "name": line.dish.name,
+                    "unit_price": f"{line.dish.price:.2f}",
+                    "quantity": line.quantity,
+                    "line_total": f"{line.line_total:.2f}",
+                    "available": line.available,
+                }
+                for line in self.lines
+            ],
+            "total": f"{self.total:.2f}",
+            "item_count": self.item_count,
+            "single_restaurant": self.is_single_restaurant,
+            "unavailable_dish_ids": sorted(self.unavailable_dish_ids),
+        }
+
+
+def apply_cart_operations(cart: dict, operations) -> dict:
+    """
+    Apply a list of ``{"op": "add"|"set"|"remove", "dish_id": id,
+    "quantity": n}`` operations to a copy of ``cart`` and return it.
+    Raise ValueError, leaving ``cart`` untouched, if any operation is invalid.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise ValueError("Provide a non-empty list of operations.")
+    if len(operations) > MAX_CART_OPERATIONS:
+        raise ValueError(f"At most {MAX_CART_OPERATIONS} operations per request.")
+
+    parsed = []
+    for index, operation in enumerate(operations):
+        try:
+            op = operation["op"]
+            dish_id = int(operation["dish_id"])
+            qty = int(operation.get("quantity", 1))
+        except (AttributeError, TypeError, KeyError, ValueError):
+            raise ValueError(f"Operation {index} is malformed.")
+        if op not in ("add", "set", "remove"):
+            raise ValueError(f"Operation {index} has unknown op '{op}'.")
+        if op == "add" and qty <= 0:
+            raise ValueError(f"Operation {index} must add a positive quantity.")
+        parsed.append((op, dish_id, qty))
+
+    # Only available dishes may be added (same rule as cart_add)
+    wanted = {did for op, did, qty in parsed if op != "remove" and qty > 0}
+    orderable = set(
+        Dish.objects.filter(id__in=wanted, available=True).values_list("id", flat=True)
+    )
+    unknown = wanted - orderable
+    if unknown:
+        raise ValueError(
+            "Dishes not available: " + ", ".join(str(d) for d in sorted(unknown))
+        )
+
+    result = dict(cart)
+    for op, dish_id, qty in parsed:
+        key = str(dish_id)
+        if op == "add":
+            qty += int(result.get(key, 0))
+        if op == "remove" or qty <= 0:
+            result.pop(key, None)
+        else:
+            result[key] = qty
+    return result
+
+
+def get_cart_snapshot(request):
+    """
+    Return the snapshot for this request, building it on first use.
+    Every caller during the same request gets the same object.
+    """
+    snapshot = getattr(request, REQUEST_SNAPSHOT_ATTR, None)
+    if snapshot is None:
+        snapshot = CartSnapshot(get_cart_storage(request).load())
+        setattr(request, REQUEST_SNAPSHOT_ATTR, snapshot)
+    return snapshot
+
+
+def invalidate_cart_snapshot(request):
+    """Drop the memoized snapshot after the cart has been mutated."""
+    if hasattr(request, REQUEST_SNAPSHOT_ATTR):
+        delattr(request, REQUEST_SNAPSHOT_ATTR)
@@ -0,0 +1,156 @@
+"""
+Cart storage backends.
+
+The cart is a ``{"<dish_id>": quantity}`` mapping. Where it lives is chosen
+with ``settings.CART_STORAGE`` (dotted path to one of the classes below):
+
+- ``SessionCartStorage``: inside the session (default, original behaviour).
+- ``CacheCartStorage``: in the configured cache, keyed by a cart token that
+  is written to the session only once, when the cart is first saved.
+- ``CookieCartStorage``: in a compact signed cookie, no server-side state.
+
+Views never touch the backend directly: they go through ``_get_cart`` /
+``_save_cart`` in ``orders.views``.
+"""
+
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+DEFAULT_CART_STORAGE = "orders.cart_storage.SessionCartStorage"
+
+# Session key holding the cart itself (session backend)
+CART_SESSION_KEY = "cart"
+# Session key holding the cache token (cache backend)
+CART_TOKEN_SESSION_KEY = "cart_token"
+
+# Attribute used to memoize the storage on the current request
+REQUEST_STORAGE_ATTR = "_cart_storage"
+
+CART_MAX_AGE = 60 * 60 * 24 * 14  # two weeks, like the session cookie
+
+
+class BaseCartStorage:
+    """Load once per request, save only when a view changes the cart."""
+
+    def __init__(self, request):
+        self.request = request
+        self._cart = None
+
+    def load(self) -> dict:
+        """Return the cart mapping; later calls reuse the first read."""
+        if self._cart is None:
+            self._cart = self._read() or {}
+        return self._cart
+
+    def save(self, cart: dict) -> None:
+        self._cart = cart
+        self._write(cart)
+
+    def clear(self) -> None:
+        self.save({})
+
+    def update_response(self, response) -> None:
+        """Hook for backends that keep state on the response (cookies)."""
+
+    def _read(self):
+        raise NotImplementedError
+
+    def _write(self, cart):
+        raise NotImplementedError
+
+
+class SessionCartStorage(BaseCartStorage):
+    def _read(self):
+        return self.request.session.get(CART_SESSION_KEY)
+
+    def _write(self, cart):
+        self.request.session[CART_SESSION_KEY] = cart
+        self.request.session.modified = True
+
+
+class CacheCartStorage(BaseCartStorage):
+    """
+    Keep the cart in the cache. The session only stores a random token
+    (one write for the lifetime of the cart); it survives the session key
+    rotation that happens on login, so the cart does too.
+    """
+
+    def _cache_key(self, create=False):
+        token = self.request.session.get(CART_TOKEN_SESSION_KEY)
+        if token is None and create:
+            token = uuid.uuid4().hex
+            self.request.session[CART_TOKEN_SESSION_KEY] = token
+        return f"cart:{token}" if token else None
+
+    def _read(self):
+        key = self._cache_key()
+        return cache.get(key) if key else None
+
+    def _write(self, cart):
+        key = self._cache_key(create=bool(cart))
+        if key is None:
+            return
+        if cart:
+            cache.set(key, cart, CART_MAX_AGE)
+        else:
+            cache.delete(key)
+
+
+class CookieCartStorage(BaseCartStorage):
+    """Keep the cart in a signed, compressed cookie."""
+
+    salt = "orders.cart"
+
+    def __init__(self, request):
+        super().__init__(request)
+        self._dirty = False
+
+    @property
+    def cookie_name(self):
+        return getattr(settings, "CART_COOKIE_NAME", "foodhub_cart")
+
+    def _read(self):
+        raw = self.request.COOKIES.get(self.cookie_name)
+        if not raw:
+            return None
+        try:
+            data = signing.loads(raw, salt=self.salt, max_age=CART_MAX_AGE)
+        except signing.BadSignature:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def _write(self, cart):
+        self._dirty = True
+
+    def update_response(self, response):
+        if not self._dirty:
+            return
+        if self._cart:
+            response.set_cookie(
+                self.cookie_name,
+                signing.dumps(self._cart, salt=self.salt, compress=True),
+                max_age=CART_MAX_AGE,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        else:
+            response.delete_cookie(
+                self.cookie_name, samesite=settings.SESSION_COOKIE_SAMESITE
+            )
+
+
+def get_cart_storage(request) -> BaseCartStorage:
+    """Return the configured storage for this request (memoized)."""
+    storage = getattr(request, REQUEST_STORAGE_ATTR, None)
+    if storage is None:
+        storage_class = import_string(
+            getattr(settings, "CART_STORAGE", DEFAULT_CART_STORAGE)
+        )
+        storage = storage_class(request)
+        setattr(request, REQUEST_STORAGE_ATTR, storage)
+    return storage
@@ -0,0 +1,227 @@
+"""
+Change feed of order lifecycle transitions.
+
+Signal handlers publish a ``ChangeRecord(order_id, kind, payload, version)``
+once the transaction that made the change has committed. ``version``
+increases monotonically across the feed, so consumers keep the last version
+they saw and ``read(after=...)`` to catch up, or ``subscribe`` to be called
+as records are published in this process.
+
+The backend is chosen with ``settings.CHANGE_FEED_BACKEND``:
+
+* ``InProcessChangeFeed`` (default): broadcast inside one process, keeps the
+  most recent records in memory. Single worker, development and tests.
+* ``DatabaseChangeFeed``: records are ``OrderChange`` rows, so every worker
+  reads the same ordered feed (version = row id, committed in order under
+  a lock, so no record appears behind a version already read).
+"""
+
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+ORDER_CREATED = "order.created"
+ORDER_STATUS = "order.status"
+DELIVERY_ASSIGNED = "delivery.assigned"
+DELIVERY_STATUS = "delivery.status"
+DELIVERY_EVENT = "delivery.event"
+
+DEFAULT_BACKEND = "orders.changefeed.InProcessChangeFeed"
+# Records kept by the in-process backend
+IN_PROCESS_MAX_RECORDS = 1000
+# Default page size of read()
+READ_LIMIT = 500
+
+
+@dataclass(frozen=True)
+class ChangeRecord:
+    order_id: int
+    kind: str
+    payload: dict
+    version: int
+
+
+class BaseChangeFeed:
+    def __init__(self):
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def publish(self, order_id, kind, payload) -> ChangeRecord:
+        """Store a record, notify local subscribers and return it."""
+        record = self._store(order_id, kind, payload)
+        self._notify(record)
+        return record
+
+    def publish_many(self, changes) -> list:
+        """``publish`` a list of ``(order_id, kind, payload)``, stored together."""
+        records = self._store_many(changes)
+        for record in records:
+            self._notify(record)
+        return records
+
+    def _notify(self, record):
+        for callback in list(self._subscribers):
+            try:
+                callback(record)
+            except Exception:
+                # One broken consumer must not break the write path
+                logger.exception("Change feed subscriber failed")
+
+    def subscribe(self, callback):
+        """Call ``callback(record)`` for each record published in this process.
+        Returns a function that unsubscribes it."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def read(self, after=0, order_id=None, limit=READ_LIMIT):
+        """Records with ``version > after`` (optionally for one order), oldest first."""
+        raise NotImplementedError
+
+    def last_version(self) -> int:
+        """Version of the newest record (0 when empty): where to start reading."""
+        raise NotImplementedError
+
+    def _store(self, order_id, kind, payload) -> ChangeRecord:
+        raise NotImplementedError
+
+    def _store_many(self, changes) -> list:
+        return [self._store(*change) for change in changes]
+
+
+class InProcessChangeFeed(BaseChangeFeed):
+    def __init__(self, max_records=IN_PROCESS_MAX_RECORDS):
+        super().__init__()
+        self._records = deque(maxlen=max_records)
+        self._version = 0
+
+    def _store(self, order_id, kind, payload):
+        with self._lock:
+            self._version += 1
+            record = ChangeRecord(order_id, kind, payload, self._version)
+            self._records.append(record)
+        return record
+
+    def read(self, after=0, order_id=None, limit=READ_LIMIT):
+        with self._lock:
+            records = [
+                r
+                for r in self._records
+                if r.version > after and (order_id is None or r.order_id == order_id)
+            ]
+        return records[:limit]
+
+    def last_version(self):
+        with self._lock:
+            return self._version
+
+
+class DatabaseChangeFeed(BaseChangeFeed):
+    """
+    Records are inserted and committed while ``OrderChangeLock`` is held.
+    Row ids alone are not enough: two transactions can take ids 1 and 2
+    and commit 2 first, and a reader that saw 2 would then skip 1 for
+    good. Under the lock a later id can't commit before an earlier one.
+    """
+
+    def _store(self, order_id, kind, payload):
+        return self._store_many([(order_id, kind, payload)])[0]
+
+    def _store_many(self, changes):
+        from .models import OrderChange, OrderChangeLock
+
+        with transaction.atomic():
+            OrderChangeLock.objects.select_for_update().get_or_create(pk=1)
+            rows = OrderChange.objects.bulk_create(
+                [
+                    OrderChange(order_id=order_id, kind=kind, payload=payload)
+                    for order_id, kind, payload in changes
+                ]
+            )
+        return [
+            ChangeRecord(row.order_id, row.kind, row.payload, row.id) for row in rows
+        ]
+
+    def read(self, after=0, order_id=None, limit=READ_LIMIT):
+        from .models import OrderChange
+
+        qs = OrderChange.objects.filter(id__gt=after).order_by("id")
+        if order_id is not None:
+            qs = qs.filter(order_id=order_id)
+        return [
+            ChangeRecord(order_id, kind, payload, version)
+            for version, order_id, kind, payload in qs.values_list(
+                "id", "order_id", "kind", "payload"
+            )[:limit]
+        ]
+
+    def last_version(self):
+        from .models import OrderChange
+
+        return (
+            OrderChange.objects.order_by("-id").values_list("id", flat=True).first()
+            or 0
+        )
+
+
+_feed = None
+
+
+def get_change_feed() -> BaseChangeFeed:
+    """The process-wide feed instance for ``settings.CHANGE_FEED_BACKEND``."""
+    global _feed
+    if _feed is None:
+        path = getattr(settings, "CHANGE_FEED_BACKEND", DEFAULT_BACKEND)
+        _feed = import_string(path)()
+    return _feed
+
+
+@receiver(setting_changed)
+def _reset_change_feed(setting, **kwargs):
+    global _feed
+    if setting == "CHANGE_FEED_BACKEND":
+        _feed = None
+
+
+def publish_change(order_id, kind, payload):
+    """Publish once the current transaction commits (now, in autocommit);
+    nothing is published for rolled back changes."""
+
+    def publish():
+        try:
+            get_change_feed().publish(order_id, kind, payload)
+        except Exception:
+            # The change itself is committed; don't fail the request over it
+            logger.exception("Could not publish %s for order %s", kind, order_id)
+
+    transaction.on_commit(publish)
+
+
+def publish_changes(changes):
+    """``publish_change`` for a list of ``(order_id, kind, payload)``, as
+    one batch."""
+    changes = list(changes)
+
+    def publish():
+        try:
+            get_change_feed().publish_many(changes)
+        except Exception:
+            logger.exception("Could not publish %d changes", len(changes))
+
+    if changes:
+        transaction.on_commit(publish)
@@ -1,11 +1,10 @@
-from .views import CART_SESSION_KEY
+from .cart import get_cart_snapshot
 
 
 def cart_item_count(request):
     """
     Returns the total number of items in the cart (sum of quantities).
     Accessible as {{ cart_item_count }} in templates.
+    Reads the request's shared cart snapshot, so no extra query is made.
     """
-    cart = request.session.get(CART_SESSION_KEY, {})
-    total_qty = sum(cart.values())
-    return {"cart_item_count": total_qty}
+    return {"cart_item_count": get_cart_snapshot(request).item_count}
@@ -0,0 +1,389 @@
+"""
+Delivery time estimates from streaming quantile sketches.
+
+Each time an order or delivery leaves a stage, the time spent in it is
+added to two ``StageDurationSketch`` rows of the restaurant: the one for
+the local hour the stage was entered and the all-hours one. Orders stay
+PREPARING, so the kitchen stage ends when the delivery is picked up.
+Sketches are log-bucketed histograms (relative error about
+``(GAMMA - 1) / 2``), so an update touches one bucket and never scans
+order history.
+
+Stages are timed from the status event logs (``OrderStatusEvent`` and
+the delivery's ``STATUS_CHANGE`` events), not from ``updated_at``, which
+any save of the row moves.
+
+``estimate`` reads the p50/p90 of the remaining stages from one cached
+dictionary per restaurant and hour: O(1) per request. Estimates are
+absolute times, so they stay valid between polls. Adding per-stage p90s
+overstates the p90 of the total a little, which is the safe direction for
+a customer-facing promise.
+"""
+
+import math
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Case, F, Max, OuterRef, Subquery, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from deliveries.models import Delivery, DeliveryEvent
+from .models import Order, OrderStatusEvent, StageDurationSketch
+
+# Bucket growth factor: about 5% relative accuracy
+GAMMA = 1.1
+# Durations are clamped to this range (seconds)
+MIN_SECONDS = 1.0
+MAX_SECONDS = 60 * 60 * 24
+# Below this many samples the hour-of-day sketch defers to the all-hours one
+MIN_HOUR_SAMPLES = 5
+ESTIMATE_CACHE_TTL = 60 * 60
+
+ORDER_STAGES = [Order.STATUS_CREATED, Order.STATUS_PAID, Order.STATUS_PREPARING]
+DELIVERY_STAGES = [Delivery.STATUS_ASSIGNED, Delivery.STATUS_PICKED_UP]
+# Annotations added by ``with_stage_entry``
+ENTRY_FIELDS = ("stage_entered_at", "delivery_stage_entered_at")
+
+
+def order_stage(status):
+    return f"order:{status}"
+
+
+def delivery_stage(status):
+    return f"delivery:{status}"
+
+
+class QuantileSketch:
+    """Log-bucketed histogram; ``buckets`` maps bucket index (str) -> count."""
+
+    def __init__(self, buckets=None):
+        self.buckets = dict(buckets or {})
+
+    @property
+    def count(self):
+        return sum(self.buckets.values())
+
+    def add(self, seconds):
+        value = min(max(float(seconds), MIN_SECONDS), MAX_SECONDS)
+        index = str(math.ceil(math.log(value, GAMMA)))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def quantile(self, q):
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.buckets, key=int):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Midpoint of the bucket (GAMMA^(i-1), GAMMA^i]
+                return 2 * GAMMA ** int(index) / (GAMMA + 1)
+        return None
+
+
+def _cache_key(restaurant_id, hour):
+    return f"eta:{restaurant_id}:{hour}"
+
+
+def record_stage(restaurant_id, stage, entered_at, left_at):
+    """Add one time-in-stage sample; runs after the transition commits."""
+    record_stages([(restaurant_id, stage, entered_at, left_at)])
+
+
+def record_kitchen_time(order, picked_up_at):
+    """
+    Sample ``order:PREPARING`` when the order's delivery is picked up: the
+    order itself stays PREPARING, so no order transition ends that stage.
+    """
+    if order.status != Order.STATUS_PREPARING:
+        return
+    record_stage(
+        order.restaurant_id,
+        order_stage(Order.STATUS_PREPARING),
+        status_entry_times([order], order.status)[order.id],
+        picked_up_at,
+    )
+
+
+def status_entry_times(orders, status=None):
+    """
+    ``{order id: when it entered status}``, ``status`` defaulting to each
+    order's ``previous("status")``, from the latest ``OrderStatusEvent``
+    into it (one query for the batch). CREATED starts at ``created_at``;
+    orders without an event (written before the log existed) fall back to
+    ``previous("updated_at")``.
+    """
+    wanted = {
+        order.id: status or order.previous("status")
+        for order in orders
+        if (status or order.previous("status")) != Order.STATUS_CREATED
+    }
+    found = {}
+    if wanted:
+        rows = (
+            OrderStatusEvent.objects.filter(
+                order_id__in=wanted, to_status__in=set(wanted.values())
+            )
+            .values("order_id", "to_status")
+            .annotate(last=Max("at"))
+        )
+        found = {(row["order_id"], row["to_status"]): row["last"] for row in rows}
+    return {
+        order.id: (
+            found.get((order.id, wanted[order.id])) or order.previous("updated_at")
+            if order.id in wanted
+            else order.created_at
+        )
+        for order in orders
+    }
+
+
+def delivery_entry_time(delivery, status):
+    """
+    When ``delivery`` entered ``status``: ASSIGNED at ``assigned_at``,
+    later ones at their latest ``STATUS_CHANGE`` event (rider reassignments
+    save the row without starting a stage).
+    """
+    if status == Delivery.STATUS_ASSIGNED:
+        return delivery.assigned_at
+    return (
+        DeliveryEvent.objects.filter(
+            delivery=delivery, event_type=DeliveryEvent.EVENT_STATUS_CHANGE
+        )
+        .order_by("-created_at")
+        .values_list("created_at", flat=True)
+        .first()
+    ) or delivery.previous("updated_at")
+
+
+def record_stages(samples):
+    """
+    Add ``(restaurant_id, stage, entered_at, left_at)`` samples after the
+    transaction commits, updating each sketch row once per batch.
+    """
+    grouped = {}
+    for restaurant_id, stage, entered_at, left_at in samples:
+        seconds = (left_at - entered_at).total_seconds()
+        if seconds < 0:
+            continue
+        hour = timezone.localtime(entered_at).hour
+        grouped.setdefault((restaurant_id, stage, hour), []).append(seconds)
+    if grouped:
+        transaction.on_commit(lambda: _add_samples(grouped))
+
+
+@transaction.atomic
+def _add_samples(grouped):
+    """``grouped`` maps (restaurant_id, stage, hour) to durations."""
+    rows = {}
+    for (restaurant_id, stage, hour), durations in grouped.items():
+        for bucket_hour in (hour, StageDurationSketch.ALL_HOURS):
+            key = (restaurant_id, stage, bucket_hour)
+            rows.setdefault(key, []).extend(durations)
+    for (restaurant_id, stage, bucket_hour), durations in rows.items():
+        row, _ = StageDurationSketch.objects.select_for_update().get_or_create(
+            restaurant_id=restaurant_id, stage=stage, hour=bucket_hour
+        )
+        sketch = QuantileSketch(row.buckets)
+        for seconds in durations:
+            sketch.add(seconds)
+        row.buckets = sketch.buckets
+        row.count += len(durations)
+        row.p50 = sketch.quantile(0.5)
+        row.p90 = sketch.quantile(0.9)
+        row.save()
+    cache.delete_many(
+        [_cache_key(restaurant_id, hour) for restaurant_id, _, hour in grouped]
+    )
+
+
+def _quantiles_query(restaurant_id, hour):
+    return StageDurationSketch.objects.filter(
+        restaurant_id=restaurant_id,
+        hour__in=(hour, StageDurationSketch.ALL_HOURS),
+    ).values_list("stage", "hour", "count", "p50", "p90")
+
+
+def _fold_quantiles(rows):
+    by_hour, overall = {}, {}
+    for stage, row_hour, count, p50, p90 in rows:
+        if row_hour == StageDurationSketch.ALL_HOURS:
+            overall[stage] = (p50, p90)
+        elif count >= MIN_HOUR_SAMPLES:
+            by_hour[stage] = (p50, p90)
+    return {**overall, **by_hour}
+
+
+def stage_quantiles(restaurant_id, hour):
+    """``{stage: (p50, p90)}`` in seconds for the restaurant at that hour (cached)."""
+    key = _cache_key(restaurant_id, hour)
+    quantiles = cache.get(key)
+    if quantiles is None:
+        quantiles = _fold_quantiles(_quantiles_query(restaurant_id, hour))
+        cache.set(key, quantiles, ESTIMATE_CACHE_TTL)
+    return quantiles
+
+
+async def astage_quantiles(restaurant_id, hour):
+    """Async ``stage_quantiles`` (async cache and ORM)."""
+    key = _cache_key(restaurant_id, hour)
+    quantiles = await cache.aget(key)
+    if quantiles is None:
+        rows = [row async for row in _quantiles_query(restaurant_id, hour)]
+        quantiles = _fold_quantiles(rows)
+        await cache.aset(key, quantiles, ESTIMATE_CACHE_TTL)
+    return quantiles
+
+
+def with_stage_entry(queryset):
+    """
+    Annotate orders with ``stage_entered_at`` (when the order entered its
+    status) and ``delivery_stage_entered_at`` (when its delivery entered
+    its status), as ``status_entry_times`` and ``delivery_entry_time``
+    define them, with subqueries so other aggregates are not multiplied.
+    """
+    status_event = (
+        OrderStatusEvent.objects.filter(
+            order=OuterRef("pk"), to_status=OuterRef("status")
+        )
+        .order_by("-at")
+        .values("at")[:1]
+    )
+    delivery_event = (
+        DeliveryEvent.objects.filter(
+            delivery__order=OuterRef("pk"),
+            event_type=DeliveryEvent.EVENT_STATUS_CHANGE,
+        )
+        .order_by("-created_at")
+        .values("created_at")[:1]
+    )
+    return queryset.annotate(
+        stage_entered_at=Case(
+            When(status=Order.STATUS_CREATED, then=F("created_at")),
+            default=Coalesce(Subquery(status_event), F("updated_at")),
+            output_field=models.DateTimeField(),
+        ),
+        delivery_stage_entered_at=Case(
+            When(
+                delivery__status=Delivery.STATUS_ASSIGNED,
+                then=F("delivery__assigned_at"),
+            ),
+            default=Coalesce(Subquery(delivery_event), F("delivery__updated_at")),
+            output_field=models.DateTimeField(),
+        ),
+    )
+
+
+def _entry_query(order):
+    return with_stage_entry(Order.objects.filter(pk=order.pk)).values(*ENTRY_FIELDS)
+
+
+def _set_entry_times(order, row):
+    for name in ENTRY_FIELDS:
+        setattr(order, name, row[name] if row else order.updated_at)
+
+
+def _remaining_stages(order_status, delivery_status, entered_at, delivery_entered_at):
+    """
+    (remaining stages, when the current one was entered), or (None, None).
+
+    Orders stay PREPARING until their delivery is picked up, which is when
+    the ``order:PREPARING`` (kitchen) stage ends. A rider is usually
+    assigned while the kitchen is still working, so until pickup only the
+    ride itself is added after the kitchen stages.
+    """
+    if delivery_status is not None:
+        if delivery_status == Delivery.STATUS_PICKED_UP:
+            return [delivery_stage(Delivery.STATUS_PICKED_UP)], delivery_entered_at
+        if delivery_status != Delivery.STATUS_ASSIGNED:
+            return None, None
+    if order_status in ORDER_STAGES:
+        index = ORDER_STAGES.index(order_status)
+        stages = [order_stage(s) for s in ORDER_STAGES[index:]]
+        return stages + [delivery_stage(Delivery.STATUS_PICKED_UP)], entered_at
+    if delivery_status is None or order_status == Order.STATUS_CANCELLED:
+        return None, None
+    stages = [delivery_stage(s) for s in DELIVERY_STAGES]
+    return stages, delivery_entered_at
+
+
+def _order_stages(order, delivery):
+    return _remaining_stages(
+        order.status,
+        getattr(delivery, "status", None),
+        order.stage_entered_at,
+        order.delivery_stage_entered_at,
+    )
+
+
+def _row_stages(row):
+    return _remaining_stages(
+        row["status"],
+        row["delivery__status"],
+        row["stage_entered_at"],
+        row["delivery_stage_entered_at"],
+    )
+
+
+def _arrival(quantiles, stages, entered_at, now):
+    known = [quantiles[stage] for stage in stages if stage in quantiles]
+    if not known or stages[0] not in quantiles:
+        return None
+    now = now or timezone.now()
+    result = {}
+    for position, name in ((0, "p50"), (1, "p90")):
+        current, *later = [q[position] for q in known]
+        # An overdue stage is assumed to end now
+        eta = max(entered_at + timedelta(seconds=current), now)
+        result[name] = eta + timedelta(seconds=sum(later))
+    return result
+
+
+def _estimate(restaurant_id, stages, entered_at, now):
+    if not stages:
+        return None
+    quantiles = stage_quantiles(restaurant_id, timezone.localtime(entered_at).hour)
+    return _arrival(quantiles, stages, entered_at, now)
+
+
+async def _aestimate(restaurant_id, stages, entered_at, now):
+    if not stages:
+        return None
+    quantiles = await astage_quantiles(
+        restaurant_id, timezone.localtime(entered_at).hour
+    )
+    return _arrival(quantiles, stages, entered_at, now)
+
+
+def estimate(order, delivery=None, now=None):
+    """
+    ``{"p50": datetime, "p90": datetime}`` when the order should arrive,
+    or None when finished or nothing is known yet for the restaurant.
+    Orders loaded through ``with_stage_entry`` need no extra query.
+    """
+    if not hasattr(order, ENTRY_FIELDS[0]):
+        _set_entry_times(order, _entry_query(order).first())
+    return _estimate(order.restaurant_id, *_order_stages(order, delivery), now)
+
+
+async def aestimate(order, delivery=None, now=None):
+    """Async ``estimate``."""
+    if not hasattr(order, ENTRY_FIELDS[0]):
+        _set_entry_times(order, await _entry_query(order).afirst())
+    return await _aestimate(order.restaurant_id, *_order_stages(order, delivery), now)
+
+
+def row_estimate(row, now=None):
+    """
+    ``estimate`` from a values row of a ``with_stage_entry`` queryset that
+    includes ``restaurant_id``, ``status`` and ``delivery__status``.
+    """
+    return _estimate(row["restaurant_id"], *_row_stages(row), now)
+
+
+async def arow_estimate(row, now=None):
+    """Async ``row_estimate``."""
+    return await _aestimate(row["restaurant_id"], *_row_stages(row), now)
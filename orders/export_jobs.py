@@ -0,0 +1,193 @@
+"""
+Background export jobs.
+
+A job's date range is split into day or week partitions. Each partition is
+exported by a worker process into its own gzip member; members are then
+concatenated in order, which yields a single valid ``.csv.gz`` file. The
+parts are local scratch files; the finished file is saved to the export
+storage (``settings.EXPORT_STORAGE``, default: the default file storage),
+which the web processes serve downloads from.
+"""
+
+import csv
+import gzip
+import os
+import secrets
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .exports import (
+    ORDER_EXPORT_HEADER,
+    export_rows,
+    filter_created_between,
+    order_export_row,
+)
+from .models import ExportJob, Order
+
+
+# A RUNNING job not finished after this long (seconds) is taken to belong
+# to a crashed worker and can be claimed again
+DEFAULT_JOB_TIMEOUT = 60 * 60
+
+
+def export_root():
+    """Local scratch directory for the partition files."""
+    return str(getattr(settings, "EXPORT_ROOT", settings.BASE_DIR / "exports"))
+
+
+def export_storage():
+    """Storage the finished files are saved to and downloaded from."""
+    path = getattr(settings, "EXPORT_STORAGE", None)
+    return import_string(path)() if path else default_storage
+
+
+def claimable_jobs():
+    """Pending jobs, and running ones whose worker seems to have died."""
+    timeout = getattr(settings, "EXPORT_JOB_TIMEOUT", DEFAULT_JOB_TIMEOUT)
+    stale = timezone.now() - timedelta(seconds=timeout)
+    return ExportJob.objects.filter(
+        Q(status=ExportJob.STATUS_PENDING)
+        | Q(status=ExportJob.STATUS_RUNNING, started_at__lt=stale)
+    )
+
+
+def partition_range(start_date, end_date, partition):
+    """Return inclusive (start, end) date pairs covering the range."""
+    step = timedelta(days=7 if partition == ExportJob.PARTITION_WEEK else 1)
+    parts = []
+    current = start_date
+    while current <= end_date:
+        last = min(current + step - timedelta(days=1), end_date)
+        parts.append((current, last))
+        current = last + timedelta(days=1)
+    return parts
+
+
+def _write_gzip_csv(path, rows):
+    with gzip.open(path, "wt", newline="") as fh:
+        writer = csv.writer(fh)
+        for row in rows:
+            writer.writerow(row)
+
+
+def export_partition(start_date, end_date, path):
+    """Write one partition (no header) to ``path``; return the row count."""
+    qs = filter_created_between(
+        Order.objects.order_by("created_at", "id"), start_date, end_date
+    )
+    count = 0
+
+    def rows():
+        nonlocal count
+        for values in export_rows(qs):
+            count += 1
+            yield order_export_row(values)
+
+    _write_gzip_csv(path, rows())
+    return count
+
+
+def _init_worker():
+    # Spawned processes start without Django; forked ones must not reuse
+    # the parent's database sockets.
+    django.setup()
+    connections.close_all()
+
+
+def _claim(job):
+    """Atomically move a claimable job to RUNNING; False if someone else did."""
+    claimed = (
+        claimable_jobs()
+        .filter(pk=job.pk)
+        .update(
+            status=ExportJob.STATUS_RUNNING,
+            started_at=timezone.now(),
+            partitions_done=0,
+        )
+    )
+    return claimed == 1
+
+
+def run_export_job(job, processes=1):
+    """
+    Run a pending (or stale running) job to completion. With
+    ``processes`` > 1 the partitions are exported in parallel by a process
+    pool; progress is saved after each finished partition.
+    """
+    if not _claim(job):
+        return False
+    job.refresh_from_db()
+
+    parts = partition_range(job.start_date, job.end_date, job.partition)
+    ExportJob.objects.filter(pk=job.pk).update(partitions_total=len(parts))
+
+    os.makedirs(export_root(), exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix=f"export-{job.pk}-", dir=export_root())
+    try:
+        header_path = os.path.join(workdir, "header.csv.gz")
+        _write_gzip_csv(header_path, [ORDER_EXPORT_HEADER])
+        part_paths = [
+            os.path.join(workdir, f"part-{index:05d}.csv.gz")
+            for index in range(len(parts))
+        ]
+
+        def done_one():
+            ExportJob.objects.filter(pk=job.pk).update(
+                partitions_done=F("partitions_done") + 1
+            )
+
+        if processes > 1:
+            # Children open their own connections
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=processes, initializer=_init_worker
+            ) as pool:
+                futures = [
+                    pool.submit(export_partition, start, end, path)
+                    for (start, end), path in zip(parts, part_paths)
+                ]
+                for future in as_completed(futures):
+                    future.result()
+                    done_one()
+        else:
+            for (start, end), path in zip(parts, part_paths):
+                export_partition(start, end, path)
+                done_one()
+
+        final_path = os.path.join(workdir, "export.csv.gz")
+        with open(final_path, "wb") as out:
+            for path in [header_path] + part_paths:
+                with open(path, "rb") as part:
+                    shutil.copyfileobj(part, out)
+        with open(final_path, "rb") as fh:
+            # Unguessable, as some storages serve files by URL
+            name = export_storage().save(
+                f"exports/export-{job.pk}-{secrets.token_hex(8)}.csv.gz", File(fh)
+            )
+    except Exception as exc:
+        ExportJob.objects.filter(pk=job.pk).update(
+            status=ExportJob.STATUS_FAILED,
+            error=str(exc)[:2000],
+            finished_at=timezone.now(),
+        )
+        raise
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    ExportJob.objects.filter(pk=job.pk).update(
+        status=ExportJob.STATUS_DONE,
+        file_path=name,
+        finished_at=timezone.now(),
+    )
+    return True
@@ -0,0 +1,237 @@
+"""
+Order exports streamed straight from a database cursor.
+
+Rows are read with ``values_list(...).iterator()`` (one joined query,
+server-side cursor where the database supports it) and written out in
+blocks, so memory stays flat whatever the date range. The NDJSON feed
+for machine consumers is paged with a keyset cursor instead.
+"""
+
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Order, OrderItem
+
+# Rows fetched per cursor round-trip
+EXPORT_CHUNK_SIZE = 2000
+# CSV lines joined into one chunk of the HTTP response
+LINES_PER_BLOCK = 500
+# Orders per page of the NDJSON feed
+FEED_PAGE_SIZE = 1000
+MAX_FEED_PAGE_SIZE = 5000
+FEED_CURSOR_SALT = "orders.feed"
+
+ORDER_EXPORT_HEADER = [
+    "id",
+    "created_at",
+    "user",
+    "restaurant",
+    "status",
+    "total_items",
+    "total_amount",
+]
+ORDER_EXPORT_FIELDS = (
+    "id",
+    "created_at",
+    "user__username",
+    "restaurant__name",
+    "status",
+    "items_count",
+    "total_amount",
+)
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def csv_blocks(header, rows):
+    """Yield the CSV text for ``header`` and ``rows`` in blocks of lines."""
+    writer = csv.writer(_Echo())
+    block = [writer.writerow(header)]
+    for row in rows:
+        block.append(writer.writerow(row))
+        if len(block) >= LINES_PER_BLOCK:
+            yield "".join(block)
+            block = []
+    if block:
+        yield "".join(block)
+
+
+def streaming_csv_response(filename, header, rows):
+    response = StreamingHttpResponse(csv_blocks(header, rows), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def parse_date_range(start, end):
+    """Return (start_date, end_date), each None when missing or invalid."""
+    try:
+        start_date = parse_date(start) if start else None
+        end_date = parse_date(end) if end else None
+    except ValueError:
+        start_date = end_date = None
+    return start_date, end_date
+
+
+def filter_created_between(qs, start_date=None, end_date=None):
+    """
+    Keep orders created on the given (local) days, inclusive. Uses a plain
+    range on created_at rather than ``__date`` so an index can be used.
+    """
+    if start_date:
+        qs = qs.filter(
+            created_at__gte=timezone.make_aware(datetime.combine(start_date, time.min))
+        )
+    if end_date:
+        next_day = end_date + timedelta(days=1)
+        qs = qs.filter(
+            created_at__lt=timezone.make_aware(datetime.combine(next_day, time.min))
+        )
+    return qs
+
+
+def export_rows(qs, fields=ORDER_EXPORT_FIELDS):
+    """Iterate ``fields`` of ``qs`` in cursor chunks, without building models."""
+    return qs.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def order_export_row(values):
+    """Format one ``ORDER_EXPORT_FIELDS`` tuple as a CSV row."""
+    pk, created_at, user, restaurant, status, count, amount = values
+    return [
+        pk,
+        timezone.localtime(created_at).isoformat(),
+        user or "",
+        restaurant or "",
+        status,
+        count,
+        f"{amount:.2f}",
+    ]
+
+
+# Machine feed: pages of orders (with items) as NDJSON, keyset-paginated on
+# (created_at, id) so every page is one index range scan.
+
+FEED_ORDER_FIELDS = (
+    "id",
+    "created_at",
+    "updated_at",
+    "user__username",
+    "restaurant_id",
+    "restaurant__name",
+    "rider_id",
+    "status",
+    "items_count",
+    "total_amount",
+)
+FEED_ITEM_FIELDS = ("order_id", "dish_id", "dish_name", "unit_price", "quantity")
+
+
+class InvalidFeedCursor(ValueError):
+    pass
+
+
+def encode_feed_cursor(created_at, pk, updated_since=None):
+    """Opaque, signed cursor; it also carries ``updated_since`` so clients just follow it."""
+    return signing.dumps(
+        [
+            created_at.isoformat(),
+            pk,
+            updated_since.isoformat() if updated_since else None,
+        ],
+        salt=FEED_CURSOR_SALT,
+    )
+
+
+def decode_feed_cursor(cursor):
+    """Return (created_at, pk, updated_since) or raise InvalidFeedCursor."""
+    try:
+        created_at, pk, updated_since = signing.loads(cursor, salt=FEED_CURSOR_SALT)
+        return (
+            parse_datetime(created_at),
+            int(pk),
+            parse_datetime(updated_since) if updated_since else None,
+        )
+    except (signing.BadSignature, TypeError, ValueError):
+        raise InvalidFeedCursor("Invalid cursor.")
+
+
+def parse_updated_since(value):
+    """ISO date or datetime (naive values are local time); None if missing."""
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            parsed = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError("updated_since must be an ISO date or datetime.")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def order_feed_page(after=None, updated_since=None, limit=FEED_PAGE_SIZE):
+    """
+    One page of the feed: ``(orders, next_cursor)``. ``after`` is the
+    decoded ``(created_at, id)`` of the last order already seen. Items come
+    from a single extra query for the whole page. ``next_cursor`` is None on
+    the last page.
+    """
+    qs = Order.objects.order_by("created_at", "id")
+    if updated_since is not None:
+        qs = qs.filter(updated_at__gte=updated_since)
+    if after is not None:
+        created_at, pk = after
+        qs = qs.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+        )
+    orders = list(qs.values(*FEED_ORDER_FIELDS)[:limit])
+
+    by_id = {}
+    for order in orders:
+        order["user"] = order.pop("user__username")
+        order["restaurant"] = order.pop("restaurant__name")
+        order["items"] = []
+        by_id[order["id"]] = order
+    if by_id:
+        items = (
+            OrderItem.objects.filter(order_id__in=by_id)
+            .order_by("order_id", "id")
+            .values_list(*FEED_ITEM_FIELDS)
+        )
+        for order_id, dish_id, name, price, qty in items:
+            by_id[order_id]["items"].append(
+                {
+                    "dish_id": dish_id,
+                    "dish_name": name,
+                    "unit_price": price,
+                    "quantity": qty,
+                }
+            )
+
+    next_cursor = None
+    if len(orders) == limit:
+        last = orders[-1]
+        next_cursor = encode_feed_cursor(last["created_at"], last["id"], updated_since)
+    return orders, next_cursor
+
+
+def ndjson_lines(records):
+    for record in records:
+        yield json.dumps(record, cls=DjangoJSONEncoder, separators=(",", ":")) + "\n"
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from orders import changefeed
+from orders.models import Order, OrderChange, OrderStatusEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Create OrderStatusEvent rows for orders that have none. Transitions "
+        "recorded by the database change feed are replayed; otherwise one "
+        "event with an unknown previous status is written at updated_at."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        qs = (
+            Order.objects.exclude(status=Order.STATUS_CREATED)
+            .filter(status_events__isnull=True)
+            .order_by("pk")
+            .values_list("pk", "restaurant_id", "status", "updated_at")
+        )
+
+        orders = written = 0
+        last_pk = 0
+        while True:
+            batch = list(qs.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            history = {}
+            for order_id, payload, at in (
+                OrderChange.objects.filter(
+                    order_id__in=[row[0] for row in batch],
+                    kind=changefeed.ORDER_STATUS,
+                )
+                .order_by("id")
+                .values_list("order_id", "payload", "created_at")
+            ):
+                history.setdefault(order_id, []).append((payload, at))
+
+            events = []
+            for pk, restaurant_id, status, updated_at in batch:
+                changes = history.get(pk) or [({"status": status}, updated_at)]
+                events.extend(
+                    OrderStatusEvent(
+                        order_id=pk,
+                        restaurant_id=restaurant_id,
+                        from_status=payload.get("previous") or "",
+                        to_status=payload["status"],
+                        at=at,
+                    )
+                    for payload, at in changes
+                )
+            with transaction.atomic():
+                OrderStatusEvent.objects.bulk_create(events)
+            orders += len(batch)
+            written += len(events)
+            last_pk = batch[-1][0]
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Backfilled {written} status events for {orders} orders."
+            )
+        )
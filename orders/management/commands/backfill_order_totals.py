@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = "Fill Order.items_count and Order.total_amount from order items"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute every order, not only those with no items counted",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        qs = Order.objects.all()
+        if not options["all"]:
+            qs = qs.filter(items_count=0)
+        qs = qs.with_totals().order_by("pk")
+
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                qs.filter(pk__gt=last_pk).only("pk", "items_count", "total_amount")[
+                    :batch_size
+                ]
+            )
+            if not batch:
+                break
+            for order in batch:
+                order.items_count = order.items_quantity
+                order.total_amount = order.items_amount
+            with transaction.atomic():
+                Order.objects.bulk_update(batch, ["items_count", "total_amount"])
+            updated += len(batch)
+            last_pk = batch[-1].pk
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Backfilled totals for {updated} orders.")
+        )
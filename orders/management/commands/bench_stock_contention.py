@@ -0,0 +1,105 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+from decimal import Decimal
+
+from menu.models import Dish
+from orders.models import Order
+from orders.services import CheckoutError, place_order
+from restaurants.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark: many threads check out the same stocked dish at once. "
+        "Reports throughput and verifies nothing was oversold. "
+        "Creates its own data and removes it afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--attempts", type=int, default=25, help="per thread")
+        parser.add_argument("--stock", type=int, default=200)
+
+    def handle(self, *args, **options):
+        threads = options["threads"]
+        attempts = options["attempts"]
+        stock = options["stock"]
+
+        User = get_user_model()
+        user, created = User.objects.get_or_create(username="bench_stock_user")
+        restaurant = Restaurant.objects.create(
+            owner=user,
+            name="Bench Kitchen",
+            address="Bench street 1",
+            opening_hours="00:00-23:59",
+        )
+        dish = Dish.objects.create(
+            restaurant=restaurant, name="Hot item", price=Decimal("5.00"), stock=stock
+        )
+        cart = {str(dish.id): 1}
+        counts = {"placed": 0, "sold_out": 0, "db_busy": 0}
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                for _ in range(attempts):
+                    try:
+                        place_order(user, cart)
+                        outcome = "placed"
+                    except CheckoutError:
+                        outcome = "sold_out"
+                    except OperationalError:
+                        # e.g. SQLite "database is locked"; Postgres never gets here
+                        outcome = "db_busy"
+                    with lock:
+                        counts[outcome] += 1
+            finally:
+                connection.close()
+
+        try:
+            pool = [threading.Thread(target=worker) for _ in range(threads)]
+            started = time.perf_counter()
+            for t in pool:
+                t.start()
+            for t in pool:
+                t.join()
+            elapsed = time.perf_counter() - started
+
+            dish.refresh_from_db()
+            orders = Order.objects.filter(restaurant=restaurant).count()
+            total = threads * attempts
+            self.stdout.write(
+                f"{connection.vendor}: {threads} threads x {attempts} attempts"
+            )
+            self.stdout.write(
+                f"  {total / elapsed:.1f} checkouts/s over {elapsed:.2f}s "
+                f"(placed={counts['placed']}, sold out={counts['sold_out']}, "
+                f"db busy={counts['db_busy']})"
+            )
+            self.stdout.write(
+                f"  stock left={dish.stock}, available={dish.available}, orders={orders}"
+            )
+
+            if connection.vendor == "sqlite":
+                self.stdout.write(
+                    "  note: SQLite allows one writer at a time; point DATABASE_URL "
+                    "at PostgreSQL for representative numbers."
+                )
+
+            oversold = orders + dish.stock != stock
+            if oversold:
+                self.stderr.write(
+                    self.style.ERROR("Stock accounting mismatch: oversold!")
+                )
+            else:
+                self.stdout.write(self.style.SUCCESS("No overselling."))
+        finally:
+            with transaction.atomic():
+                Order.objects.filter(restaurant=restaurant).delete()
+                restaurant.delete()
+                if created:
+                    user.delete()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from orders.models import CheckoutIdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete expired checkout idempotency keys"
+
+    def handle(self, *args, **options):
+        deleted, _ = CheckoutIdempotencyKey.objects.filter(
+            expires_at__lte=timezone.now()
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired keys."))
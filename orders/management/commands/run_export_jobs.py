@@ -0,0 +1,53 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.export_jobs import claimable_jobs, run_export_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Run pending order export jobs (and ones left running by a crashed "
+        "worker). Each job's range is exported in day/week partitions across "
+        "a process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="worker processes per job (1 = run inline)",
+        )
+        parser.add_argument(
+            "--loop", action="store_true", help="keep polling for new jobs"
+        )
+        parser.add_argument(
+            "--sleep", type=float, default=5.0, help="seconds between polls"
+        )
+
+    def handle(self, *args, **options):
+        processes = max(1, options["processes"])
+        while True:
+            job = claimable_jobs().order_by("created_at", "id").first()
+            if job is None:
+                if not options["loop"]:
+                    break
+                time.sleep(options["sleep"])
+                continue
+
+            started = time.perf_counter()
+            try:
+                ran = run_export_job(job, processes=processes)
+            except Exception as exc:
+                self.stderr.write(self.style.ERROR(f"{job}: {exc}"))
+                continue
+            if ran:
+                job.refresh_from_db()
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"{job} -> {job.file_path} "
+                        f"({time.perf_counter() - started:.1f}s)"
+                    )
+                )
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.notifications import DRAIN_BATCH_SIZE, drain_outbox
+
+# Longest wait between drains while the mail server or database is down
+MAX_BACKOFF = 5 * 60
+
+
+class Command(BaseCommand):
+    help = "Send pending outbox emails in batches over one reused mail connection"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=DRAIN_BATCH_SIZE)
+        parser.add_argument(
+            "--loop", action="store_true", help="keep draining every --interval"
+        )
+        parser.add_argument("--interval", type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        delay = options["interval"]
+        while True:
+            try:
+                sent, failed = drain_outbox(batch_size=max(1, options["batch_size"]))
+            except Exception as exc:
+                self.stderr.write(self.style.ERROR(f"Drain failed: {exc}"))
+                # Back off while the outage lasts; pending rows stay queued
+                delay = min(max(delay, options["interval"]) * 2, MAX_BACKOFF)
+            else:
+                self.stdout.write(f"Sent {sent} emails, {failed} failed.")
+                delay = options["interval"]
+            if not options["loop"]:
+                break
+            time.sleep(delay)
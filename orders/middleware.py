@@ -0,0 +1,18 @@
+from .cart_storage import REQUEST_STORAGE_ATTR
+
+
+class CartStorageMiddleware:
+    """
+    Let the cart storage used during the request write to the response
+    (the cookie backend sets or deletes its cookie here).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        storage = getattr(request, REQUEST_STORAGE_ATTR, None)
+        if storage is not None:
+            storage.update_response(response)
+        return response
@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-18 18:14
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0005_checkoutidempotencykey"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="items_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="total_amount",
+            field=models.DecimalField(
+                decimal_places=2, default=Decimal("0.00"), max_digits=10
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-18 18:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0009_orderchange"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["restaurant", "updated_at"], name="order_rest_updated_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2 on 2026-10-18 18:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0002_restaurant_cover_image_restaurant_description"),
+        ("orders", "0010_order_restaurant_updated_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StageDurationSketch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("stage", models.CharField(max_length=32)),
+                ("hour", models.PositiveSmallIntegerField()),
+                ("buckets", models.JSONField(default=dict)),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("p50", models.FloatField(blank=True, null=True)),
+                ("p90", models.FloatField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "restaurant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stage_sketches",
+                        to="restaurants.restaurant",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="stagedurationsketch",
+            constraint=models.UniqueConstraint(
+                fields=("restaurant", "stage", "hour"), name="uniq_stage_sketch"
+            ),
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 4.2 on 2026-10-18 18:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0002_restaurant_cover_image_restaurant_description"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("orders", "0011_stagedurationsketch"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderStatusEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "from_status",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("CREATED", "Created"),
+                            ("PAID", "Paid"),
+                            ("PREPARING", "Preparing"),
+                            ("DELIVERING", "Delivering"),
+                            ("COMPLETED", "Completed"),
+                            ("CANCELLED", "Cancelled"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "to_status",
+                    models.CharField(
+                        choices=[
+                            ("CREATED", "Created"),
+                            ("PAID", "Paid"),
+                            ("PREPARING", "Preparing"),
+                            ("DELIVERING", "Delivering"),
+                            ("COMPLETED", "Completed"),
+                            ("CANCELLED", "Cancelled"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "actor",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="status_events",
+                        to="orders.order",
+                    ),
+                ),
+                (
+                    "restaurant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="order_status_events",
+                        to="restaurants.restaurant",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["at", "id"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="orderstatusevent",
+            index=models.Index(
+                fields=["restaurant", "to_status", "at"],
+                name="orderstatus_rest_to_at_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderstatusevent",
+            index=models.Index(fields=["order", "at"], name="orderstatus_order_at_idx"),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2 on 2026-10-18 19:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0012_orderstatusevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxEmail",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("kind", models.CharField(max_length=32)),
+                ("status", models.CharField(max_length=20)),
+                ("subject", models.CharField(max_length=255)),
+                ("body", models.TextField()),
+                ("to", models.EmailField(max_length=254)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True)),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="outbox_emails",
+                        to="orders.order",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["id"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="outboxemail",
+            index=models.Index(
+                condition=models.Q(("sent_at__isnull", True)),
+                fields=["id"],
+                name="outboxemail_pending_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="outboxemail",
+            constraint=models.UniqueConstraint(
+                fields=("order", "kind", "status"), name="outboxemail_dedup"
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2 on 2026-10-18 19:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0013_outboxemail"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderChangeLock",
+            fields=[
+                (
+                    "id",
+                    models.PositiveSmallIntegerField(
+                        default=1, primary_key=True, serialize=False
+                    ),
+                ),
+            ],
+        ),
+    ]
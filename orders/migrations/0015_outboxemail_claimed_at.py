@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 20:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0014_orderchangelock"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboxemail",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,11 +1,42 @@
+from decimal import Decimal
+
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from core.models import FieldTrackerMixin, TransitionConflict, compare_and_set
 from menu.models import Dish
 from restaurants.models import Restaurant
 
 
-class Order(models.Model):
+class OrderQuerySet(models.QuerySet):
+    def with_totals(self):
+        """
+        Annotate per-order item aggregates computed in SQL (one GROUP BY):
+        ``line_count``, ``items_quantity`` and ``items_amount``. Independent
+        of the stored ``items_count``/``total_amount`` columns.
+        """
+        return self.annotate(
+            line_count=Count("items"),
+            items_quantity=Coalesce(Sum("items__quantity"), 0),
+            items_amount=Coalesce(
+                Sum(F("items__unit_price") * F("items__quantity")),
+                Decimal("0.00"),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            ),
+        )
+
+    def with_items(self):
+        """Prefetch order items (one extra query for the whole page)."""
+        return self.prefetch_related("items")
+
+    def for_listing(self):
+        """Join customer and restaurant, which every listing row shows."""
+        return self.select_related("user", "restaurant")
+
+
+class Order(FieldTrackerMixin, models.Model):
     STATUS_CREATED = "CREATED"
     STATUS_PAID = "PAID"
     STATUS_PREPARING = "PREPARING"
@@ -55,13 +86,31 @@ class Order(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    # Old values read by the status signal handlers (see FieldTrackerMixin)
+    tracked_fields = ("status", "updated_at")
+
+    # Denormalized from the (immutable) items, written once at checkout
+    items_count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(
+        max_digits=10, decimal_places=2, default=Decimal("0.00")
+    )
+
+    class Meta:
+        indexes = [
+            # Keyset paging of exports/feeds and incremental (updated_since) loads
+            models.Index(fields=["created_at", "id"], name="order_created_id_idx"),
+            models.Index(fields=["updated_at"], name="order_updated_at_idx"),
+            # Owner board deltas: per-restaurant range scans on updated_at
+            models.Index(
+                fields=["restaurant", "updated_at"], name="order_rest_updated_idx"
+            ),
+        ]
+
     def __str__(self):
         return f"Order #{self.pk} by {self.user} [{self.status}]"
 
-    @property
-    def total_amount(self):
-        return sum(item.total_price for item in self.items.all())
-
     def can_advance_to(self, next_status: str) -> bool:
         """Allow only forward transitions along STATUS_FLOW."""
         if self.status == self.STATUS_CANCELLED:
@@ -73,12 +122,74 @@ class Order(models.Model):
             return False
         return nxt > cur  # strictly forward
 
-    def advance_to(self, next_status: str) -> None:
-        """Advance status if forward, else raise ValueError."""
+    def advance_to(self, next_status: str, actor=None) -> None:
+        """
+        Advance status if forward, else raise ValueError. The change is a
+        single ``UPDATE ... WHERE status = <current>``: if another request
+        moved the order first, ``TransitionConflict`` (a ValueError) is
+        raised and nothing is written. The ``OrderStatusEvent`` is logged
+        in the same transaction.
+        """
         if not self.can_advance_to(next_status):
             raise ValueError("Invalid status transition")
-        self.status = next_status
-        self.save(update_fields=["status", "updated_at"])
+        previous = self.status
+        with transaction.atomic():
+            if not compare_and_set(
+                self,
+                {"status": previous},
+                status=next_status,
+                updated_at=timezone.now(),
+            ):
+                raise TransitionConflict("Order status changed concurrently")
+            OrderStatusEvent.objects.create(
+                order=self,
+                restaurant_id=self.restaurant_id,
+                from_status=previous,
+                to_status=next_status,
+                actor=actor,
+                at=self.updated_at,
+            )
+
+
+class OrderStatusEvent(models.Model):
+    """
+    Append-only log of order status transitions, written by
+    ``Order.advance_to``. ``restaurant`` is copied from the order so
+    time-in-state reports are index range scans per restaurant and status.
+    """
+
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="status_events"
+    )
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, related_name="order_status_events"
+    )
+    # Blank when not known (rows written by backfill_order_status_events)
+    from_status = models.CharField(
+        max_length=20, choices=Order.STATUS_CHOICES, blank=True
+    )
+    to_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["at", "id"]
+        indexes = [
+            models.Index(
+                fields=["restaurant", "to_status", "at"],
+                name="orderstatus_rest_to_at_idx",
+            ),
+            models.Index(fields=["order", "at"], name="orderstatus_order_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"Order #{self.order_id}: {self.from_status or '?'} -> {self.to_status}"
 
 
 class OrderItem(models.Model):
@@ -96,3 +207,211 @@ class OrderItem(models.Model):
     @property
     def total_price(self):
         return self.unit_price * self.quantity
+
+
+class CheckoutIdempotencyKey(models.Model):
+    """
+    Client-supplied key remembered for a checkout, so a retried POST
+    returns the original order instead of creating a new one.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="checkout_keys",
+    )
+    key = models.CharField(max_length=64)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"], name="uniq_checkout_idempotency_key"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.key} -> order #{self.order_id}"
+
+    @property
+    def is_expired(self) -> bool:
+        return self.expires_at <= timezone.now()
+
+
+class ExportJob(models.Model):
+    """
+    Background CSV export of orders for a date range, produced by the
+    ``run_export_jobs`` worker command as one gzip file in the export
+    storage (``file_path`` is its storage name).
+    """
+
+    STATUS_PENDING = "PENDING"
+    STATUS_RUNNING = "RUNNING"
+    STATUS_DONE = "DONE"
+    STATUS_FAILED = "FAILED"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    PARTITION_DAY = "day"
+    PARTITION_WEEK = "week"
+
+    PARTITION_CHOICES = [
+        (PARTITION_DAY, "Day"),
+        (PARTITION_WEEK, "Week"),
+    ]
+
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="export_jobs",
+    )
+    start_date = models.DateField()
+    end_date = models.DateField()
+    partition = models.CharField(
+        max_length=10, choices=PARTITION_CHOICES, default=PARTITION_WEEK
+    )
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True
+    )
+    partitions_total = models.PositiveIntegerField(default=0)
+    partitions_done = models.PositiveIntegerField(default=0)
+    file_path = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Export #{self.pk} {self.start_date}..{self.end_date} [{self.status}]"
+
+    @property
+    def progress(self) -> int:
+        """Completion percentage (0-100)."""
+        if self.status == self.STATUS_DONE:
+            return 100
+        if not self.partitions_total:
+            return 0
+        return int(self.partitions_done * 100 / self.partitions_total)
+
+    @property
+    def download_name(self) -> str:
+        return f"orders_{self.start_date}_{self.end_date}.csv.gz"
+
+
+class OrderChange(models.Model):
+    """
+    One change feed record, stored by ``changefeed.DatabaseChangeFeed``.
+    The id is the record's version; ids are assigned and committed under
+    ``OrderChangeLock``, so they become visible in increasing order.
+    """
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="changes")
+    kind = models.CharField(max_length=32)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["order", "id"], name="orderchange_order_id_idx")
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} order={self.order_id} {self.kind}"
+
+
+class OrderChangeLock(models.Model):
+    """
+    Single row locked by ``changefeed.DatabaseChangeFeed`` while it inserts
+    and commits records, so ``OrderChange`` ids become visible in order.
+    """
+
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+
+
+class OutboxEmail(models.Model):
+    """
+    A customer email waiting to be sent by ``send_outbox_emails``. Rows are
+    written in the same transaction as the status change they announce, so
+    rolled back changes send nothing; ``(order, kind, status)`` is unique,
+    so each transition is announced at most once. ``claimed_at`` is set
+    while a drain is sending the row.
+    """
+
+    KIND_ORDER_STATUS = "order.status"
+    KIND_DELIVERY_STATUS = "delivery.status"
+
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="outbox_emails"
+    )
+    kind = models.CharField(max_length=32)
+    status = models.CharField(max_length=20)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    to = models.EmailField()
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["order", "kind", "status"], name="outboxemail_dedup"
+            )
+        ]
+        indexes = [
+            # Only unsent rows, so the drain query stays small
+            models.Index(
+                fields=["id"],
+                condition=models.Q(sent_at__isnull=True),
+                name="outboxemail_pending_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.status} for order #{self.order_id} to {self.to}"
+
+
+class StageDurationSketch(models.Model):
+    """
+    Streaming quantile sketch of how long orders of a restaurant spend in
+    one stage (see ``orders.eta``), for one local hour of day, or for all
+    hours when ``hour`` is ``ALL_HOURS``. Updated one sample at a time.
+    """
+
+    ALL_HOURS = 24
+
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, related_name="stage_sketches"
+    )
+    stage = models.CharField(max_length=32)
+    hour = models.PositiveSmallIntegerField()
+    buckets = models.JSONField(default=dict)
+    count = models.PositiveIntegerField(default=0)
+    # Quantiles in seconds, refreshed on every update so reads are free
+    p50 = models.FloatField(null=True, blank=True)
+    p90 = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["restaurant", "stage", "hour"], name="uniq_stage_sketch"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.restaurant_id} {self.stage} h{self.hour} (n={self.count})"
@@ -0,0 +1,175 @@
+"""
+Customer emails about order and delivery status changes, through an outbox.
+
+Status changes queue ``OutboxEmail`` rows in their own transaction (one
+bulk insert, duplicates of an ``(order, kind, status)`` are skipped), so a
+request never talks to the mail server. ``drain_outbox`` (run by the
+``send_outbox_emails`` command) sends the pending rows in batches over
+one reused connection, recording each row's result.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+# Rows claimed, sent and marked per batch
+DRAIN_BATCH_SIZE = 100
+# Failed rows are retried by later drains until this many attempts
+MAX_ATTEMPTS = 5
+# Seconds after which rows claimed by an unfinished drain are sent again
+DEFAULT_CLAIM_TIMEOUT = 10 * 60
+
+
+def order_status_email(order):
+    """Unsaved outbox row announcing ``order.status``; None without an address."""
+    if not order.user.email:
+        return None
+    return OutboxEmail(
+        order=order,
+        kind=OutboxEmail.KIND_ORDER_STATUS,
+        status=order.status,
+        subject=f"Your order #{order.id} status changed: {order.status}",
+        body=f"Order #{order.id} is now {order.status}.",
+        to=order.user.email,
+    )
+
+
+def delivery_status_email(delivery):
+    """Unsaved outbox row announcing ``delivery.status``; None without an address."""
+    order = delivery.order
+    if not order.user.email:
+        return None
+    status_lower = delivery.status.replace("_", " ").lower()
+    return OutboxEmail(
+        order=order,
+        kind=OutboxEmail.KIND_DELIVERY_STATUS,
+        status=delivery.status,
+        subject=f"Your order #{order.id} has been {status_lower}",
+        body=f"Order #{order.id} status changed to {delivery.status}.",
+        to=order.user.email,
+    )
+
+
+def queue_emails(emails):
+    """Insert the outbox rows (None entries skipped) that are not queued yet."""
+    rows = [email for email in emails if email is not None]
+    if rows:
+        OutboxEmail.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+def queue_status_emails(orders):
+    queue_emails(order_status_email(order) for order in orders)
+
+
+def pending_emails():
+    """Unsent rows not being sent by another drain (or claimed by a dead one)."""
+    timeout = getattr(settings, "OUTBOX_CLAIM_TIMEOUT", DEFAULT_CLAIM_TIMEOUT)
+    stale = timezone.now() - timedelta(seconds=timeout)
+    return OutboxEmail.objects.filter(
+        Q(claimed_at__isnull=True) | Q(claimed_at__lt=stale),
+        sent_at__isnull=True,
+        attempts__lt=MAX_ATTEMPTS,
+    )
+
+
+def _message(row):
+    return EmailMessage(
+        row.subject,
+        row.body,
+        getattr(settings, "DEFAULT_FROM_EMAIL", None),
+        [row.to],
+    )
+
+
+def _send_rows(connection, rows):
+    """
+    Send ``rows`` in order; return ``(sent row ids, {row id: error})``.
+
+    Each message is its own ``send_messages`` call on the open connection:
+    the SMTP backend sends a list one message at a time anyway, and raises
+    at the first failure without saying which ones already went out, so a
+    failed list could not be retried without duplicates. After a failure
+    the connection is reopened; if that fails too, the remaining rows are
+    left untouched for the next drain.
+    """
+    sent, errors = [], {}
+    for row in rows:
+        try:
+            connection.send_messages([_message(row)])
+        except Exception as exc:
+            errors[row.id] = repr(exc)
+            try:
+                connection.close()
+                connection.open()
+            except Exception:
+                break
+        else:
+            sent.append(row.id)
+    return sent, errors
+
+
+def _claim_batch(after, batch_size):
+    """
+    Mark the next pending rows after id ``after`` as being sent and return
+    them. The row locks (``SKIP LOCKED`` where supported, so side by side
+    drains take different rows) are held only for this short transaction.
+    """
+    with transaction.atomic():
+        rows = list(
+            pending_emails()
+            .select_for_update(skip_locked=True)
+            .filter(id__gt=after)
+            .order_by("id")[:batch_size]
+        )
+        if rows:
+            OutboxEmail.objects.filter(id__in=[row.id for row in rows]).update(
+                claimed_at=timezone.now()
+            )
+    return rows
+
+
+def drain_outbox(batch_size=DRAIN_BATCH_SIZE, connection=None):
+    """
+    Send every pending outbox email, oldest first, and return
+    ``(sent, failed)``. Each batch is claimed in its own short transaction
+    and sent outside of it, so no transaction stays open during SMTP I/O;
+    sent rows are then marked, failed rows keep their error and are
+    retried by a later drain. Rows of a drain that dies after claiming
+    them are sent again once ``OUTBOX_CLAIM_TIMEOUT`` has passed.
+    """
+    sent = failed = 0
+    last_id = 0
+    with connection or get_connection() as connection:
+        while True:
+            rows = _claim_batch(last_id, batch_size)
+            if not rows:
+                break
+            last_id = rows[-1].id
+            sent_ids, errors = _send_rows(connection, rows)
+            with transaction.atomic():
+                OutboxEmail.objects.filter(id__in=sent_ids).update(
+                    sent_at=timezone.now(), claimed_at=None, attempts=F("attempts") + 1
+                )
+                for row in rows:
+                    row.claimed_at = None
+                    if row.id in errors:
+                        row.attempts += 1
+                        row.last_error = errors[row.id]
+                        logger.warning("Could not send %s: %s", row, row.last_error)
+                # Failed rows, and the ones left unsent after a lost connection
+                OutboxEmail.objects.bulk_update(
+                    [row for row in rows if row.id not in sent_ids],
+                    ["claimed_at", "attempts", "last_error"],
+                )
+            sent += len(sent_ids)
+            failed += len(errors)
+    return sent, failed
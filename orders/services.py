@@ -0,0 +1,261 @@
+"""
+Order write paths that must run as one unit of work.
+"""
+
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core.models import TransitionConflict
+from menu.models import Dish
+from .models import CheckoutIdempotencyKey, Order, OrderItem, OrderStatusEvent
+from .signals import orders_transitioned
+
+# How long a checkout idempotency key is honoured (seconds)
+DEFAULT_IDEMPOTENCY_TTL = 60 * 60 * 24
+MAX_IDEMPOTENCY_KEY_LENGTH = 64
+# Orders one bulk transition may touch (keeps the IN lists bounded)
+MAX_BULK_TRANSITION = 200
+
+
+class CheckoutError(ValueError):
+    """The cart cannot be turned into an order; message is user-facing."""
+
+
+class BulkTransitionError(ValueError):
+    """Some selected orders cannot make the transition; message is user-facing."""
+
+
+def _parse_total(value):
+    if value in (None, ""):
+        return None
+    try:
+        return Decimal(str(value)).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        return None
+
+
+def _replayed_order(user, key):
+    """Order previously placed with this key, or None (expired keys are dropped)."""
+    record = (
+        CheckoutIdempotencyKey.objects.select_related("order")
+        .filter(user=user, key=key)
+        .first()
+    )
+    if record is None:
+        return None
+    if record.is_expired:
+        record.delete()
+        return None
+    return record.order
+
+
+def place_order(user, cart, expected_total=None, idempotency_key=None) -> Order:
+    """
+    Turn a cart mapping ``{"<dish_id>": qty}`` into a persisted Order.
+
+    With an ``idempotency_key``, a retry of the same checkout returns the
+    original order after one indexed lookup instead of creating a new one.
+    Keys expire after ``CHECKOUT_IDEMPOTENCY_TTL`` seconds.
+    """
+    if not idempotency_key:
+        return _create_order(user, cart, expected_total)
+
+    key = str(idempotency_key).strip()
+    if not key or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise CheckoutError("Invalid idempotency key.")
+
+    order = _replayed_order(user, key)
+    if order is not None:
+        return order
+    try:
+        return _create_order(user, cart, expected_total, key)
+    except IntegrityError:
+        # A concurrent retry with the same key won the race: return its order
+        order = _replayed_order(user, key)
+        if order is None:
+            raise
+        return order
+
+
+def _raise_stock_error(stocked, prices):
+    """Explain why ``decrement_stock(stocked, prices)`` took nothing."""
+    current = list(Dish.objects.filter(id__in=stocked).order_by("id"))
+    unavailable = [d.name for d in current if not d.available]
+    if unavailable:
+        raise CheckoutError(
+            "No longer available: "
+            + ", ".join(unavailable)
+            + ". Please update your cart."
+        )
+    if any(d.price != prices[d.id] for d in current):
+        raise CheckoutError("Prices have changed. Please review your cart.")
+    short = [d.name for d in current if d.stock is None or d.stock < stocked[d.id]] or [
+        d.name for d in current
+    ]
+    raise CheckoutError(
+        "Not enough left of: " + ", ".join(short) + ". Please update your cart."
+    )
+
+
+@transaction.atomic
+def _create_order(user, cart, expected_total=None, idempotency_key=None) -> Order:
+    """
+    Dishes are read and revalidated (single restaurant, all still
+    available, total unchanged when ``expected_total`` is given), stocked
+    dishes are decremented with one conditional UPDATE, then the items are
+    written with a single bulk insert. Any failure raises CheckoutError
+    and rolls everything back. The order is saved with its totals.
+
+    Only dishes without a stock count are locked (``FOR UPDATE``) so their
+    price and availability can't change before the order commits. Stocked
+    dishes are not: the UPDATE only takes units from rows still available
+    at the price just checked, and holds their row locks from then on, so
+    concurrent checkouts of a popular dish wait on each other for that
+    UPDATE only, not for the whole checkout.
+    """
+    quantities = {int(did): int(qty) for did, qty in cart.items() if int(qty) > 0}
+    if not quantities:
+        raise CheckoutError("Your cart is empty.")
+
+    dishes = {d.id: d for d in Dish.objects.filter(id__in=quantities)}
+    unstocked = [pk for pk, d in dishes.items() if d.stock is None]
+    if unstocked:
+        # Re-read them locked, in primary key order so concurrent checkouts
+        # cannot deadlock
+        locked = Dish.objects.select_for_update().filter(id__in=unstocked)
+        for pk in unstocked:
+            del dishes[pk]
+        dishes.update((d.id, d) for d in locked.order_by("id"))
+    dishes = sorted(dishes.values(), key=lambda d: d.id)
+    if not dishes:
+        raise CheckoutError("Your cart is empty.")
+
+    restaurants = {d.restaurant_id for d in dishes}
+    if len(restaurants) != 1:
+        raise CheckoutError("Cart must contain items from a single restaurant.")
+
+    unavailable = [d.name for d in dishes if not d.available]
+    if unavailable:
+        raise CheckoutError(
+            "No longer available: "
+            + ", ".join(unavailable)
+            + ". Please update your cart."
+        )
+
+    total = sum((d.price * quantities[d.id] for d in dishes), Decimal("0.00"))
+    expected = _parse_total(expected_total)
+    if expected is not None and expected != total:
+        raise CheckoutError("Prices have changed. Please review your cart.")
+
+    # Conditional decrement: no read-modify-write, so concurrent checkouts
+    # of the same dish can never oversell
+    stocked = {d.id: quantities[d.id] for d in dishes if d.stock is not None}
+    prices = {d.id: d.price for d in dishes if d.id in stocked}
+    if not Dish.objects.decrement_stock(stocked, prices):
+        _raise_stock_error(stocked, prices)
+
+    order = Order.objects.create(
+        user=user,
+        restaurant_id=restaurants.pop(),
+        items_count=sum(quantities[d.id] for d in dishes),
+        total_amount=total,
+    )
+    OrderItem.objects.bulk_create(
+        [
+            OrderItem(
+                order=order,
+                dish=dish,
+                dish_name=dish.name,  # snapshot name
+                unit_price=dish.price,  # snapshot price
+                quantity=quantities[dish.id],
+            )
+            for dish in dishes
+        ]
+    )
+    if idempotency_key:
+        ttl = getattr(settings, "CHECKOUT_IDEMPOTENCY_TTL", DEFAULT_IDEMPOTENCY_TTL)
+        now = timezone.now()
+        CheckoutIdempotencyKey.objects.create(
+            user=user,
+            key=idempotency_key,
+            order=order,
+            created_at=now,
+            expires_at=now + timedelta(seconds=ttl),
+        )
+
+    return order
+
+
+def advance_orders(owner, order_ids, next_status, actor=None) -> list:
+    """
+    Move the ``owner``'s orders ``order_ids`` to ``next_status`` together.
+
+    Every transition is validated first; if any order is missing, not the
+    owner's or cannot advance, BulkTransitionError is raised and nothing
+    changes. The orders are then moved with one conditional UPDATE per
+    current status, their ``OrderStatusEvent`` rows are written with one
+    bulk insert, and ``signals.orders_transitioned`` runs once for the
+    batch (``QuerySet.update`` sends no ``post_save``), queueing the same
+    emails, change feed records and ETA samples as single transitions do.
+    If another request moved one of the orders in between,
+    TransitionConflict is raised and everything is rolled back. Returns
+    the updated orders.
+    """
+    ids = set(order_ids)
+    if not ids:
+        raise BulkTransitionError("No orders selected.")
+    if len(ids) > MAX_BULK_TRANSITION:
+        raise BulkTransitionError(
+            f"Select at most {MAX_BULK_TRANSITION} orders at a time."
+        )
+    orders = list(
+        Order.objects.select_related("user")
+        .filter(id__in=ids, restaurant__owner=owner)
+        .order_by("id")
+    )
+    invalid = sorted(ids - {o.id for o in orders}) + [
+        o.id for o in orders if not o.can_advance_to(next_status)
+    ]
+    if invalid:
+        raise BulkTransitionError(
+            f"Cannot move to {next_status}: "
+            + ", ".join(f"#{pk}" for pk in sorted(invalid))
+            + "."
+        )
+
+    previous = {o.id: o.status for o in orders}
+    by_status = {}
+    for order in orders:
+        by_status.setdefault(order.status, []).append(order.id)
+    now = timezone.now()
+    with transaction.atomic():
+        for status, pks in by_status.items():
+            moved = Order.objects.filter(id__in=pks, status=status).update(
+                status=next_status, updated_at=now
+            )
+            if moved != len(pks):
+                raise TransitionConflict("Order status changed concurrently")
+        OrderStatusEvent.objects.bulk_create(
+            [
+                OrderStatusEvent(
+                    order=order,
+                    restaurant_id=order.restaurant_id,
+                    from_status=previous[order.id],
+                    to_status=next_status,
+                    actor=actor,
+                    at=now,
+                )
+                for order in orders
+            ]
+        )
+        for order in orders:
+            order.status = next_status
+            order.updated_at = now
+        orders_transitioned(orders)
+    for order in orders:
+        order._record_loaded_values(["status", "updated_at"])
+    return orders
@@ -1,41 +1,60 @@
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.core.mail import send_mail
-from django.conf import settings
+from . import changefeed, eta, notifications
 from .models import Order
 
 
-@receiver(pre_save, sender=Order)
-def _store_old_status(sender, instance: Order, **kwargs):
-    if instance.pk:
-        try:
-            old = Order.objects.get(pk=instance.pk)
-            instance._old_status = old.status
-        except Order.DoesNotExist:
-            instance._old_status = None
-    else:
-        instance._old_status = None
+def orders_transitioned(orders):
+    """
+    Side effects of ``orders`` moving from their loaded status to
+    ``order.status``, for one order or a whole batch: the customer emails
+    go to the outbox in the current transaction, change feed records and
+    ETA samples are queued for after the commit (timed from the status
+    event log, see ``eta.status_entry_times``).
+
+    ``previous("status")`` and ``previous("updated_at")`` must still hold
+    the old values. Called by the post_save receiver below and by
+    ``services.advance_orders``, whose ``QuerySet.update`` sends no signal.
+    """
+    orders = list(orders)
+    # Same transaction as the change; sent later by send_outbox_emails
+    notifications.queue_status_emails(orders)
+    changefeed.publish_changes(
+        (
+            order.id,
+            changefeed.ORDER_STATUS,
+            {
+                "restaurant_id": order.restaurant_id,
+                "status": order.status,
+                "previous": order.previous("status"),
+            },
+        )
+        for order in orders
+    )
+    entered = eta.status_entry_times(orders)
+    eta.record_stages(
+        (
+            order.restaurant_id,
+            eta.order_stage(order.previous("status")),
+            entered[order.id],
+            order.updated_at,
+        )
+        for order in orders
+    )
 
 
 @receiver(post_save, sender=Order)
-def _notify_order_status_change(sender, instance: Order, created, **kwargs):
+def _order_saved(sender, instance: Order, created, **kwargs):
     if created:
+        changefeed.publish_change(
+            instance.id,
+            changefeed.ORDER_CREATED,
+            {
+                "restaurant_id": instance.restaurant_id,
+                "user_id": instance.user_id,
+                "status": instance.status,
+            },
+        )
         return
-    old = getattr(instance, "_old_status", None)
-    if not old or old == instance.status:
-        return
-
-    subj = f"Your order #{instance.id} status changed: {instance.status}"
-    msg = f"Order #{instance.id} is now {instance.status}."
-    to = [instance.user.email] if instance.user and instance.user.email else []
-    if to:
-        try:
-            send_mail(
-                subj,
-                msg,
-                getattr(settings, "DEFAULT_FROM_EMAIL", None),
-                to,
-                fail_silently=True,
-            )
-        except Exception:
-            pass
+    if instance.previous("status") and instance.has_changed("status"):
+        orders_transitioned([instance])
@@ -0,0 +1,126 @@
+import re
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import include, path, reverse
+
+from deliveries.models import Delivery, DeliveryEvent
+from foodhub.urls import urlpatterns as project_urlpatterns
+from menu.models import Dish
+from orders import urls as orders_urls
+from orders.models import Order
+from orders.views import acart_detail, acustomer_order_status_json
+from restaurants.models import Restaurant
+
+User = get_user_model()
+
+# Project URLs with the async views in front (as routed by ASYNC_READ_VIEWS)
+urlpatterns = [
+    path(
+        "orders/",
+        include(
+            (
+                [
+                    path("cart/", acart_detail, name="cart_detail"),
+                    path(
+                        "my/<int:pk>/status.json",
+                        acustomer_order_status_json,
+                        name="customer_order_status_json",
+                    ),
+                ]
+                + orders_urls.urlpatterns,
+                "orders",
+            )
+        ),
+    )
+] + [p for p in project_urlpatterns if str(p.pattern) != "orders/"]
+
+CSRF_TOKEN = re.compile(rb'name="csrfmiddlewaretoken" value="[^"]+"')
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncReadViewsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create_user(username="owner", password="pass123")
+        self.cust = User.objects.create_user(username="cust", password="pass123")
+        User.objects.create_user(username="other", password="pass123")
+        self.rest = Restaurant.objects.create(
+            owner=owner,
+            name="R",
+            address="A",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+        self.dish = Dish.objects.create(
+            restaurant=self.rest, name="Pasta", price=Decimal("10.00")
+        )
+        self.order = Order.objects.create(user=self.cust, restaurant=self.rest)
+        delivery = Delivery.objects.create(order=self.order, rider=owner)
+        DeliveryEvent.objects.create(
+            delivery=delivery, event_type="ASSIGNED", message="Assigned"
+        )
+        self.client.login(username="cust", password="pass123")
+        self.url = reverse("orders:customer_order_status_json", args=[self.order.id])
+
+    def _sync_get(self, url, **extra):
+        with override_settings(ROOT_URLCONF="foodhub.urls"):
+            return self.client.get(url, **extra)
+
+    def test_status_json_matches_sync_view(self):
+        expected = self._sync_get(self.url + "?since=0")
+        resp = self.client.get(self.url + "?since=0")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), expected.json())
+        for header in ("ETag", "Last-Modified", "Cache-Control"):
+            self.assertEqual(resp[header], expected[header])
+
+    async def test_status_json_not_modified_under_asgi(self):
+        self.async_client.cookies = self.client.cookies
+        resp = await self.async_client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        resp = await self.async_client.get(
+            self.url, headers={"If-None-Match": resp["ETag"]}
+        )
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.content, b"")
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                "LOCATION": "test_async_cache",
+            }
+        }
+    )
+    def test_status_json_under_asgi_with_database_cache(self):
+        # The async view must not touch a database cache synchronously
+        call_command("createcachetable", verbosity=0)
+        self.async_client.cookies = self.client.cookies
+        resp = async_to_sync(self.async_client.get)(self.url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), self._sync_get(self.url).json())
+
+    def test_status_json_access(self):
+        self.client.login(username="other", password="pass123")
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.logout()
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(resp["Location"], self._sync_get(self.url)["Location"])
+
+    def test_cart_detail_matches_sync_view(self):
+        self.client.post(reverse("orders:cart_add", args=[self.dish.id]))
+        self.client.post(reverse("orders:cart_add", args=[self.dish.id]))
+        self._sync_get(reverse("orders:cart_detail"))  # shows the flash messages
+        expected = self._sync_get(reverse("orders:cart_detail"))
+        resp = self.client.get(reverse("orders:cart_detail"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(
+            CSRF_TOKEN.sub(b"", resp.content), CSRF_TOKEN.sub(b"", expected.content)
+        )
+        self.assertContains(resp, "€ 20.00")
@@ -0,0 +1,132 @@
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from orders import changefeed
+from orders.models import Order, OrderStatusEvent, OutboxEmail, StageDurationSketch
+from orders.notifications import drain_outbox
+from orders.services import BulkTransitionError, advance_orders
+from restaurants.models import Restaurant
+
+User = get_user_model()
+
+
+@override_settings(
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    CHANGE_FEED_BACKEND="orders.changefeed.DatabaseChangeFeed",
+)
+class BulkTransitionTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="x")
+        self.cust = User.objects.create_user(
+            username="cust", password="x", email="cust@example.com"
+        )
+        self.rest = Restaurant.objects.create(
+            owner=self.owner,
+            name="R",
+            address="A",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+        self.url = reverse("orders:owner_orders_bulk_prepare")
+
+    def _orders(self, n, status=Order.STATUS_CREATED):
+        return [
+            Order.objects.create(user=self.cust, restaurant=self.rest, status=status)
+            for _ in range(n)
+        ]
+
+    def test_view_moves_selected_orders_and_queues_emails(self):
+        created = self._orders(2)
+        paid = self._orders(1, Order.STATUS_PAID)
+        untouched = self._orders(1)
+        self.client.login(username="owner", password="x")
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(self.url, {"order": [o.id for o in created + paid]})
+        self.assertRedirects(resp, reverse("orders:owner_list"))
+
+        moved = Order.objects.filter(status=Order.STATUS_PREPARING)
+        self.assertEqual({o.id for o in moved}, {o.id for o in created + paid})
+        self.assertEqual(
+            Order.objects.get(pk=untouched[0].pk).status, Order.STATUS_CREATED
+        )
+        self.assertEqual(
+            sorted(
+                OrderStatusEvent.objects.values_list("order_id", "from_status", "actor")
+            ),
+            sorted(
+                [(o.id, Order.STATUS_CREATED, self.owner.id) for o in created]
+                + [(paid[0].id, Order.STATUS_PAID, self.owner.id)]
+            ),
+        )
+        # One email per order (no duplicates from signal handlers)
+        self.assertEqual(drain_outbox(), (3, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        records = changefeed.get_change_feed().read(after=0)
+        self.assertEqual(
+            sorted(r.order_id for r in records if r.kind == changefeed.ORDER_STATUS),
+            sorted(o.id for o in created + paid),
+        )
+        # Both CREATED samples land in one sketch row update
+        sketch = StageDurationSketch.objects.get(
+            restaurant=self.rest,
+            stage="order:CREATED",
+            hour=StageDurationSketch.ALL_HOURS,
+        )
+        self.assertEqual(sketch.count, 2)
+
+    def test_same_effects_as_a_single_transition(self):
+        single, bulk = self._orders(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            single.advance_to(Order.STATUS_PREPARING)
+        with self.captureOnCommitCallbacks(execute=True):
+            advance_orders(self.owner, [bulk.id], Order.STATUS_PREPARING)
+
+        def effects(order):
+            records = changefeed.get_change_feed().read(after=0, order_id=order.id)
+            return (
+                [(r.kind, r.payload) for r in records],
+                list(
+                    OutboxEmail.objects.filter(order=order).values_list(
+                        "kind", "status"
+                    )
+                ),
+            )
+
+        self.assertEqual(effects(single), effects(bulk))
+        sketch = StageDurationSketch.objects.get(
+            restaurant=self.rest,
+            stage="order:CREATED",
+            hour=StageDurationSketch.ALL_HOURS,
+        )
+        self.assertEqual(sketch.count, 2)
+
+    def test_invalid_selection_changes_nothing(self):
+        other_owner = User.objects.create_user(username="other", password="x")
+        other_rest = Restaurant.objects.create(
+            owner=other_owner, name="O", address="B", opening_hours="09:00-18:00"
+        )
+        mine = self._orders(1)[0]
+        done = self._orders(1, Order.STATUS_COMPLETED)[0]
+        foreign = Order.objects.create(user=self.cust, restaurant=other_rest)
+        for selection in ([mine.id, done.id], [mine.id, foreign.id], []):
+            with self.assertRaises(BulkTransitionError):
+                advance_orders(self.owner, selection, Order.STATUS_PREPARING)
+        self.assertEqual(Order.objects.get(pk=mine.pk).status, Order.STATUS_CREATED)
+        self.assertFalse(OrderStatusEvent.objects.exists())
+
+        self.client.login(username="owner", password="x")
+        resp = self.client.post(self.url, {"order": [mine.id, done.id]}, follow=True)
+        self.assertContains(resp, f"Cannot move to PREPARING: #{done.id}.")
+
+    def test_queries_do_not_grow_with_selection(self):
+        def count(orders):
+            ids = [o.id for o in orders]
+            with CaptureQueriesContext(connection) as queries:
+                advance_orders(self.owner, ids, Order.STATUS_PREPARING)
+            return len(queries)
+
+        self.assertEqual(count(self._orders(2)), count(self._orders(20)))
@@ -47,7 +47,7 @@ class OwnerPrepareTests(TestCase):
 
     def test_owner_can_move_created_to_preparing(self):
         self.client.login(username="owner", password="pass123")
-        url = reverse("orders:owner_prepare", args=[self.order.id])
+        url = reverse("orders:owner_order_prepare", args=[self.order.id])
         resp = self.client.post(url, follow=True)
         self.order.refresh_from_db()
         self.assertEqual(resp.status_code, 200)
@@ -55,14 +55,14 @@ class OwnerPrepareTests(TestCase):
 
     def test_non_owner_cannot_prepare(self):
         self.client.login(username="other", password="pass123")
-        url = reverse("orders:owner_prepare", args=[self.order.id])
+        url = reverse("orders:owner_order_prepare", args=[self.order.id])
         resp = self.client.post(url)
         self.assertIn(resp.status_code, (302, 403, 404))  # blocked by mixin
 
     def test_backward_transition_blocked(self):
         # first move to PREPARING
         self.client.login(username="owner", password="pass123")
-        url = reverse("orders:owner_prepare", args=[self.order.id])
+        url = reverse("orders:owner_order_prepare", args=[self.order.id])
         self.client.post(url, follow=True)
         self.order.refresh_from_db()
         self.assertEqual(self.order.status, Order.STATUS_PREPARING)
@@ -0,0 +1,77 @@
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from decimal import Decimal
+
+from restaurants.models import Restaurant
+from menu.models import Dish
+
+User = get_user_model()
+
+
+class CartBatchTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(username="owner", password="pass123")
+        self.rest = Restaurant.objects.create(
+            owner=owner,
+            name="R",
+            address="A",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+        self.d1 = Dish.objects.create(
+            restaurant=self.rest, name="Pasta", price=Decimal("10.00"), available=True
+        )
+        self.d2 = Dish.objects.create(
+            restaurant=self.rest, name="Tiramisu", price=Decimal("6.00"), available=True
+        )
+        self.off = Dish.objects.create(
+            restaurant=self.rest, name="Soup", price=Decimal("4.00"), available=False
+        )
+        self.url = reverse("orders:cart_batch")
+
+    def post(self, operations):
+        return self.client.post(
+            self.url,
+            data=json.dumps({"operations": operations}),
+            content_type="application/json",
+        )
+
+    def test_applies_operations_and_returns_cart(self):
+        resp = self.post(
+            [
+                {"op": "add", "dish_id": self.d1.id, "quantity": 2},
+                {"op": "add", "dish_id": self.d2.id},
+                {"op": "set", "dish_id": self.d1.id, "quantity": 3},
+            ]
+        )
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data["total"], "36.00")
+        self.assertEqual(data["item_count"], 4)
+        self.assertEqual(len(data["lines"]), 2)
+
+        resp = self.post([{"op": "remove", "dish_id": self.d2.id}])
+        self.assertEqual(resp.json()["total"], "30.00")
+        self.assertEqual(self.client.session["cart"], {str(self.d1.id): 3})
+
+    def test_invalid_batch_leaves_cart_untouched(self):
+        self.post([{"op": "add", "dish_id": self.d1.id}])
+        resp = self.post(
+            [
+                {"op": "add", "dish_id": self.d2.id},
+                {"op": "add", "dish_id": self.off.id},
+            ]
+        )
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("error", resp.json())
+        self.assertEqual(self.client.session["cart"], {str(self.d1.id): 1})
+
+    def test_rejects_bad_payloads(self):
+        resp = self.client.post(self.url, data="nope", content_type="application/json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post([{"op": "explode", "dish_id": 1}]).status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 405)
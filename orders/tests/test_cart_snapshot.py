@@ -0,0 +1,77 @@
+from django.test import TestCase, RequestFactory
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from decimal import Decimal
+
+from restaurants.models import Restaurant
+from menu.models import Dish
+from orders.cart import CartSnapshot, get_cart_snapshot, invalidate_cart_snapshot
+
+User = get_user_model()
+
+
+class CartSnapshotTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(username="owner", password="pass123")
+        self.rest = Restaurant.objects.create(
+            owner=owner,
+            name="R",
+            address="A",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+        self.other_rest = Restaurant.objects.create(
+            owner=owner,
+            name="R2",
+            address="B",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+        self.d1 = Dish.objects.create(
+            restaurant=self.rest, name="Pasta", price=Decimal("10.00"), available=True
+        )
+        self.d2 = Dish.objects.create(
+            restaurant=self.rest,
+            name="Tiramisu",
+            price=Decimal("6.00"),
+            available=False,
+        )
+        self.d3 = Dish.objects.create(
+            restaurant=self.other_rest, name="Sushi", price=Decimal("12.50")
+        )
+
+    def test_lines_totals_and_flags(self):
+        snap = CartSnapshot({str(self.d1.id): 2, str(self.d2.id): 1, "9999": 3})
+        self.assertEqual(snap.item_count, 6)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(snap.lines), 2)
+            self.assertEqual(snap.total, Decimal("26.00"))
+            self.assertEqual(snap.restaurant_ids, {self.rest.id})
+            self.assertEqual(snap.unavailable_dish_ids, {self.d2.id})
+            self.assertEqual(snap.missing_dish_ids, {9999})
+            self.assertTrue(snap.is_single_restaurant)
+
+    def test_multi_restaurant_and_immutable(self):
+        snap = CartSnapshot({str(self.d1.id): 1, str(self.d3.id): 1})
+        self.assertFalse(snap.is_single_restaurant)
+        with self.assertRaises(AttributeError):
+            snap.total = Decimal("0")
+
+    def test_snapshot_is_memoized_on_request(self):
+        request = RequestFactory().get("/")
+        request.session = {"cart": {str(self.d1.id): 1}}
+        snap = get_cart_snapshot(request)
+        self.assertIs(get_cart_snapshot(request), snap)
+        invalidate_cart_snapshot(request)
+        self.assertIsNot(get_cart_snapshot(request), snap)
+
+    def test_cart_page_prices_cart_once(self):
+        session = self.client.session
+        session["cart"] = {str(self.d1.id): 2, str(self.d2.id): 1}
+        session.save()
+        resp = self.client.get(reverse("orders:cart_detail"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertIs(resp.context["cart"], resp.wsgi_request._cart_snapshot)
+        self.assertEqual(resp.context["cart_item_count"], 3)
+        self.assertEqual(resp.context["total"], Decimal("26.00"))
+        self.assertContains(resp, "Unavailable")
@@ -0,0 +1,80 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from decimal import Decimal
+
+from restaurants.models import Restaurant
+from menu.models import Dish
+from orders.models import Order
+
+User = get_user_model()
+
+CACHE_STORAGE = "orders.cart_storage.CacheCartStorage"
+COOKIE_STORAGE = "orders.cart_storage.CookieCartStorage"
+
+
+class CartStorageMixin:
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="cust", password="pass123")
+        owner = User.objects.create_user(username="owner", password="pass123")
+        self.rest = Restaurant.objects.create(
+            owner=owner,
+            name="R",
+            address="A",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+        self.dish = Dish.objects.create(
+            restaurant=self.rest, name="Pasta", price=Decimal("10.00"), available=True
+        )
+
+    def add_twice_and_check(self):
+        url = reverse("orders:cart_add", args=[self.dish.id])
+        self.client.post(url)
+        self.client.post(url)
+        resp = self.client.get(reverse("orders:cart_detail"))
+        self.assertEqual(resp.context["cart_item_count"], 2)
+        self.assertEqual(resp.context["total"], Decimal("20.00"))
+        return resp
+
+    def checkout_and_check_empty(self):
+        self.client.login(username="cust", password="pass123")
+        self.client.post(reverse("orders:checkout"))
+        self.assertEqual(Order.objects.count(), 1)
+        resp = self.client.get(reverse("orders:cart_detail"))
+        self.assertEqual(resp.context["cart_item_count"], 0)
+
+
+class SessionCartStorageTests(CartStorageMixin, TestCase):
+    def test_cart_kept_in_session(self):
+        self.add_twice_and_check()
+        self.assertEqual(self.client.session["cart"], {str(self.dish.id): 2})
+        self.checkout_and_check_empty()
+
+
+@override_settings(CART_STORAGE=CACHE_STORAGE)
+class CacheCartStorageTests(CartStorageMixin, TestCase):
+    def test_cart_kept_in_cache_and_survives_login(self):
+        self.add_twice_and_check()
+        self.assertNotIn("cart", self.client.session)
+        token = self.client.session["cart_token"]
+        self.assertEqual(cache.get(f"cart:{token}"), {str(self.dish.id): 2})
+        self.checkout_and_check_empty()
+        self.assertIsNone(cache.get(f"cart:{token}"))
+
+
+@override_settings(CART_STORAGE=COOKIE_STORAGE)
+class CookieCartStorageTests(CartStorageMixin, TestCase):
+    def test_cart_kept_in_signed_cookie(self):
+        self.add_twice_and_check()
+        self.assertNotIn("cart", self.client.session)
+        self.assertIn("foodhub_cart", self.client.cookies)
+        self.checkout_and_check_empty()
+
+    def test_tampered_cookie_is_ignored(self):
+        self.client.cookies["foodhub_cart"] = "not-a-signed-value"
+        resp = self.client.get(reverse("orders:cart_detail"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context["cart_item_count"], 0)
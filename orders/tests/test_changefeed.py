@@ -0,0 +1,134 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from deliveries.models import Delivery
+from orders import changefeed
+from orders.models import Order, OrderChange
+from restaurants.models import Restaurant
+
+User = get_user_model()
+
+
+class ChangeFeedMixin:
+    def setUp(self):
+        owner = User.objects.create_user(username="owner", password="x")
+        self.cust = User.objects.create_user(username="cust", password="x")
+        self.rider = User.objects.create_user(username="rider", password="x")
+        self.rest = Restaurant.objects.create(
+            owner=owner,
+            name="R",
+            address="A",
+            opening_hours="09-18",
+            is_active=True,
+        )
+        self.feed = changefeed.get_change_feed()
+        self.start = self._last_version()
+
+    def _last_version(self):
+        records = self.feed.read(after=0, limit=10_000)
+        return records[-1].version if records else 0
+
+    def test_transitions_are_published_in_order(self):
+        received = []
+        unsubscribe = self.feed.subscribe(received.append)
+        self.addCleanup(unsubscribe)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(
+                user=self.cust, restaurant=self.rest, total_amount=Decimal("5.00")
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            order.advance_to(Order.STATUS_PAID)
+        with self.captureOnCommitCallbacks(execute=True):
+            delivery = Delivery.objects.create(order=order, rider=self.rider)
+        with self.captureOnCommitCallbacks(execute=True):
+            delivery.advance_to(Delivery.STATUS_PICKED_UP)
+
+        records = self.feed.read(after=self.start, order_id=order.id)
+        self.assertEqual(
+            [r.kind for r in records],
+            [
+                changefeed.ORDER_CREATED,
+                changefeed.ORDER_STATUS,
+                changefeed.DELIVERY_ASSIGNED,
+                changefeed.DELIVERY_STATUS,
+                changefeed.DELIVERY_EVENT,
+            ],
+        )
+        self.assertEqual(records, received)
+        versions = [r.version for r in records]
+        self.assertEqual(versions, sorted(versions))
+        self.assertEqual(
+            records[1].payload,
+            {
+                "restaurant_id": self.rest.id,
+                "status": Order.STATUS_PAID,
+                "previous": Order.STATUS_CREATED,
+            },
+        )
+        self.assertEqual(records[3].payload["status"], Delivery.STATUS_PICKED_UP)
+
+        # Catching up from a known version
+        later = self.feed.read(after=records[2].version)
+        self.assertEqual(
+            [r.kind for r in later][:2], [records[3].kind, records[4].kind]
+        )
+
+    def test_rolled_back_changes_are_not_published(self):
+        order = Order.objects.create(user=self.cust, restaurant=self.rest)
+        before = self._last_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    order.advance_to(Order.STATUS_PAID)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(self.feed.read(after=before), [])
+
+
+@override_settings(CHANGE_FEED_BACKEND="orders.changefeed.InProcessChangeFeed")
+class InProcessChangeFeedTests(ChangeFeedMixin, TestCase):
+    def test_broken_subscriber_does_not_break_publish(self):
+        def broken(record):
+            raise RuntimeError("boom")
+
+        self.addCleanup(self.feed.subscribe(broken))
+        with self.assertLogs("orders.changefeed", "ERROR"):
+            record = self.feed.publish(1, changefeed.ORDER_STATUS, {})
+        self.assertEqual(self.feed.read(after=record.version - 1), [record])
+
+
+@override_settings(CHANGE_FEED_BACKEND="orders.changefeed.DatabaseChangeFeed")
+class DatabaseChangeFeedTests(ChangeFeedMixin, TestCase):
+    def test_records_are_rows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(user=self.cust, restaurant=self.rest)
+        row = OrderChange.objects.get(order=order)
+        self.assertEqual(row.kind, changefeed.ORDER_CREATED)
+        # Another worker's feed instance sees the same records
+        other = changefeed.DatabaseChangeFeed()
+        self.assertEqual(other.read(after=self.start), self.feed.read(after=self.start))
+
+    def test_records_are_inserted_under_the_lock(self):
+        order = Order.objects.create(user=self.cust, restaurant=self.rest)
+        for publish in (
+            lambda: self.feed.publish(order.id, changefeed.ORDER_STATUS, {}),
+            lambda: self.feed.publish_many([(order.id, changefeed.ORDER_STATUS, {})]),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                publish()
+            tables = [
+                table
+                for q in queries
+                for table in ("orders_orderchangelock", 'orders_orderchange"')
+                if table in q["sql"]
+            ]
+            self.assertEqual(tables[0], "orders_orderchangelock")
+            self.assertIn('orders_orderchange"', tables)
+        versions = [r.version for r in self.feed.read(after=self.start)]
+        self.assertEqual(versions, sorted(versions))
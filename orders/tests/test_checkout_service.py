@@ -0,0 +1,78 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from decimal import Decimal
+
+from restaurants.models import Restaurant
+from menu.models import Dish
+from orders.models import Order, OrderItem
+from orders.services import CheckoutError, place_order
+
+User = get_user_model()
+
+
+class PlaceOrderTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="cust", password="pass123")
+        owner = User.objects.create_user(username="owner", password="pass123")
+        self.rest = Restaurant.objects.create(
+            owner=owner,
+            name="R",
+            address="A",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+        self.other_rest = Restaurant.objects.create(
+            owner=owner,
+            name="R2",
+            address="B",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+        self.dishes = [
+            Dish.objects.create(
+                restaurant=self.rest, name=f"Dish {i}", price=Decimal("5.00") + i
+            )
+            for i in range(6)
+        ]
+
+    def test_items_written_in_constant_queries(self):
+        with CaptureQueriesContext(connection) as one:
+            place_order(self.user, {str(self.dishes[0].id): 1})
+        cart = {str(d.id): 2 for d in self.dishes}
+        with CaptureQueriesContext(connection) as many:
+            order = place_order(self.user, cart)
+        self.assertEqual(len(one), len(many))
+        self.assertEqual(order.items.filter(quantity=2).count(), 6)
+        with self.assertNumQueries(0):
+            self.assertEqual(order.total_amount, Decimal("90.00"))
+
+    def test_unavailable_dish_rolls_back(self):
+        Dish.objects.filter(pk=self.dishes[1].pk).update(available=False)
+        with self.assertRaises(CheckoutError):
+            place_order(self.user, {str(d.id): 1 for d in self.dishes[:2]})
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_multi_restaurant_and_price_change_rejected(self):
+        other = Dish.objects.create(
+            restaurant=self.other_rest, name="X", price=Decimal("1.00")
+        )
+        with self.assertRaises(CheckoutError):
+            place_order(self.user, {str(self.dishes[0].id): 1, str(other.id): 1})
+        with self.assertRaises(CheckoutError):
+            place_order(self.user, {str(self.dishes[0].id): 1}, expected_total="4.00")
+        self.assertFalse(Order.objects.exists())
+
+    def test_checkout_view_reports_error_and_keeps_cart(self):
+        session = self.client.session
+        session["cart"] = {str(self.dishes[0].id): 1}
+        session.save()
+        Dish.objects.filter(pk=self.dishes[0].pk).update(available=False)
+        self.client.login(username="cust", password="pass123")
+        resp = self.client.post(reverse("orders:checkout"), follow=True)
+        self.assertContains(resp, "No longer available")
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(self.client.session["cart"], {str(self.dishes[0].id): 1})
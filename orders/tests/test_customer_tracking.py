@@ -57,3 +57,60 @@ class CustomerTrackingTests(TestCase):
         data = resp.json()
         self.assertEqual(data["order_id"], self.order.id)
         self.assertIn("events", data)
+
+    def test_status_json_revalidates_with_304(self):
+        self.client.login(username="cust", password="pass123")
+        url = reverse("orders:customer_order_status_json", args=[self.order.id])
+        resp = self.client.get(url)
+        etag, last_modified = resp["ETag"], resp["Last-Modified"]
+        self.assertIn("no-cache", resp["Cache-Control"])
+
+        # session + user + one validator query, nothing else
+        with self.assertNumQueries(3):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        resp = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(resp.status_code, 304)
+
+        # A new event changes the validator
+        DeliveryEvent.objects.create(
+            delivery=self.delivery, event_type="STATUS_CHANGE", message="Picked up"
+        )
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp["ETag"], etag)
+        self.assertEqual(len(resp.json()["events"]), 2)
+
+    def test_status_json_validators_not_leaked_to_other_users(self):
+        self.client.login(username="cust", password="pass123")
+        url = reverse("orders:customer_order_status_json", args=[self.order.id])
+        etag = self.client.get(url)["ETag"]
+        self.client.login(username="other", password="pass123")
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 404)
+
+    def test_status_json_since_cursor_returns_only_new_events(self):
+        self.client.login(username="cust", password="pass123")
+        url = reverse("orders:customer_order_status_json", args=[self.order.id])
+        detail = self.client.get(
+            reverse("orders:customer_order_detail", args=[self.order.id])
+        )
+        cursor = detail.context["events_cursor"]
+        self.assertContains(detail, f'data-cursor="{cursor}"')
+
+        data = self.client.get(url, {"since": cursor}).json()
+        self.assertEqual(data["events"], [])
+        self.assertEqual(data["cursor"], cursor)
+        self.assertEqual(data["delivery_status"], self.delivery.status)
+
+        new = DeliveryEvent.objects.create(
+            delivery=self.delivery, event_type="STATUS_CHANGE", message="Picked up"
+        )
+        data = self.client.get(url, {"since": cursor}).json()
+        self.assertEqual([ev["id"] for ev in data["events"]], [new.id])
+        self.assertEqual(data["cursor"], new.id)
+
+        # Without a cursor the full timeline is returned, newest first
+        data = self.client.get(url).json()
+        self.assertEqual(len(data["events"]), 2)
+        self.assertEqual(data["events"][0]["message"], "Picked up")
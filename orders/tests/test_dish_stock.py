@@ -0,0 +1,97 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from decimal import Decimal
+from unittest import mock
+
+from restaurants.models import Restaurant
+from menu.models import Dish, DishQuerySet
+from orders.models import Order
+from orders.services import CheckoutError, place_order
+
+User = get_user_model()
+
+
+class DishStockTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="cust", password="pass123")
+        owner = User.objects.create_user(username="owner", password="pass123")
+        self.rest = Restaurant.objects.create(
+            owner=owner,
+            name="R",
+            address="A",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+        self.limited = Dish.objects.create(
+            restaurant=self.rest, name="Special", price=Decimal("12.00"), stock=3
+        )
+        self.unlimited = Dish.objects.create(
+            restaurant=self.rest, name="Bread", price=Decimal("2.00")
+        )
+
+    def test_checkout_decrements_only_stocked_dishes(self):
+        place_order(self.user, {str(self.limited.id): 2, str(self.unlimited.id): 5})
+        self.limited.refresh_from_db()
+        self.unlimited.refresh_from_db()
+        self.assertEqual(self.limited.stock, 1)
+        self.assertTrue(self.limited.available)
+        self.assertIsNone(self.unlimited.stock)
+
+    def test_last_unit_flips_dish_unavailable(self):
+        place_order(self.user, {str(self.limited.id): 3})
+        self.limited.refresh_from_db()
+        self.assertEqual(self.limited.stock, 0)
+        self.assertFalse(self.limited.available)
+
+    def test_oversell_is_rejected_and_rolled_back(self):
+        with self.assertRaises(CheckoutError):
+            place_order(self.user, {str(self.limited.id): 4})
+        self.limited.refresh_from_db()
+        self.assertEqual(self.limited.stock, 3)
+        self.assertFalse(Order.objects.exists())
+
+    def test_decrement_stock_reports_short_dish(self):
+        other = Dish.objects.create(
+            restaurant=self.rest, name="Rare", price=Decimal("1.00"), stock=1
+        )
+        ok = Dish.objects.decrement_stock({self.limited.id: 1, other.id: 2})
+        self.assertFalse(ok)
+        # Nothing was taken, not even from the dish that had enough
+        self.limited.refresh_from_db()
+        self.assertEqual(self.limited.stock, 3)
+        self.assertTrue(Dish.objects.decrement_stock({self.limited.id: 1}))
+
+    def test_only_short_dishes_are_reported(self):
+        last = Dish.objects.create(
+            restaurant=self.rest, name="Last one", price=Decimal("1.00"), stock=1
+        )
+        with self.assertRaisesMessage(
+            CheckoutError, "Not enough left of: Special. Please update your cart."
+        ):
+            place_order(self.user, {str(self.limited.id): 4, str(last.id): 1})
+        last.refresh_from_db()
+        self.assertEqual((last.stock, last.available), (1, True))
+
+    def _racing_checkout(self, **changes):
+        """Checkout where ``changes`` hit the stocked dish after it was read."""
+        decrement = DishQuerySet.decrement_stock
+
+        def racing(qs, quantities, prices=None):
+            Dish.objects.filter(pk=self.limited.pk).update(**changes)
+            return decrement(qs, quantities, prices)
+
+        with mock.patch.object(DishQuerySet, "decrement_stock", racing):
+            place_order(self.user, {str(self.limited.id): 1})
+
+    def test_stocked_dish_changed_during_checkout_is_rejected(self):
+        for changes, message in (
+            ({"price": Decimal("13.00")}, "Prices have changed"),
+            ({"available": False}, "No longer available: Special"),
+            ({"stock": 0}, "Not enough left of: Special"),
+        ):
+            with self.subTest(changes=changes):
+                with self.assertRaisesMessage(CheckoutError, message):
+                    self._racing_checkout(**changes)
+                self.limited.refresh_from_db()
+                self.assertEqual(self.limited.stock, 3)
+        self.assertFalse(Order.objects.exists())
@@ -0,0 +1,202 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from deliveries.models import Delivery
+from orders import eta
+from orders.models import Order, OrderStatusEvent, StageDurationSketch
+from restaurants.models import Restaurant
+
+User = get_user_model()
+
+
+class QuantileSketchTests(TestCase):
+    def test_quantiles_within_relative_error(self):
+        rng = random.Random(7)
+        values = sorted(rng.uniform(60, 1800) for _ in range(2000))
+        sketch = eta.QuantileSketch()
+        for value in values:
+            sketch.add(value)
+        self.assertEqual(sketch.count, 2000)
+        for q in (0.5, 0.9):
+            exact = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(sketch.quantile(q) / exact, 1, delta=0.06)
+
+    def test_empty_sketch(self):
+        self.assertIsNone(eta.QuantileSketch().quantile(0.5))
+
+
+class EstimateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="owner", password="pass123")
+        self.cust = User.objects.create_user(username="cust", password="pass123")
+        self.rest = Restaurant.objects.create(
+            owner=self.owner,
+            name="R",
+            address="A",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+        self.order = Order.objects.create(
+            user=self.cust, restaurant=self.rest, total_amount=Decimal("10.00")
+        )
+
+    def _seed(self, stage, seconds):
+        now = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            eta.record_stage(self.rest.id, stage, now - timedelta(seconds=seconds), now)
+
+    def test_transition_updates_sketches(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order.advance_to(Order.STATUS_PAID)
+        rows = StageDurationSketch.objects.filter(
+            restaurant=self.rest, stage=eta.order_stage(Order.STATUS_CREATED)
+        )
+        self.assertEqual(rows.count(), 2)
+        self.assertTrue(rows.filter(hour=StageDurationSketch.ALL_HOURS).exists())
+        self.assertEqual({row.count for row in rows}, {1})
+
+    def test_no_estimate_without_history(self):
+        self.assertIsNone(eta.estimate(self.order))
+
+    def test_estimate_adds_remaining_stages(self):
+        for stage, seconds in (
+            (eta.order_stage(Order.STATUS_CREATED), 60),
+            (eta.order_stage(Order.STATUS_PAID), 120),
+            (eta.order_stage(Order.STATUS_PREPARING), 600),
+            (eta.delivery_stage("PICKED_UP"), 900),
+        ):
+            self._seed(stage, seconds)
+        now = self.order.updated_at
+        result = eta.estimate(self.order, now=now)
+        expected = now + timedelta(seconds=60 + 120 + 600 + 900)
+        self.assertAlmostEqual(
+            (result["p50"] - expected).total_seconds(), 0, delta=1680 * 0.06
+        )
+        self.assertGreaterEqual(result["p90"], result["p50"])
+
+    def test_overdue_stage_is_assumed_to_end_now(self):
+        self._seed(eta.order_stage(Order.STATUS_CREATED), 60)
+        later = self.order.updated_at + timedelta(hours=1)
+        self.assertEqual(eta.estimate(self.order, now=later)["p50"], later)
+
+    def test_estimate_is_cached(self):
+        self._seed(eta.order_stage(Order.STATUS_CREATED), 60)
+        eta.estimate(self.order)
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(eta.estimate(self.order))
+
+    def test_status_json_includes_eta(self):
+        self._seed(eta.order_stage(Order.STATUS_CREATED), 60)
+        self.client.login(username="cust", password="pass123")
+        url = reverse("orders:customer_order_status_json", args=[self.order.id])
+        data = self.client.get(url).json()
+        self.assertIn("p50", data["eta"])
+        self.assertIn("p90", data["eta"])
+
+    def test_estimate_changes_the_tracking_etag(self):
+        self.client.login(username="cust", password="pass123")
+        url = reverse("orders:customer_order_status_json", args=[self.order.id])
+        etag = self.client.get(url)["ETag"]
+        self._seed(eta.order_stage(Order.STATUS_CREATED), 60)
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIsNotNone(resp.json()["eta"])
+        self.assertNotEqual(resp["ETag"], etag)
+
+    def test_other_saves_do_not_restart_the_stage(self):
+        self._seed(eta.order_stage(Order.STATUS_PAID), 600)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order.advance_to(Order.STATUS_PAID)
+        paid_at = timezone.now() - timedelta(minutes=5)
+        OrderStatusEvent.objects.filter(order=self.order).update(at=paid_at)
+
+        def current():
+            order = eta.with_stage_entry(Order.objects).get(pk=self.order.pk)
+            return eta.estimate(order, now=paid_at)
+
+        before = current()
+        self.order.save()  # e.g. an operator assignment
+        self.assertEqual(current(), before)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order.advance_to(Order.STATUS_PREPARING)
+        sample = StageDurationSketch.objects.get(
+            restaurant=self.rest,
+            stage=eta.order_stage(Order.STATUS_PAID),
+            hour=StageDurationSketch.ALL_HOURS,
+        )
+        self.assertEqual(sample.count, 2)
+        # The 300s spent PAID, not the moment since the last save
+        self.assertAlmostEqual(
+            eta.QuantileSketch(sample.buckets).quantile(0), 300, delta=30
+        )
+
+
+class EstimateFlowTests(TestCase):
+    """Samples and estimates from the real owner -> rider flow."""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="owner", password="pass123")
+        self.rider = User.objects.create_user(username="rider", password="pass123")
+        self.cust = User.objects.create_user(username="cust", password="pass123")
+        self.rest = Restaurant.objects.create(
+            owner=self.owner,
+            name="R",
+            address="A",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+
+    def _post(self, username, url):
+        self.client.login(username=username, password="pass123")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url)
+
+    def _prepare(self, order):
+        self._post("owner", reverse("orders:owner_detail", args=[order.pk]))
+
+    def _assign(self, order):
+        # As deliveries.views.assign_rider does
+        with self.captureOnCommitCallbacks(execute=True):
+            return Delivery.objects.create(order=order, rider=self.rider)
+
+    def _advance(self, delivery, name):
+        self._post("rider", reverse(f"deliveries:{name}", args=[delivery.pk]))
+
+    def _estimate(self, order):
+        order = Order.objects.select_related("delivery").get(pk=order.pk)
+        return eta.estimate(order, getattr(order, "delivery", None))
+
+    def test_estimate_at_every_step(self):
+        for _ in range(3):
+            order = Order.objects.create(user=self.cust, restaurant=self.rest)
+            self._prepare(order)
+            delivery = self._assign(order)
+            self._advance(delivery, "rider_mark_picked")
+            self._advance(delivery, "rider_mark_delivered")
+        kitchen = StageDurationSketch.objects.get(
+            restaurant=self.rest,
+            stage=eta.order_stage(Order.STATUS_PREPARING),
+            hour=StageDurationSketch.ALL_HOURS,
+        )
+        self.assertEqual(kitchen.count, 3)
+
+        order = Order.objects.create(user=self.cust, restaurant=self.rest)
+        self.assertIsNotNone(self._estimate(order))
+        self._prepare(order)
+        self.assertIsNotNone(self._estimate(order))
+        delivery = self._assign(order)
+        self.assertIsNotNone(self._estimate(order))
+        self._advance(delivery, "rider_mark_picked")
+        self.assertIsNotNone(self._estimate(order))
+        self._advance(delivery, "rider_mark_delivered")
+        self.assertIsNone(self._estimate(order))
@@ -47,7 +47,7 @@ class ExportCsvTests(TestCase):
         self.assertIn("orders_export.csv", resp["Content-Disposition"])
         self.assertIn(
             "id,created_at,user,restaurant,status,total_items,total_amount",
-            resp.content.decode(),
+            b"".join(resp.streaming_content).decode(),
         )
 
     def test_export_with_date_filter(self):
@@ -55,6 +55,52 @@ class ExportCsvTests(TestCase):
         url = reverse("orders:export_orders_csv") + "?start=2000-01-01&end=2100-01-01"
         resp = self.client.get(url)
         self.assertEqual(resp.status_code, 200)
-        body = resp.content.decode()
+        body = b"".join(resp.streaming_content).decode()
         self.assertIn("cust", body)
         self.assertIn("R", body)
+
+
+class StreamingExportTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            username="op", password="x", is_staff=True
+        )
+        self.cust = User.objects.create_user(username="cust", password="x")
+        owner = User.objects.create_user(username="owner", password="x")
+        self.rest = Restaurant.objects.create(
+            owner=owner,
+            name="R",
+            address="A",
+            opening_hours="09-18",
+            is_active=True,
+        )
+        Order.objects.bulk_create(
+            [
+                Order(
+                    user=self.cust,
+                    restaurant=self.rest,
+                    items_count=1,
+                    total_amount=Decimal("5.00"),
+                )
+                for _ in range(1200)
+            ]
+        )
+        self.client.login(username="op", password="x")
+
+    def test_export_streams_in_one_query(self):
+        url = reverse("orders:export_orders_csv")
+        resp = self.client.get(url)
+        self.assertTrue(resp.streaming)
+        with self.assertNumQueries(1):
+            lines = b"".join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1201)
+        self.assertTrue(lines[1].endswith(",cust,R,CREATED,1,5.00"))
+
+    def test_operator_export_streams_with_date_range(self):
+        resp = self.client.get(reverse("export_csv") + "?from=2000-01-01&to=2000-01-02")
+        body = b"".join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(
+            body, ["order_id,user,restaurant,status,created_at,total_amount"]
+        )
+        resp = self.client.get(reverse("export_csv"))
+        self.assertEqual(len(b"".join(resp.streaming_content).splitlines()), 1201)
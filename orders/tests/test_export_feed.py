@@ -0,0 +1,101 @@
+import gzip
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from menu.models import Dish
+from orders.models import Order, OrderItem
+from restaurants.models import Restaurant
+
+User = get_user_model()
+
+
+class OrderFeedTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            username="op", password="x", is_staff=True
+        )
+        self.cust = User.objects.create_user(username="cust", password="x")
+        self.rest = Restaurant.objects.create(
+            owner=self.cust,
+            name="R",
+            address="A",
+            opening_hours="09-18",
+            is_active=True,
+        )
+        dish = Dish.objects.create(
+            restaurant=self.rest, name="P", price=Decimal("4.00"), available=True
+        )
+        created = timezone.make_aware(datetime(2024, 3, 1, 12, 0))
+        self.orders = []
+        for i in range(5):
+            # Two orders share a created_at to exercise the id tie-breaker
+            order = Order.objects.create(
+                user=self.cust,
+                restaurant=self.rest,
+                created_at=created + timedelta(minutes=i // 2),
+                items_count=i + 1,
+                total_amount=Decimal("4.00") * (i + 1),
+            )
+            OrderItem.objects.create(
+                order=order,
+                dish=dish,
+                dish_name="P",
+                unit_price=Decimal("4.00"),
+                quantity=i + 1,
+            )
+            self.orders.append(order)
+        self.url = reverse("orders:export_orders_ndjson")
+
+    def _get(self, **params):
+        resp = self.client.get(self.url, params)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp["Content-Encoding"], "gzip")
+        lines = gzip.decompress(resp.content).decode().splitlines()
+        return [json.loads(line) for line in lines], resp.get("X-Next-Cursor")
+
+    def test_requires_staff(self):
+        self.client.login(username="cust", password="x")
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_pages_follow_cursor(self):
+        self.client.login(username="op", password="x")
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            with self.assertNumQueries(4):  # session, user, orders, items
+                records, cursor = self._get(**params)
+            seen.extend(records)
+            pages += 1
+            if not cursor:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual([r["id"] for r in seen], [o.id for o in self.orders])
+        self.assertEqual(seen[0]["items"][0]["quantity"], 1)
+        self.assertEqual(seen[4]["total_amount"], "20.00")
+
+    def test_updated_since_returns_delta(self):
+        changed = self.orders[1]
+        since = timezone.now() + timedelta(seconds=1)
+        Order.objects.filter(pk=changed.pk).update(
+            updated_at=since + timedelta(minutes=5)
+        )
+        self.client.login(username="op", password="x")
+        records, cursor = self._get(updated_since=since.isoformat())
+        self.assertEqual([r["id"] for r in records], [changed.id])
+        self.assertIsNone(cursor)
+
+    def test_bad_cursor_and_since_are_rejected(self):
+        self.client.login(username="op", password="x")
+        self.assertEqual(self.client.get(self.url, {"cursor": "x"}).status_code, 400)
+        resp = self.client.get(self.url, {"updated_since": "yesterday"})
+        self.assertEqual(resp.status_code, 400)
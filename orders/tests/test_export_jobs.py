@@ -0,0 +1,150 @@
+import gzip
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from orders.export_jobs import partition_range, run_export_job
+from orders.models import ExportJob, Order
+from restaurants.models import Restaurant
+
+User = get_user_model()
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        self.export_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_root, ignore_errors=True)
+        override = override_settings(
+            EXPORT_ROOT=os.path.join(self.export_root, "scratch"),
+            MEDIA_ROOT=os.path.join(self.export_root, "media"),
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.staff = User.objects.create_user(
+            username="op", password="x", is_staff=True
+        )
+        self.cust = User.objects.create_user(username="cust", password="x")
+        self.rest = Restaurant.objects.create(
+            owner=self.cust,
+            name="R",
+            address="A",
+            opening_hours="09-18",
+            is_active=True,
+        )
+        # One order on each of 10 consecutive days
+        for offset in range(10):
+            created = timezone.make_aware(datetime(2024, 1, 1 + offset, 12, 0))
+            Order.objects.create(
+                user=self.cust,
+                restaurant=self.rest,
+                items_count=1,
+                total_amount=Decimal("5.00"),
+                created_at=created,
+            )
+
+    def test_partition_range(self):
+        start, end = date(2024, 1, 1), date(2024, 1, 10)
+        self.assertEqual(len(partition_range(start, end, ExportJob.PARTITION_DAY)), 10)
+        weeks = partition_range(start, end, ExportJob.PARTITION_WEEK)
+        self.assertEqual(
+            weeks,
+            [
+                (date(2024, 1, 1), date(2024, 1, 7)),
+                (date(2024, 1, 8), date(2024, 1, 10)),
+            ],
+        )
+
+    def test_job_writes_single_gzip_in_order(self):
+        job = ExportJob.objects.create(
+            requested_by=self.staff,
+            start_date=date(2024, 1, 2),
+            end_date=date(2024, 1, 9),
+            partition=ExportJob.PARTITION_DAY,
+        )
+        self.assertTrue(run_export_job(job, processes=1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_DONE)
+        self.assertEqual((job.partitions_done, job.partitions_total), (8, 8))
+        self.assertEqual(job.progress, 100)
+
+        # The file is in the storage; the scratch parts are gone
+        self.assertTrue(job.file_path.startswith("exports/"))
+        with default_storage.open(job.file_path, "rb") as raw:
+            lines = gzip.decompress(raw.read()).decode().splitlines()
+        self.assertEqual(os.listdir(os.path.join(self.export_root, "scratch")), [])
+        self.assertTrue(lines[0].startswith("id,created_at,"))
+        self.assertEqual(len(lines), 1 + 8)
+        days = [line.split(",")[1][:10] for line in lines[1:]]
+        self.assertEqual(days, sorted(days))
+        self.assertEqual(days[0], "2024-01-02")
+
+        # Already claimed: a second run is a no-op
+        self.assertFalse(run_export_job(job, processes=1))
+
+    @override_settings(EXPORT_JOB_TIMEOUT=60)
+    def test_job_of_a_crashed_worker_is_claimed_again(self):
+        job = ExportJob.objects.create(
+            requested_by=self.staff,
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 1, 2),
+            status=ExportJob.STATUS_RUNNING,
+            started_at=timezone.now(),
+            partitions_done=1,
+        )
+        self.assertFalse(run_export_job(job))
+        ExportJob.objects.filter(pk=job.pk).update(
+            started_at=timezone.now() - timedelta(seconds=61)
+        )
+        self.assertTrue(run_export_job(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_DONE)
+        self.assertEqual(job.partitions_done, job.partitions_total)
+
+    def test_operator_queue_offers_background_export(self):
+        self.client.login(username="op", password="x")
+        resp = self.client.get(reverse("deliveries:operator_queue"))
+        self.assertContains(resp, f'action="{reverse("orders:export_orders_csv")}"')
+        for value, _ in ExportJob.PARTITION_CHOICES:
+            self.assertContains(resp, f'<option value="{value}"')
+
+    def test_submit_poll_and_download(self):
+        url = reverse("orders:export_orders_csv")
+        self.client.post(url, {"start": "2024-01-01", "end": "2024-01-10"})
+        self.assertFalse(ExportJob.objects.exists())  # not staff
+
+        self.client.login(username="op", password="x")
+        resp = self.client.post(url, {"start": "2024-01-10", "end": "2024-01-01"})
+        self.assertEqual(resp.status_code, 400)
+
+        resp = self.client.post(url, {"start": "2024-01-01", "end": "2024-01-10"})
+        job = ExportJob.objects.get()
+        self.assertRedirects(resp, reverse("orders:export_job_detail", args=[job.pk]))
+
+        status_url = reverse("orders:export_job_detail", args=[job.pk])
+        data = self.client.get(status_url + "?format=json").json()
+        self.assertEqual(data["status"], ExportJob.STATUS_PENDING)
+        self.assertIsNone(data["download_url"])
+        download_url = reverse("orders:export_job_download", args=[job.pk])
+        self.assertEqual(self.client.get(download_url).status_code, 404)
+
+        run_export_job(job, processes=1)
+        data = self.client.get(status_url + "?format=json").json()
+        self.assertEqual(data["progress"], 100)
+        self.assertEqual(data["download_url"], download_url)
+
+        resp = self.client.get(download_url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(
+            "orders_2024-01-01_2024-01-10.csv.gz", resp["Content-Disposition"]
+        )
+        body = gzip.decompress(b"".join(resp.streaming_content)).decode()
+        self.assertEqual(len(body.splitlines()), 11)
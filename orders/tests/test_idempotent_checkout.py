@@ -0,0 +1,79 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from decimal import Decimal
+
+from restaurants.models import Restaurant
+from menu.models import Dish
+from orders.models import CheckoutIdempotencyKey, Order, OrderItem
+
+User = get_user_model()
+
+
+class IdempotentCheckoutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="cust", password="pass123")
+        owner = User.objects.create_user(username="owner", password="pass123")
+        self.rest = Restaurant.objects.create(
+            owner=owner,
+            name="R",
+            address="A",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+        self.dish = Dish.objects.create(
+            restaurant=self.rest, name="Pasta", price=Decimal("10.00"), available=True
+        )
+        self.client.login(username="cust", password="pass123")
+
+    def fill_cart(self):
+        session = self.client.session
+        session["cart"] = {str(self.dish.id): 2}
+        session.save()
+
+    def checkout(self, key):
+        return self.client.post(reverse("orders:checkout"), HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_with_same_key_returns_original_order(self):
+        self.fill_cart()
+        first = self.checkout("abc123")
+        # The retry arrives after the cart was already cleared
+        second = self.checkout("abc123")
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(OrderItem.objects.count(), 1)
+        self.assertEqual(first["Location"], second["Location"])
+
+    def test_different_keys_create_different_orders(self):
+        self.fill_cart()
+        self.checkout("k1")
+        self.fill_cart()
+        self.checkout("k2")
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_expired_key_is_not_replayed(self):
+        self.fill_cart()
+        self.checkout("k1")
+        CheckoutIdempotencyKey.objects.update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.fill_cart()
+        self.checkout("k1")
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(CheckoutIdempotencyKey.objects.count(), 1)
+
+    def test_form_key_and_purge_command(self):
+        self.fill_cart()
+        resp = self.client.get(reverse("orders:checkout"))
+        key = resp.context["idempotency_key"]
+        self.client.post(reverse("orders:checkout"), {"idempotency_key": key})
+        self.client.post(reverse("orders:checkout"), {"idempotency_key": key})
+        self.assertEqual(Order.objects.count(), 1)
+
+        CheckoutIdempotencyKey.objects.update(expires_at=timezone.now())
+        call_command("purge_idempotency_keys", stdout=StringIO())
+        self.assertFalse(CheckoutIdempotencyKey.objects.exists())
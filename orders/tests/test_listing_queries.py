@@ -0,0 +1,87 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from decimal import Decimal
+
+from restaurants.models import Restaurant
+from menu.models import Dish
+from orders.models import Order, OrderItem
+from deliveries.models import Delivery
+
+User = get_user_model()
+
+
+class ListingQueryCountTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            username="op", password="x", is_staff=True
+        )
+        self.owner = User.objects.create_user(username="owner", password="x")
+        self.cust = User.objects.create_user(username="cust", password="x")
+        self.rider = User.objects.create_user(username="rider", password="x")
+        self.rest = Restaurant.objects.create(
+            owner=self.owner,
+            name="R",
+            address="A",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+        self.dish = Dish.objects.create(
+            restaurant=self.rest, name="Pasta", price=Decimal("10.00")
+        )
+
+    def add_orders(self, n):
+        for _ in range(n):
+            order = Order.objects.create(user=self.cust, restaurant=self.rest)
+            OrderItem.objects.bulk_create(
+                [
+                    OrderItem(
+                        order=order,
+                        dish=self.dish,
+                        dish_name="Pasta",
+                        unit_price=Decimal("10.00"),
+                        quantity=q,
+                    )
+                    for q in (1, 2)
+                ]
+            )
+            Delivery.objects.create(order=order, rider=self.rider)
+
+    def count_queries(self, username, url):
+        self.client.login(username=username, password="x")
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+            if resp.streaming:
+                b"".join(resp.streaming_content)
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx)
+
+    def assert_constant(self, username, url):
+        self.add_orders(1)
+        few = self.count_queries(username, url)
+        self.add_orders(4)
+        many = self.count_queries(username, url)
+        self.assertEqual(few, many)
+
+    def test_my_orders_constant_queries(self):
+        self.assert_constant("cust", reverse("orders:my_orders"))
+
+    def test_owner_list_constant_queries(self):
+        self.assert_constant("owner", reverse("orders:owner_list"))
+
+    def test_rider_list_constant_queries(self):
+        self.assert_constant("rider", reverse("deliveries:rider_deliveries"))
+
+    def test_exports_constant_queries(self):
+        self.assert_constant("op", reverse("orders:export_orders_csv"))
+        self.assert_constant("op", reverse("export_csv"))
+
+    def test_with_totals_aggregates_in_sql(self):
+        self.add_orders(2)
+        with self.assertNumQueries(1):
+            rows = list(Order.objects.with_totals())
+        self.assertEqual([o.line_count for o in rows], [2, 2])
+        self.assertEqual([o.items_quantity for o in rows], [3, 3])
+        self.assertEqual([o.items_amount for o in rows], [Decimal("30.00")] * 2)
@@ -1,5 +1,8 @@
+from io import StringIO
+
 from django.test import TestCase, override_settings
 from django.core import mail
+from django.core.management import call_command
 from django.contrib.auth import get_user_model
 from restaurants.models import Restaurant
 from orders.models import Order
@@ -26,5 +29,7 @@ class OrderEmailSignalTests(TestCase):
     def test_email_sent_on_order_status_change(self):
         self.order.status = Order.STATUS_PREPARING
         self.order.save()
+        self.assertEqual(len(mail.outbox), 0)  # queued in the outbox
+        call_command("send_outbox_emails", stdout=StringIO())
         self.assertEqual(len(mail.outbox), 1)
         self.assertIn("status changed", mail.outbox[0].subject.lower())
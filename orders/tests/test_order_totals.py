@@ -0,0 +1,65 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from decimal import Decimal
+
+from restaurants.models import Restaurant
+from menu.models import Dish
+from orders.models import Order, OrderItem
+from orders.services import place_order
+
+User = get_user_model()
+
+
+class OrderTotalsTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            username="op", password="x", is_staff=True
+        )
+        self.cust = User.objects.create_user(username="cust", password="x")
+        owner = User.objects.create_user(username="owner", password="x")
+        self.rest = Restaurant.objects.create(
+            owner=owner,
+            name="R",
+            address="A",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+        self.d1 = Dish.objects.create(
+            restaurant=self.rest, name="Pasta", price=Decimal("10.00")
+        )
+        self.d2 = Dish.objects.create(
+            restaurant=self.rest, name="Tiramisu", price=Decimal("6.50")
+        )
+
+    def test_checkout_stores_totals(self):
+        order = place_order(self.cust, {str(self.d1.id): 2, str(self.d2.id): 1})
+        order = Order.objects.get(pk=order.pk)
+        self.assertEqual(order.items_count, 3)
+        self.assertEqual(order.total_amount, Decimal("26.50"))
+
+    def test_backfill_command_fills_legacy_rows(self):
+        legacy = Order.objects.create(user=self.cust, restaurant=self.rest)
+        OrderItem.objects.create(
+            order=legacy,
+            dish=self.d1,
+            dish_name="Pasta",
+            unit_price=Decimal("9.00"),
+            quantity=3,
+        )
+        empty = Order.objects.create(user=self.cust, restaurant=self.rest)
+        call_command("backfill_order_totals", batch_size=1, stdout=StringIO())
+        legacy.refresh_from_db()
+        empty.refresh_from_db()
+        self.assertEqual(legacy.items_count, 3)
+        self.assertEqual(legacy.total_amount, Decimal("27.00"))
+        self.assertEqual(empty.total_amount, Decimal("0.00"))
+
+    def test_export_reads_stored_totals(self):
+        place_order(self.cust, {str(self.d1.id): 2})
+        self.client.login(username="op", password="x")
+        resp = self.client.get(reverse("orders:export_orders_csv"))
+        self.assertIn(",2,20.00", b"".join(resp.streaming_content).decode())
@@ -0,0 +1,198 @@
+import smtplib
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from deliveries.models import Delivery
+from orders import notifications
+from orders.models import Order, OutboxEmail
+from restaurants.models import Restaurant
+
+User = get_user_model()
+
+
+class CountingBackend(EmailBackend):
+    """locmem backend recording how it is used."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.opened = 0
+        self.sent = 0
+
+    def open(self):
+        self.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        self.sent += len(messages)
+        return super().send_messages(messages)
+
+
+class FlakySMTPBackend(EmailBackend):
+    """
+    locmem backend failing like the SMTP one: messages go out in order and
+    ``fail_subject`` raises, after the earlier ones were delivered.
+    """
+
+    fail_subject = None
+
+    def send_messages(self, messages):
+        for message in messages:
+            if message.subject == self.fail_subject:
+                raise smtplib.SMTPRecipientsRefused({"to": (550, b"refused")})
+            super().send_messages([message])
+        return len(messages)
+
+
+class ClaimCheckingBackend(EmailBackend):
+    """locmem backend recording which rows are pending while it sends."""
+
+    def send_messages(self, messages):
+        self.pending = notifications.pending_emails().count()
+        self.claimed = OutboxEmail.objects.filter(claimed_at__isnull=False).count()
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="x")
+        self.rider = User.objects.create_user(username="rider", password="x")
+        self.cust = User.objects.create_user(
+            username="cust", password="x", email="cust@example.com"
+        )
+        self.rest = Restaurant.objects.create(
+            owner=self.owner,
+            name="R",
+            address="A",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+        self.order = Order.objects.create(user=self.cust, restaurant=self.rest)
+
+    def test_views_queue_one_email_per_transition(self):
+        self.client.login(username="owner", password="x")
+        self.client.post(reverse("orders:owner_detail", args=[self.order.pk]))
+        delivery = Delivery.objects.create(order=self.order, rider=self.rider)
+        self.client.login(username="rider", password="x")
+        self.client.post(reverse("deliveries:rider_mark_picked", args=[delivery.pk]))
+        # Nothing is sent during the requests
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(
+            list(OutboxEmail.objects.values_list("kind", "status")),
+            [
+                (OutboxEmail.KIND_ORDER_STATUS, Order.STATUS_PREPARING),
+                (OutboxEmail.KIND_DELIVERY_STATUS, Delivery.STATUS_PICKED_UP),
+            ],
+        )
+
+    def test_duplicates_are_skipped(self):
+        self.order.advance_to(Order.STATUS_PREPARING)
+        self.order.refresh_from_db()
+        notifications.queue_status_emails([self.order, self.order])
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+
+    def test_rolled_back_change_queues_nothing(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.order.advance_to(Order.STATUS_PREPARING)
+                raise RuntimeError
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    def test_drain_reuses_one_connection(self):
+        for _ in range(4):
+            order = Order.objects.create(user=self.cust, restaurant=self.rest)
+            order.advance_to(Order.STATUS_PAID)
+        connection = CountingBackend()
+        self.assertEqual(
+            notifications.drain_outbox(batch_size=3, connection=connection), (4, 0)
+        )
+        self.assertEqual((connection.opened, connection.sent), (1, 4))
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertFalse(notifications.pending_emails().exists())
+
+    def test_command_sends_pending_emails_once(self):
+        self.order.advance_to(Order.STATUS_PAID)
+        out = StringIO()
+        call_command("send_outbox_emails", batch_size=1, stdout=out)
+        self.assertIn("Sent 1 emails, 0 failed.", out.getvalue())
+        # Sent rows are not sent again
+        call_command("send_outbox_emails", stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_failed_message_is_retried_without_duplicates(self):
+        for status in (Order.STATUS_PAID, Order.STATUS_PREPARING):
+            self.order.advance_to(status)
+        delivery = Delivery.objects.create(order=self.order, rider=self.rider)
+        delivery.advance_to(Delivery.STATUS_PICKED_UP)
+        first, failing, last = OutboxEmail.objects.all()
+
+        connection = FlakySMTPBackend()
+        connection.fail_subject = failing.subject
+        self.assertEqual(notifications.drain_outbox(connection=connection), (2, 1))
+        self.assertEqual(
+            [m.subject for m in mail.outbox], [first.subject, last.subject]
+        )
+        failing.refresh_from_db()
+        self.assertIsNone(failing.sent_at)
+        self.assertEqual(failing.attempts, 1)
+        self.assertIn("refused", failing.last_error)
+
+        # Only the failed message is sent again
+        self.assertEqual(notifications.drain_outbox(), (1, 0))
+        self.assertEqual(
+            [m.subject for m in mail.outbox],
+            [first.subject, last.subject, failing.subject],
+        )
+
+    def test_rows_are_claimed_while_sending(self):
+        self.order.advance_to(Order.STATUS_PAID)
+        connection = ClaimCheckingBackend()
+        self.assertEqual(notifications.drain_outbox(connection=connection), (1, 0))
+        # Another drain would skip the row being sent
+        self.assertEqual((connection.pending, connection.claimed), (0, 1))
+        self.assertFalse(OutboxEmail.objects.filter(claimed_at__isnull=False).exists())
+
+    @override_settings(OUTBOX_CLAIM_TIMEOUT=60)
+    def test_rows_of_a_dead_drain_are_sent_again(self):
+        for status in (Order.STATUS_PAID, Order.STATUS_PREPARING):
+            self.order.advance_to(status)
+        stale, busy = OutboxEmail.objects.all()
+        now = timezone.now()
+        OutboxEmail.objects.filter(pk=stale.pk).update(
+            claimed_at=now - timedelta(minutes=5)
+        )
+        OutboxEmail.objects.filter(pk=busy.pk).update(claimed_at=now)
+        self.assertEqual(notifications.drain_outbox(), (1, 0))
+        self.assertEqual([m.subject for m in mail.outbox], [stale.subject])
+
+    def test_loop_survives_a_mail_server_outage(self):
+        class Stop(Exception):
+            pass
+
+        command = "orders.management.commands.send_outbox_emails"
+        outage = smtplib.SMTPServerDisconnected("down")
+        err = StringIO()
+        with mock.patch(
+            f"{command}.drain_outbox", side_effect=[outage, outage, (1, 0)]
+        ), mock.patch(f"{command}.time.sleep", side_effect=[None, None, Stop]) as sleep:
+            with self.assertRaises(Stop):
+                call_command(
+                    "send_outbox_emails",
+                    loop=True,
+                    interval=5,
+                    stdout=StringIO(),
+                    stderr=err,
+                )
+        self.assertIn("Drain failed: down", err.getvalue())
+        # Backs off while failing, back to the interval once a drain works
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [10, 20, 5])
@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from orders.models import Order
+from restaurants.models import Restaurant
+
+User = get_user_model()
+
+
+class OwnerDeltaTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="x")
+        other_owner = User.objects.create_user(username="other", password="x")
+        self.cust = User.objects.create_user(username="cust", password="x")
+        self.rest = Restaurant.objects.create(
+            owner=self.owner,
+            name="R",
+            address="A",
+            opening_hours="09-18",
+            is_active=True,
+        )
+        self.other_rest = Restaurant.objects.create(
+            owner=other_owner,
+            name="Other",
+            address="B",
+            opening_hours="09-18",
+            is_active=True,
+        )
+        self.old = Order.objects.create(user=self.cust, restaurant=self.rest)
+        self.url = reverse("orders:owner_orders_delta")
+        self.client.login(username="owner", password="x")
+
+    def test_list_renders_live_cursor(self):
+        resp = self.client.get(reverse("orders:owner_list"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.context["live_cursor"].endswith(f"|{self.old.id}"))
+        self.assertContains(resp, f'data-order-id="{self.old.id}"')
+
+    def _ids(self, since):
+        data = self.client.get(self.url, {"since": since}).json()
+        return [row["id"] for row in data["orders"]], data["cursor"]
+
+    def test_delta_returns_changes_since_cursor(self):
+        cursor = self.client.get(self.url).json()["cursor"]
+        # Only the recent change already seen, sent again for the client to skip
+        self.assertEqual(self._ids(cursor), ([self.old.id], cursor))
+
+        later = timezone.now() + timedelta(seconds=1)
+        new = Order.objects.create(user=self.cust, restaurant=self.rest)
+        Order.objects.create(user=self.cust, restaurant=self.other_rest)
+        Order.objects.filter(pk=self.old.pk).update(
+            status=Order.STATUS_PREPARING, updated_at=later
+        )
+
+        # auth session/user + overlap and range queries, however long the
+        # history
+        with self.assertNumQueries(4):
+            data = self.client.get(self.url, {"since": cursor}).json()
+        rows = {row["id"]: row for row in data["orders"]}
+        self.assertEqual(list(rows), [new.id, self.old.id])  # by updated_at
+        self.assertTrue(rows[new.id]["new"])
+        self.assertFalse(rows[self.old.id]["new"])
+        self.assertEqual(rows[self.old.id]["status"], Order.STATUS_PREPARING)
+        self.assertIn(f'data-order-id="{new.id}"', rows[new.id]["html"])
+        self.assertIn(
+            f'data-updated-at="{later.isoformat()}"', rows[self.old.id]["html"]
+        )
+
+        # Recent changes are sent again, for the client to skip
+        self.assertEqual(
+            self._ids(data["cursor"]), ([new.id, self.old.id], data["cursor"])
+        )
+
+    def test_late_commit_behind_cursor_is_not_missed(self):
+        cursor = self.client.get(self.url).json()["cursor"]
+        # Stamped before the cursor's order, committed after it was handed out
+        late = Order.objects.create(user=self.cust, restaurant=self.rest)
+        Order.objects.filter(pk=late.pk).update(
+            updated_at=self.old.updated_at - timedelta(seconds=1)
+        )
+        ids, next_cursor = self._ids(cursor)
+        self.assertEqual(ids, [late.id, self.old.id])
+        self.assertEqual(next_cursor, cursor)
+
+    def test_bad_cursor(self):
+        resp = self.client.get(self.url, {"since": "yesterday"})
+        self.assertEqual(resp.status_code, 400)
@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from orders.models import Order, OrderChange, OrderStatusEvent
+from restaurants.models import Restaurant
+
+User = get_user_model()
+
+
+class OrderStatusEventTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="pass123")
+        self.cust = User.objects.create_user(username="cust", password="pass123")
+        self.rest = Restaurant.objects.create(
+            owner=self.owner,
+            name="R",
+            address="A",
+            opening_hours="09:00-18:00",
+            is_active=True,
+        )
+        self.order = Order.objects.create(user=self.cust, restaurant=self.rest)
+
+    def test_advance_to_logs_transition(self):
+        self.order.advance_to(Order.STATUS_PAID, actor=self.owner)
+        self.order.advance_to(Order.STATUS_PREPARING)
+        events = list(self.order.status_events.all())
+        self.assertEqual(
+            [(e.from_status, e.to_status) for e in events],
+            [
+                (Order.STATUS_CREATED, Order.STATUS_PAID),
+                (Order.STATUS_PAID, Order.STATUS_PREPARING),
+            ],
+        )
+        self.assertEqual(events[0].actor, self.owner)
+        self.assertEqual(events[0].restaurant, self.rest)
+        self.assertEqual(events[1].at, Order.objects.get(pk=self.order.pk).updated_at)
+
+    def test_invalid_transition_logs_nothing(self):
+        self.order.advance_to(Order.STATUS_PREPARING)
+        with self.assertRaises(ValueError):
+            self.order.advance_to(Order.STATUS_PAID)
+        self.assertEqual(self.order.status_events.count(), 1)
+
+    def test_owner_view_records_actor(self):
+        self.client.login(username="owner", password="pass123")
+        self.client.post(reverse("orders:owner_detail", args=[self.order.pk]))
+        event = OrderStatusEvent.objects.get(order=self.order)
+        self.assertEqual(event.to_status, Order.STATUS_PREPARING)
+        self.assertEqual(event.actor, self.owner)
+
+    def test_backfill(self):
+        # Order with change feed history, order without, and one already logged
+        replayed = Order.objects.create(user=self.cust, restaurant=self.rest)
+        Order.objects.filter(pk=replayed.pk).update(status=Order.STATUS_PREPARING)
+        for previous, status in (("CREATED", "PAID"), ("PAID", "PREPARING")):
+            OrderChange.objects.create(
+                order=replayed,
+                kind="order.status",
+                payload={"status": status, "previous": previous},
+            )
+        Order.objects.filter(pk=self.order.pk).update(status=Order.STATUS_COMPLETED)
+        logged = Order.objects.create(user=self.cust, restaurant=self.rest)
+        logged.advance_to(Order.STATUS_PAID)
+
+        call_command("backfill_order_status_events", batch_size=1, stdout=StringIO())
+
+        self.assertEqual(
+            list(replayed.status_events.values_list("from_status", "to_status")),
+            [("CREATED", "PAID"), ("PAID", "PREPARING")],
+        )
+        self.assertEqual(
+            list(self.order.status_events.values_list("from_status", "to_status")),
+            [("", Order.STATUS_COMPLETED)],
+        )
+        self.assertEqual(logged.status_events.count(), 1)
+
+        # Running it again changes nothing
+        call_command("backfill_order_status_events", stdout=StringIO())
+        self.assertEqual(OrderStatusEvent.objects.count(), 4)
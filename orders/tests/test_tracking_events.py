@@ -0,0 +1,110 @@
+import json
+from decimal import Decimal
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from deliveries.models import Delivery, DeliveryEvent
+from orders import changefeed
+from orders.models import Order
+from orders.tracking import _feed_watcher
+from restaurants.models import Restaurant
+
+User = get_user_model()
+
+
+def _make_order(customer):
+    owner = User.objects.create_user(username="owner", password="pass123")
+    rest = Restaurant.objects.create(
+        owner=owner,
+        name="R",
+        address="A",
+        opening_hours="09:00-18:00",
+        is_active=True,
+    )
+    return Order.objects.create(
+        user=customer, restaurant=rest, total_amount=Decimal("10.00")
+    )
+
+
+def _parse(chunk):
+    """Return (event, data) of an SSE message."""
+    fields = dict(
+        line.split(": ", 1)
+        for line in chunk.decode().strip().splitlines()
+        if ": " in line
+    )
+    return fields.get("event"), json.loads(fields.get("data", "null"))
+
+
+class TrackingEventsWsgiTests(TestCase):
+    def test_declined_under_wsgi(self):
+        cust = User.objects.create_user(username="cust", password="pass123")
+        order = _make_order(cust)
+        self.client.login(username="cust", password="pass123")
+        resp = self.client.get(reverse("orders:customer_order_events", args=[order.id]))
+        self.assertEqual(resp.status_code, 204)
+
+
+# Changes must arrive through the change feed, not the periodic re-check
+@override_settings(
+    TRACKING_SSE_INTERVAL=0.01, TRACKING_SSE_REFRESH=60, TRACKING_SSE_MAX_AGE=5
+)
+class TrackingEventsAsgiTests(TransactionTestCase):
+    def setUp(self):
+        self.cust = User.objects.create_user(username="cust", password="pass123")
+        self.other = User.objects.create_user(username="other", password="pass123")
+        self.order = _make_order(self.cust)
+        self.delivery = Delivery.objects.create(order=self.order)
+        self.first = DeliveryEvent.objects.create(
+            delivery=self.delivery, event_type="ASSIGNED", message="Assigned"
+        )
+        self.url = reverse("orders:customer_order_events", args=[self.order.id])
+
+    async def test_other_users_get_404(self):
+        await sync_to_async(self.async_client.force_login)(self.other)
+        resp = await self.async_client.get(self.url)
+        self.assertEqual(resp.status_code, 404)
+
+    async def test_pushes_changes_then_done(self):
+        await sync_to_async(self.async_client.force_login)(self.cust)
+        resp = await self.async_client.get(
+            self.url, headers={"Last-Event-ID": str(self.first.id)}
+        )
+        self.assertEqual(resp["Content-Type"], "text/event-stream")
+        stream = resp.streaming_content.__aiter__()
+
+        self.assertTrue((await stream.__anext__()).startswith(b"retry:"))
+        event, data = _parse(await stream.__anext__())
+        self.assertEqual(event, "tracking")
+        self.assertEqual(data["events"], [])  # resumed after the first event
+        self.assertEqual(data["delivery_status"], Delivery.STATUS_ASSIGNED)
+
+        await sync_to_async(self.delivery.advance_to)(Delivery.STATUS_PICKED_UP)
+        event, data = _parse(await stream.__anext__())
+        self.assertEqual(data["delivery_status"], Delivery.STATUS_PICKED_UP)
+        self.assertEqual(len(data["events"]), 1)
+        self.assertGreater(data["cursor"], self.first.id)
+
+        await sync_to_async(self.delivery.advance_to)(Delivery.STATUS_DELIVERED)
+        event, data = _parse(await stream.__anext__())
+        self.assertEqual(data["delivery_status"], Delivery.STATUS_DELIVERED)
+        event, _ = _parse(await stream.__anext__())
+        self.assertEqual(event, "done")
+
+
+@override_settings(TRACKING_SSE_INTERVAL=0.01)
+class FeedWatcherTests(TestCase):
+    async def test_wakes_only_the_changed_orders_streams(self):
+        watcher = _feed_watcher()
+        first, second = watcher.watch(1), watcher.watch(2)
+        await asyncio.sleep(0.05)  # the watcher has read the feed's position
+        changefeed.get_change_feed().publish(1, changefeed.ORDER_STATUS, {})
+        await asyncio.wait_for(first.wait(), timeout=1)
+        self.assertFalse(second.is_set())
+        watcher.unwatch(1, first)
+        watcher.unwatch(2, second)
@@ -0,0 +1,99 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+
+from core.models import TransitionConflict
+from deliveries.models import Delivery, DeliveryEvent
+from orders.models import Order, OrderStatusEvent
+from restaurants.models import Restaurant
+
+User = get_user_model()
+
+
+def _make_order():
+    owner = User.objects.create_user(username="owner", password="x")
+    rest = Restaurant.objects.create(
+        owner=owner,
+        name="R",
+        address="A",
+        opening_hours="09:00-18:00",
+        is_active=True,
+    )
+    return Order.objects.create(user=owner, restaurant=rest)
+
+
+class CompareAndSetTests(TestCase):
+    def setUp(self):
+        self.order = _make_order()
+
+    def test_stale_instance_conflicts_and_writes_nothing(self):
+        stale = Order.objects.get(pk=self.order.pk)
+        self.order.advance_to(Order.STATUS_PAID)
+        with self.assertRaises(TransitionConflict):
+            stale.advance_to(Order.STATUS_PREPARING)
+        self.assertEqual(stale.status, Order.STATUS_CREATED)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, Order.STATUS_PAID)
+        self.assertEqual(OrderStatusEvent.objects.count(), 1)
+
+    def test_stale_delivery_conflicts(self):
+        delivery = Delivery.objects.create(order=self.order)
+        stale = Delivery.objects.get(pk=delivery.pk)
+        delivery.advance_to(Delivery.STATUS_PICKED_UP)
+        with self.assertRaises(TransitionConflict):
+            stale.advance_to(Delivery.STATUS_PICKED_UP)
+        self.assertEqual(DeliveryEvent.objects.filter(delivery=delivery).count(), 1)
+
+
+class ContentionTests(TransactionTestCase):
+    THREADS = 8
+
+    def _race(self, instances, next_status):
+        """Advance every (already loaded) instance at once; count outcomes."""
+        barrier = threading.Barrier(len(instances))
+        outcomes = []
+        lock = threading.Lock()
+
+        def worker(instance):
+            try:
+                barrier.wait()
+                try:
+                    instance.advance_to(next_status)
+                    outcome = "advanced"
+                except TransitionConflict:
+                    outcome = "conflict"
+                except OperationalError:
+                    # SQLite may refuse a concurrent writer outright
+                    outcome = "busy"
+                with lock:
+                    outcomes.append(outcome)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in instances]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def test_only_one_concurrent_order_transition_wins(self):
+        order = _make_order()
+        instances = [Order.objects.get(pk=order.pk) for _ in range(self.THREADS)]
+        outcomes = self._race(instances, Order.STATUS_PAID)
+        self.assertEqual(outcomes.count("advanced"), 1)
+        self.assertEqual(len(outcomes), self.THREADS)
+        self.assertEqual(OrderStatusEvent.objects.filter(order=order).count(), 1)
+
+    def test_only_one_concurrent_delivery_transition_wins(self):
+        delivery = Delivery.objects.create(order=_make_order())
+        instances = [Delivery.objects.get(pk=delivery.pk) for _ in range(self.THREADS)]
+        outcomes = self._race(instances, Delivery.STATUS_PICKED_UP)
+        self.assertEqual(outcomes.count("advanced"), 1)
+        self.assertEqual(
+            DeliveryEvent.objects.filter(
+                delivery=delivery, event_type=DeliveryEvent.EVENT_STATUS_CHANGE
+            ).count(),
+            1,
+        )
@@ -0,0 +1,328 @@
+"""
+Customer order tracking payloads, shared by the polling JSON endpoint and
+the tracking page.
+
+Timeline events are paged with an event-id cursor: a client that sends back
+the ``cursor`` it last received gets only the events created after it, so
+each poll costs roughly the same however long the delivery runs.
+
+Under ASGI the same payloads are pushed as server-sent events by
+``tracking_event_stream``. The streams of one process share a single
+change feed reader (``orders.changefeed``), which wakes only the streams
+of the orders that changed.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.db.models import Count, Max
+
+from deliveries.locations import aget_latest_location, get_latest_location
+from deliveries.models import Delivery, DeliveryEvent
+from . import changefeed, eta
+from .models import Order
+
+logger = logging.getLogger(__name__)
+
+# Seconds between change feed reads, shared by all SSE streams of a process
+DEFAULT_SSE_INTERVAL = 2
+# Seconds between re-checks of one stream when the feed has nothing for
+# it (rider position and ETA are not in the feed); the JSON poll interval
+DEFAULT_SSE_REFRESH = 10
+# Streams are closed after this many seconds; EventSource reconnects
+DEFAULT_SSE_MAX_AGE = 300
+# Comment line sent on idle streams so proxies keep them open
+SSE_KEEPALIVE = 15
+# Reconnect delay suggested to the browser (milliseconds)
+SSE_RETRY_MS = 3000
+
+
+def parse_event_cursor(value):
+    """Return the event id cursor, or None when missing or malformed."""
+    try:
+        cursor = int(value)
+    except (TypeError, ValueError):
+        return None
+    return cursor if cursor >= 0 else None
+
+
+def tracking_version_query(pk, user_id):
+    """
+    One-row aggregate over the order, its delivery and its newest event:
+    everything the tracking data depends on, without loading any of it,
+    plus what ``eta.row_estimate`` needs. Empty for orders that do not
+    belong to ``user_id``.
+    """
+    return (
+        eta.with_stage_entry(Order.objects.filter(pk=pk, user_id=user_id))
+        .values(
+            "updated_at",
+            "restaurant_id",
+            "status",
+            "delivery__id",
+            "delivery__status",
+            "delivery__updated_at",
+            *eta.ENTRY_FIELDS,
+        )
+        .annotate(
+            last_event_at=Max("delivery__events__created_at"),
+            event_count=Count("delivery__events"),
+        )
+        .order_by("pk")
+    )
+
+
+def tracking_validators(row):
+    """``(etag, last_modified)`` for a ``tracking_version_query`` row, or None."""
+    if row is None:
+        return None
+    # Rider position lives in the cache; it changes the ETag only
+    location = get_latest_location(row["delivery__id"]) if row["delivery__id"] else None
+    return _validators(row, location, eta.row_estimate(row))
+
+
+async def atracking_validators(row):
+    """Async ``tracking_validators``."""
+    if row is None:
+        return None
+    location = None
+    if row["delivery__id"]:
+        location = await aget_latest_location(row["delivery__id"])
+    return _validators(row, location, await eta.arow_estimate(row))
+
+
+def _validators(row, location, estimate):
+    stamps = [row["updated_at"], row["delivery__updated_at"], row["last_event_at"]]
+    version = "|".join(str(stamp) for stamp in stamps)
+    version += f"|{row['event_count']}"
+    if row["delivery__id"]:
+        version += f"|{location['at'] if location else ''}"
+    # Moves without a write when the sketches change or a stage runs late
+    version += f"|{json.dumps(serialize_estimate(estimate))}"
+    etag = hashlib.md5(version.encode(), usedforsecurity=False).hexdigest()
+    return f'"{etag}"', max(stamp for stamp in stamps if stamp)
+
+
+def serialize_event(event):
+    return {
+        "id": event.id,
+        "at": event.created_at.isoformat(),
+        "type": event.event_type,
+        "message": event.message,
+    }
+
+
+def serialize_estimate(estimate):
+    if estimate is None:
+        return None
+    return {name: when.isoformat() for name, when in estimate.items()}
+
+
+def _events_query(delivery, since):
+    qs = DeliveryEvent.objects.filter(delivery=delivery).order_by("-created_at", "-id")
+    if since is not None:
+        qs = qs.filter(id__gt=since)
+    return qs
+
+
+def _build_payload(order, delivery, events, since, estimate, location):
+    cursor = max([since or 0] + [event.id for event in events])
+    return {
+        "order_id": order.id,
+        "order_status": order.status,
+        "delivery_status": getattr(delivery, "status", None),
+        "rider": getattr(getattr(delivery, "rider", None), "username", None),
+        "rider_location": location,
+        "events": [serialize_event(event) for event in events],
+        "cursor": cursor,
+        "eta": serialize_estimate(estimate),
+    }
+
+
+def tracking_payload(order, since=None):
+    """
+    Current order/delivery status plus timeline events (newest first).
+    With ``since``, only events with a greater id are included. ``cursor``
+    is the highest event id the client has now seen. ``eta`` holds the
+    p50/p90 arrival times (see ``orders.eta``) when they can be estimated.
+    """
+    delivery = getattr(order, "delivery", None)
+    events = list(_events_query(delivery, since)) if delivery else []
+    location = get_latest_location(delivery.id) if delivery else None
+    return _build_payload(
+        order, delivery, events, since, eta.estimate(order, delivery), location
+    )
+
+
+async def atracking_payload(order, since=None):
+    """
+    Async ``tracking_payload``; ``order`` must come with
+    ``select_related("delivery__rider")`` (and ``eta.with_stage_entry`` to
+    save the ETA a query).
+    """
+    delivery = getattr(order, "delivery", None)
+    events, location = [], None
+    if delivery is not None:
+        events = [event async for event in _events_query(delivery, since)]
+        location = await aget_latest_location(delivery.id)
+    return _build_payload(
+        order, delivery, events, since, await eta.aestimate(order, delivery), location
+    )
+
+
+def is_final(payload):
+    """True once nothing about the order can change any more."""
+    return payload["order_status"] in (
+        Order.STATUS_COMPLETED,
+        Order.STATUS_CANCELLED,
+    ) or payload["delivery_status"] in (
+        Delivery.STATUS_DELIVERED,
+        Delivery.STATUS_CANCELLED,
+    )
+
+
+def sse_message(data, event=None, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, cls=DjangoJSONEncoder))
+    return "\n".join(lines) + "\n\n"
+
+
+_GONE = object()
+
+
+def _read_feed(after):
+    # Runs on a pooled thread, like _tracking_update
+    close_old_connections()
+    feed = changefeed.get_change_feed()
+    if after is None:
+        return feed.last_version(), []
+    records = feed.read(after=after)
+    return (records[-1].version if records else after), records
+
+
+class _FeedWatcher:
+    """
+    Change feed reader shared by the SSE streams of one event loop: one
+    ``read`` per interval however many streams are open, setting the
+    events of the streams watching an order that has new records. Runs
+    while at least one stream is watching.
+    """
+
+    def __init__(self):
+        self._waiters = {}  # order id -> set of asyncio.Event
+        self._task = None
+
+    def watch(self, order_id):
+        changed = asyncio.Event()
+        self._waiters.setdefault(order_id, set()).add(changed)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return changed
+
+    def unwatch(self, order_id, changed):
+        waiters = self._waiters.get(order_id)
+        if waiters is not None:
+            waiters.discard(changed)
+            if not waiters:
+                del self._waiters[order_id]
+
+    async def _run(self):
+        read = sync_to_async(_read_feed, thread_sensitive=False)
+        version = None
+        while self._waiters:
+            try:
+                version, records = await read(version)
+            except Exception:
+                logger.exception("Could not read the change feed")
+                records = []
+            for record in records:
+                for changed in self._waiters.get(record.order_id, ()):
+                    changed.set()
+            await asyncio.sleep(
+                getattr(settings, "TRACKING_SSE_INTERVAL", DEFAULT_SSE_INTERVAL)
+            )
+
+
+_watchers = weakref.WeakKeyDictionary()
+
+
+def _feed_watcher():
+    """The running event loop's ``_FeedWatcher``."""
+    return _watchers.setdefault(asyncio.get_running_loop(), _FeedWatcher())
+
+
+def _tracking_update(pk, user_id, version, cursor):
+    """
+    ``(version, payload)`` if the order changed since ``version``, None if
+    not, ``_GONE`` if it no longer exists (or is not the user's).
+    """
+    # Runs on a pooled thread: drop connections past CONN_MAX_AGE or broken
+    close_old_connections()
+    validators = tracking_validators(tracking_version_query(pk, user_id).first())
+    if validators is None:
+        return _GONE
+    if validators[0] == version:
+        return None
+    order = eta.with_stage_entry(Order.objects.select_related("delivery__rider")).get(
+        pk=pk
+    )
+    return validators[0], tracking_payload(order, since=cursor)
+
+
+async def tracking_event_stream(pk, user_id, since=None):
+    """
+    Server-sent events for one tracking page. A single version query runs
+    when the shared change feed watcher reports a record for the order, or
+    after ``TRACKING_SSE_REFRESH`` seconds without one (rider position and
+    ETA change without feed records). A ``tracking`` event (same payload
+    as the JSON endpoint, ``id`` = cursor) is sent only when something
+    changed, and ``done`` once the order is final.
+
+    Database work runs on the shared executor (``thread_sensitive=False``)
+    so open streams do not each pin a thread and a connection.
+    """
+    refresh = getattr(settings, "TRACKING_SSE_REFRESH", DEFAULT_SSE_REFRESH)
+    max_age = getattr(settings, "TRACKING_SSE_MAX_AGE", DEFAULT_SSE_MAX_AGE)
+    check = sync_to_async(_tracking_update, thread_sensitive=False)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_age
+    last_sent = loop.time()
+    version, cursor = None, since
+    watcher = _feed_watcher()
+    changed = watcher.watch(pk)
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        while loop.time() < deadline:
+            changed.clear()
+            update = await check(pk, user_id, version, cursor)
+            if update is _GONE:
+                yield sse_message({}, event="done")
+                return
+            if update is not None:
+                version, payload = update
+                cursor = payload["cursor"]
+                yield sse_message(payload, event="tracking", event_id=cursor)
+                last_sent = loop.time()
+                if is_final(payload):
+                    yield sse_message({}, event="done")
+                    return
+            elif loop.time() - last_sent >= SSE_KEEPALIVE:
+                yield ": keepalive\n\n"
+                last_sent = loop.time()
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=refresh)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        watcher.unwatch(pk, changed)
@@ -1,26 +1,45 @@
 # orders/urls.py
+from django.conf import settings
 from django.urls import path
 from .views import (
     OwnerOrderListView,
     OwnerOrderDetailView,
     OwnerOrderPrepareView,
+    owner_orders_delta,
+    owner_orders_bulk_prepare,
     cart_detail,
+    acart_detail,
     cart_add,
     cart_remove,
     cart_update,
+    cart_batch,
     checkout,
     order_success,
     my_orders,
     customer_order_detail,
     customer_order_status_json,
+    acustomer_order_status_json,
+    customer_order_events,
     export_orders_csv,
+    export_orders_ndjson,
+    export_job_detail,
+    export_job_download,
 )
 
 app_name = "orders"  # <-- IMPORTANTISSIMO
 
+# Async implementations of the hot read paths, for foodhub.asgi deployments
+async_reads = getattr(settings, "ASYNC_READ_VIEWS", False)
+
 urlpatterns = [
     # Owner
     path("owner/", OwnerOrderListView.as_view(), name="owner_list"),
+    path("owner/changes.json", owner_orders_delta, name="owner_orders_delta"),
+    path(
+        "owner/prepare/",
+        owner_orders_bulk_prepare,
+        name="owner_orders_bulk_prepare",
+    ),
     path("owner/<int:pk>/", OwnerOrderDetailView.as_view(), name="owner_detail"),  # <--
     path(
         "owner/<int:pk>/prepare/",
@@ -32,16 +51,29 @@ urlpatterns = [
     path("my/<int:pk>/", customer_order_detail, name="customer_order_detail"),
     path(
         "my/<int:pk>/status.json",
-        customer_order_status_json,
+        acustomer_order_status_json if async_reads else customer_order_status_json,
         name="customer_order_status_json",
     ),
+    path("my/<int:pk>/events/", customer_order_events, name="customer_order_events"),
     # Cart + checkout
-    path("cart/", cart_detail, name="cart_detail"),
+    path(
+        "cart/",
+        acart_detail if async_reads else cart_detail,
+        name="cart_detail",
+    ),
     path("cart/add/<int:dish_id>/", cart_add, name="cart_add"),
     path("cart/remove/<int:dish_id>/", cart_remove, name="cart_remove"),
     path("cart/update/<int:dish_id>/", cart_update, name="cart_update"),
+    path("cart/batch/", cart_batch, name="cart_batch"),
     path("checkout/", checkout, name="checkout"),
     path("success/<int:order_id>/", order_success, name="order_success"),
     # Export CSV (staff)
     path("export.csv", export_orders_csv, name="export_orders_csv"),
+    path("export.ndjson", export_orders_ndjson, name="export_orders_ndjson"),
+    path("export/jobs/<int:pk>/", export_job_detail, name="export_job_detail"),
+    path(
+        "export/jobs/<int:pk>/download/",
+        export_job_download,
+        name="export_job_download",
+    ),
 ]
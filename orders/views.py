@@ -1,168 +1,220 @@
-from decimal import Decimal
-import csv
-from django.conf import settings
+import gzip
+import json
+import uuid
+from datetime import timedelta
+from functools import wraps
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.core.mail import send_mail
+from django.db.models import Q
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.http import require_POST
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import condition, require_POST
 from django.views.generic import ListView, DetailView, View
-from django.http import JsonResponse, Http404, HttpResponse
-from django.utils.dateparse import parse_date
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseForbidden,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
+from core.models import TransitionConflict
+from core.ratelimit import ratelimit
 from menu.models import Dish
-from .models import Order, OrderItem
-
-# Session cart key, e.g. {"12": 2, "35": 1}
-CART_SESSION_KEY = "cart"
+from restaurants.models import Restaurant
+from . import eta
+from .cart import apply_cart_operations, get_cart_snapshot, invalidate_cart_snapshot
+from .cart_storage import get_cart_storage
+from .export_jobs import export_storage
+from .exports import (
+    FEED_PAGE_SIZE,
+    MAX_FEED_PAGE_SIZE,
+    ORDER_EXPORT_HEADER,
+    decode_feed_cursor,
+    export_rows,
+    filter_created_between,
+    ndjson_lines,
+    order_export_row,
+    order_feed_page,
+    parse_date_range,
+    parse_updated_since,
+    streaming_csv_response,
+)
+from .models import ExportJob, Order
+from .services import BulkTransitionError, CheckoutError, advance_orders, place_order
+from .tracking import (
+    parse_event_cursor,
+    tracking_event_stream,
+    atracking_payload,
+    atracking_validators,
+    tracking_payload,
+    tracking_validators,
+    tracking_version_query,
+)
 
 
 # -------------------------
 # Cart helpers and views
 # -------------------------
-def _get_cart(session):
-    """Get cart dict from session or initialize it."""
-    return session.setdefault(CART_SESSION_KEY, {})
+def _get_cart(request):
+    """Get cart dict from the configured storage (see CART_STORAGE)."""
+    return get_cart_storage(request).load()
+
+
+def _save_cart(request, cart):
+    """Persist the cart and drop the request's priced snapshot."""
+    get_cart_storage(request).save(cart)
+    invalidate_cart_snapshot(request)
 
 
 def cart_detail(request):
     """Render the current cart with items, quantities, and totals."""
-    cart = _get_cart(request.session)
-    dish_ids = [int(did) for did in cart.keys()]
-    dishes = {d.id: d for d in Dish.objects.filter(id__in=dish_ids)}
-    items = []
-    total = Decimal("0.00")
-
-    for did_str, qty in cart.items():
-        did = int(did_str)
-        dish = dishes.get(did)
-        if not dish:
-            continue
-        line_total = dish.price * qty
-        total += line_total
-        items.append(
-            {
-                "dish": dish,
-                "quantity": qty,
-                "line_total": line_total,
-            }
-        )
+    cart = get_cart_snapshot(request)
+    return render(
+        request,
+        "orders/cart_detail.html",
+        {"cart": cart, "items": cart.lines, "total": cart.total},
+    )
 
-    return render(request, "orders/cart_detail.html", {"items": items, "total": total})
+
+async def acart_detail(request):
+    """
+    Async ``cart_detail``: dishes are priced with the async ORM; the
+    session read and template rendering (context processors query the
+    database) run in the request's sync thread.
+    """
+    cart = await sync_to_async(get_cart_snapshot)(request)
+    await cart.aprice()
+    return await sync_to_async(render)(
+        request,
+        "orders/cart_detail.html",
+        {"cart": cart, "items": cart.lines, "total": cart.total},
+    )
 
 
 @require_POST
+@ratelimit("cart")
 def cart_add(request, dish_id):
     """Add one unit of a dish to the cart (only if available)."""
     dish = get_object_or_404(Dish, id=dish_id, available=True)
-    cart = _get_cart(request.session)
+    cart = _get_cart(request)
     current_qty = int(cart.get(str(dish_id), 0))
     cart[str(dish_id)] = current_qty + 1
-    request.session.modified = True
+    _save_cart(request, cart)
     messages.success(request, f"Added {dish.name} to cart.")
     return redirect("orders:cart_detail")
 
 
 @require_POST
+@ratelimit("cart")
 def cart_remove(request, dish_id):
     """Remove a dish from the cart regardless of quantity."""
-    cart = _get_cart(request.session)
+    cart = _get_cart(request)
     if str(dish_id) in cart:
         del cart[str(dish_id)]
-        request.session.modified = True
+        _save_cart(request, cart)
     messages.info(request, "Item removed from cart.")
     return redirect("orders:cart_detail")
 
 
 @require_POST
+@ratelimit("cart")
 def cart_update(request, dish_id):
     """Set explicit quantity for a dish; if 0 or less, remove the dish."""
     qty = int(request.POST.get("quantity", 1))
-    cart = _get_cart(request.session)
+    cart = _get_cart(request)
     if qty <= 0:
         cart.pop(str(dish_id), None)
     else:
         cart[str(dish_id)] = qty
-    request.session.modified = True
+    _save_cart(request, cart)
     messages.success(request, "Cart updated.")
     return redirect("orders:cart_detail")
 
 
+@require_POST
+@ratelimit("cart")
+def cart_batch(request):
+    """
+    Apply several cart changes at once and return the repriced cart.
+    Body: {"operations": [{"op": "add"|"set"|"remove", "dish_id": 12,
+    "quantity": 2}, ...]}. Either every operation applies or none does.
+    """
+    try:
+        payload = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON."}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({"error": "Invalid payload."}, status=400)
+
+    try:
+        cart = apply_cart_operations(_get_cart(request), payload.get("operations"))
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    _save_cart(request, cart)
+    return JsonResponse(get_cart_snapshot(request).as_json())
+
+
 # -------------------------
 # Checkout and success
 # -------------------------
 @login_required
 def checkout(request):
     """
-    Create an Order with snapshot items.
+    Create an Order with snapshot items (see services.place_order).
     Enforce single-restaurant cart and set order.restaurant accordingly.
     """
-    cart = _get_cart(request.session)
+    cart = get_cart_snapshot(request)
 
     if request.method == "POST":
-        # Collect dishes in cart
-        dish_ids = [int(did) for did in cart.keys()]
-        dishes = list(Dish.objects.filter(id__in=dish_ids))
-        if not dishes:
+        # Retried POSTs carry the same key and get the original order back
+        idempotency_key = request.headers.get("Idempotency-Key") or request.POST.get(
+            "idempotency_key"
+        )
+        if not cart and not idempotency_key:
             messages.warning(request, "Your cart is empty.")
             return redirect("orders:cart_detail")
 
-        # Enforce single-restaurant cart
-        restaurants = {d.restaurant_id for d in dishes}
-        if len(restaurants) != 1:
-            messages.error(request, "Cart must contain items from a single restaurant.")
-            return redirect("orders:cart_detail")
-
-        restaurant_id = restaurants.pop()
-
-        # 1) Create order linked to that restaurant
-        order = Order.objects.create(user=request.user, restaurant_id=restaurant_id)
-
-        # 2) Snapshot items
-        for dish in dishes:
-            qty = int(cart.get(str(dish.id), 0))
-            if qty <= 0:
-                continue
-            OrderItem.objects.create(
-                order=order,
-                dish=dish,
-                dish_name=dish.name,  # snapshot name
-                unit_price=dish.price,  # snapshot price
-                quantity=qty,
+        # Lock, revalidate and write the order in a single transaction
+        try:
+            order = place_order(
+                request.user,
+                _get_cart(request),
+                expected_total=request.POST.get("expected_total"),
+                idempotency_key=idempotency_key,
             )
+        except CheckoutError as exc:
+            messages.error(request, str(exc))
+            return redirect("orders:cart_detail")
 
-        # 3) Clear cart
-        request.session[CART_SESSION_KEY] = {}
-        request.session.modified = True
+        _save_cart(request, {})
 
         messages.success(request, "Order created successfully!")
         return redirect("orders:order_success", order_id=order.id)
 
     # GET → show a checkout confirmation page with current cart data
-    dish_ids = [int(did) for did in cart.keys()]
-    dishes = {d.id: d for d in Dish.objects.filter(id__in=dish_ids)}
-    items = []
-    total = Decimal("0.00")
-
-    for did_str, qty in cart.items():
-        did = int(did_str)
-        dish = dishes.get(did)
-        if not dish:
-            continue
-        line_total = dish.price * qty
-        total += line_total
-        items.append(
-            {
-                "dish": dish,
-                "quantity": qty,
-                "line_total": line_total,
-            }
-        )
-
-    return render(request, "orders/checkout.html", {"items": items, "total": total})
+    return render(
+        request,
+        "orders/checkout.html",
+        {
+            "cart": cart,
+            "items": cart.lines,
+            "total": cart.total,
+            "idempotency_key": uuid.uuid4().hex,
+        },
+    )
 
 
 @login_required
@@ -190,18 +242,156 @@ class OwnerOrderPermissionMixin(UserPassesTestMixin):
         return order.restaurant.owner_id == self.request.user.id
 
 
+# Orders returned by one owner delta request
+OWNER_DELTA_LIMIT = 200
+# updated_at is stamped before the transaction commits, so an order can
+# become visible behind a cursor already handed out; every delta request
+# re-sends the orders changed this many seconds before its cursor
+OWNER_DELTA_OVERLAP = 30
+
+
+def _owner_orders(user):
+    # IN (subquery) keeps each restaurant on its (restaurant, updated_at) index
+    return Order.objects.filter(restaurant__in=Restaurant.objects.filter(owner=user))
+
+
+def _encode_owner_cursor(updated_at, pk):
+    return f"{updated_at.isoformat()}|{pk}"
+
+
+def _parse_owner_cursor(value):
+    """Return (updated_at, pk); raise ValueError if malformed."""
+    stamp, _, pk = value.rpartition("|")
+    updated_at = parse_datetime(stamp)
+    if updated_at is None:
+        raise ValueError("Invalid cursor.")
+    return updated_at, int(pk)
+
+
+def _latest_owner_cursor(user):
+    latest = (
+        _owner_orders(user)
+        .order_by("-updated_at", "-id")
+        .values_list("updated_at", "id")
+        .first()
+    )
+    return (
+        _encode_owner_cursor(*latest)
+        if latest
+        else _encode_owner_cursor(timezone.now(), 0)
+    )
+
+
 class OwnerOrderListView(LoginRequiredMixin, ListView):
     """List orders for all restaurants owned by the current user."""
 
     model = Order
     template_name = "orders/owner_list.html"
     context_object_name = "orders"
+    paginate_by = 50
 
     def get_queryset(self):
-        return Order.objects.filter(restaurant__owner=self.request.user).order_by(
-            "-created_at"
+        return (
+            Order.objects.for_listing()
+            .filter(restaurant__owner=self.request.user)
+            .order_by("-created_at")
         )
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Live mode patches the first page only
+        page = context.get("page_obj")
+        if page is None or page.number == 1:
+            context["live_cursor"] = _latest_owner_cursor(self.request.user)
+        return context
+
+
+@login_required
+def owner_orders_delta(request):
+    """
+    Orders of the owner's restaurants created or updated after the
+    ``?since=`` cursor, oldest change first, each with its rendered list
+    row. Follow ``cursor``; ``more`` means another page is waiting.
+    Without ``since`` only the current cursor is returned.
+
+    Orders changed up to ``OWNER_DELTA_OVERLAP`` seconds before the cursor
+    come first, again: one whose transaction committed after the cursor
+    was handed out, with an earlier ``updated_at``, is not missed. The
+    client skips rows whose ``updated_at`` it already shows.
+    """
+    since = request.GET.get("since")
+    if not since:
+        return JsonResponse(
+            {"orders": [], "cursor": _latest_owner_cursor(request.user), "more": False}
+        )
+    try:
+        updated_at, pk = _parse_owner_cursor(since)
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor."}, status=400)
+
+    owner_orders = _owner_orders(request.user).for_listing()
+    after = Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk)
+    window_start = updated_at - timedelta(seconds=OWNER_DELTA_OVERLAP)
+    overlap = list(
+        owner_orders.filter(updated_at__gte=window_start)
+        .exclude(after)
+        .order_by("updated_at", "id")[:OWNER_DELTA_LIMIT]
+    )
+    orders = list(
+        owner_orders.filter(after).order_by("updated_at", "id")[:OWNER_DELTA_LIMIT]
+    )
+    if orders:
+        since = _encode_owner_cursor(orders[-1].updated_at, orders[-1].id)
+
+    def row(o, new):
+        return {
+            "id": o.id,
+            "status": o.status,
+            "updated_at": o.updated_at.isoformat(),
+            "new": new,
+            # No request: the row needs no context processors
+            "html": render_to_string("orders/owner_order_row.html", {"o": o}),
+        }
+
+    return JsonResponse(
+        {
+            "orders": [row(o, o.created_at > window_start) for o in overlap]
+            + [row(o, o.created_at > updated_at) for o in orders],
+            "cursor": since,
+            "more": len(orders) == OWNER_DELTA_LIMIT,
+        }
+    )
+
+
+@login_required
+@require_POST
+def owner_orders_bulk_prepare(request):
+    """
+    Move the orders selected on the owner list (``order`` ids) to
+    PREPARING in one request; all or none of them are moved.
+    """
+    try:
+        order_ids = [int(pk) for pk in request.POST.getlist("order")]
+    except ValueError:
+        return HttpResponse("Invalid order id.", status=400)
+    try:
+        orders = advance_orders(
+            request.user, order_ids, Order.STATUS_PREPARING, actor=request.user
+        )
+    except TransitionConflict:
+        messages.info(
+            request, "Some of these orders were just updated elsewhere. Try again."
+        )
+    except BulkTransitionError as exc:
+        messages.error(request, str(exc))
+    else:
+        messages.success(
+            request,
+            f"{len(orders)} order{'s' if len(orders) != 1 else ''} moved to "
+            "PREPARING; customers will be notified.",
+        )
+    return redirect("orders:owner_list")
+
 
 class OwnerOrderDetailView(LoginRequiredMixin, OwnerOrderPermissionMixin, DetailView):
     """Detail of a single order for the owner."""
@@ -222,26 +412,17 @@ class OwnerOrderDetailView(LoginRequiredMixin, OwnerOrderPermissionMixin, Detail
             return redirect("orders:owner_detail", pk=self.object.pk)
 
         try:
-            self.object.advance_to(Order.STATUS_PREPARING)
+            self.object.advance_to(Order.STATUS_PREPARING, actor=request.user)
+        except TransitionConflict:
+            messages.info(request, "This order was just updated elsewhere.")
+            return redirect("orders:owner_detail", pk=self.object.pk)
         except ValueError:
             messages.error(request, "Invalid status transition.")
             return redirect("orders:owner_detail", pk=self.object.pk)
 
-        # Notify customer (console backend in development)
-        subject = f"Your order #{self.object.id} is now PREPARING"
-        message = "Good news! Your order is being prepared."
-        from_email = getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@foodhub.local")
-        recipient_list = [self.object.user.email] if self.object.user.email else []
-        if recipient_list:
-            try:
-                send_mail(
-                    subject, message, from_email, recipient_list, fail_silently=True
-                )
-            except Exception:
-                # ignore email failures in dev
-                pass
-
-        messages.success(request, "Order moved to PREPARING and customer notified.")
+        messages.success(
+            request, "Order moved to PREPARING; the customer will be notified."
+        )
         return redirect("orders:owner_detail", pk=self.object.pk)
 
 
@@ -254,36 +435,30 @@ class OwnerOrderPrepareView(LoginRequiredMixin, OwnerOrderPermissionMixin, View)
     def post(self, request, pk):
         order = get_object_or_404(Order, pk=pk)
         try:
-            order.advance_to(Order.STATUS_PREPARING)
+            order.advance_to(Order.STATUS_PREPARING, actor=request.user)
+        except TransitionConflict:
+            messages.info(request, "This order was just updated elsewhere.")
+            return redirect("orders:owner_detail", pk=order.pk)
         except ValueError:
             messages.error(request, "Invalid status transition.")
             return redirect("orders:owner_detail", pk=order.pk)
 
-        # Notify customer by email (printed to console in development)
-        subject = f"Your order #{order.id} is now PREPARING"
-        message = "Good news! Your order is being prepared."
-        from_email = getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@foodhub.local")
-        recipient_list = [order.user.email] if order.user.email else []
-        if recipient_list:
-            try:
-                send_mail(
-                    subject,
-                    message,
-                    from_email,
-                    recipient_list,
-                    fail_silently=True,
-                )
-            except Exception:
-                pass
-
-        messages.success(request, "Order moved to PREPARING and customer notified.")
+        messages.success(
+            request, "Order moved to PREPARING; the customer will be notified."
+        )
         return redirect("orders:owner_detail", pk=order.pk)
 
 
 @login_required
 def my_orders(request):
     """List orders of the current customer."""
-    orders = Order.objects.filter(user=request.user).order_by("-created_at")
+    orders = (
+        Order.objects.for_listing()
+        .with_items()
+        .select_related("delivery__rider")
+        .filter(user=request.user)
+        .order_by("-created_at")
+    )
     return render(request, "orders/my_orders.html", {"orders": orders})
 
 
@@ -295,11 +470,11 @@ def _ensure_order_owner(request, order):
 @login_required
 def customer_order_detail(request, pk):
     order = get_object_or_404(
-        Order.objects.select_related("restaurant").prefetch_related("items"), pk=pk
+        eta.with_stage_entry(Order.objects.for_listing().with_items()), pk=pk
     )
     _ensure_order_owner(request, order)
     delivery = getattr(order, "delivery", None)
-    events = delivery.events.all() if delivery else []
+    events = list(delivery.events.all()) if delivery else []
     return render(
         request,
         "orders/customer_order_detail.html",
@@ -307,82 +482,238 @@ def customer_order_detail(request, pk):
             "order": order,
             "delivery": delivery,
             "events": events,
+            "events_cursor": max((ev.id for ev in events), default=0),
+            "eta": eta.estimate(order, delivery),
         },
     )
 
 
+def _order_status_validators(request, pk):
+    """
+    ``(etag, last_modified)`` for the status JSON, or None for orders the
+    user cannot see (the view then 404s). Memoized on the request, since
+    both ``condition`` callbacks need it.
+    """
+    if not hasattr(request, "_order_status_validators"):
+        row = tracking_version_query(pk, request.user.id).first()
+        request._order_status_validators = tracking_validators(row)
+    return request._order_status_validators
+
+
+def _order_status_etag(request, pk):
+    validators = _order_status_validators(request, pk)
+    return validators[0] if validators else None
+
+
+def _order_status_last_modified(request, pk):
+    validators = _order_status_validators(request, pk)
+    return validators[1] if validators else None
+
+
 @login_required
+@ratelimit("tracking")
+@condition(etag_func=_order_status_etag, last_modified_func=_order_status_last_modified)
 def customer_order_status_json(request, pk):
-    order = get_object_or_404(Order, pk=pk)
+    """
+    Tracking data polled by the order page. Unchanged polls are answered
+    with 304 Not Modified by ``condition`` before anything is loaded.
+    ``?since=<cursor>`` limits the timeline to events after that cursor.
+    """
+    order = get_object_or_404(
+        eta.with_stage_entry(Order.objects.select_related("delivery__rider")), pk=pk
+    )
     _ensure_order_owner(request, order)
-    delivery = getattr(order, "delivery", None)
-    data = {
-        "order_id": order.id,
-        "order_status": order.status,
-        "delivery_status": getattr(delivery, "status", None),
-        "rider": getattr(getattr(delivery, "rider", None), "username", None),
-        "events": [
-            {
-                "at": ev.created_at.isoformat(),
-                "type": ev.event_type,
-                "message": ev.message,
-            }
-            for ev in (delivery.events.all() if delivery else [])
-        ],
-    }
-    return JsonResponse(data)
+    data = tracking_payload(order, since=parse_event_cursor(request.GET.get("since")))
+    response = JsonResponse(data)
+    # Let the browser keep it, but always revalidate
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _alogin_required(view_func):
+    """``login_required`` for async views (Django 4.2's only wraps sync ones)."""
+
+    @wraps(view_func)
+    async def _wrapped(request, *args, **kwargs):
+        # Resolves the lazy user off the event loop; later reads are free
+        if not await sync_to_async(lambda: request.user.is_authenticated)():
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+
+    return _wrapped
+
+
+@_alogin_required
+@ratelimit("tracking")
+async def acustomer_order_status_json(request, pk):
+    """
+    Async ``customer_order_status_json``: the same responses (including the
+    ``condition`` validators and 304s), with queries on the async ORM.
+    Routed instead of it when ``ASYNC_READ_VIEWS`` is on.
+    """
+    validators = await atracking_validators(
+        await tracking_version_query(pk, request.user.id).afirst()
+    )
+    if validators is None:
+        raise Http404()
+    etag, last_modified = validators
+    last_modified = int(last_modified.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        order = await eta.with_stage_entry(
+            Order.objects.select_related("delivery__rider")
+        ).aget(pk=pk)
+        data = await atracking_payload(
+            order, since=parse_event_cursor(request.GET.get("since"))
+        )
+        response = JsonResponse(data)
+        patch_cache_control(response, private=True, no_cache=True)
+    if request.method in ("GET", "HEAD"):
+        response.headers.setdefault("Last-Modified", http_date(last_modified))
+        response.headers.setdefault("ETag", etag)
+    return response
+
+
+async def customer_order_events(request, pk):
+    """
+    Server-sent events for the tracking page (see ``tracking_event_stream``).
+    Only served under ASGI: under WSGI a stream would pin a worker, so the
+    view answers 204, which tells EventSource to stop and the page falls
+    back to polling ``customer_order_status_json``.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    user_id = await sync_to_async(
+        lambda: request.user.id if request.user.is_authenticated else None
+    )()
+    if user_id is None:
+        return HttpResponseForbidden()
+    if not await Order.objects.filter(pk=pk, user_id=user_id).aexists():
+        raise Http404()
+
+    since = parse_event_cursor(
+        request.headers.get("Last-Event-ID") or request.GET.get("since")
+    )
+    response = StreamingHttpResponse(
+        tracking_event_stream(pk, user_id, since),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+    return response
 
 
 @staff_member_required
 def export_orders_csv(request):
-    start = request.GET.get("start")
-    end = request.GET.get("end")
+    """
+    GET streams orders (optionally within ?start=&end= dates) as CSV.
+    POST queues a background ExportJob for the range instead; use it for
+    long ranges that would not finish within a request.
+    """
+    if request.method == "POST":
+        return _queue_export_job(request)
+
+    start_date, end_date = parse_date_range(
+        request.GET.get("start"), request.GET.get("end")
+    )
+    qs = filter_created_between(
+        Order.objects.order_by("created_at", "id"), start_date, end_date
+    )
+
+    rows = (order_export_row(values) for values in export_rows(qs))
+    return streaming_csv_response("orders_export.csv", ORDER_EXPORT_HEADER, rows)
+
+
+@staff_member_required
+def export_orders_ndjson(request):
+    """
+    Machine export: one page of orders with their items as gzip NDJSON.
+
+    ``?updated_since=`` limits the feed to orders changed since then and
+    ``?limit=`` sets the page size. While more pages remain the response
+    carries an ``X-Next-Cursor`` header; pass it back as ``?cursor=``.
+    """
     try:
-        start_date = parse_date(start) if start else None
-        end_date = parse_date(end) if end else None
-    except ValueError:
-        start_date = end_date = None
-
-    qs = Order.objects.select_related("restaurant", "user").order_by("created_at")
-    if start_date:
-        qs = qs.filter(created_at__date__gte=start_date)
-    if end_date:
-        qs = qs.filter(created_at__date__lte=end_date)
-
-    # CSV response
-    filename = "orders_export.csv"
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-
-    writer = csv.writer(response)
-    writer.writerow(
-        [
-            "id",
-            "created_at",
-            "user",
-            "restaurant",
-            "status",
-            "total_items",
-            "total_amount",
-        ]
+        limit = min(
+            max(int(request.GET.get("limit", FEED_PAGE_SIZE)), 1), MAX_FEED_PAGE_SIZE
+        )
+        cursor = request.GET.get("cursor")
+        if cursor:
+            created_at, pk, updated_since = decode_feed_cursor(cursor)
+            after = (created_at, pk)
+        else:
+            after = None
+            updated_since = parse_updated_since(request.GET.get("updated_since"))
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    orders, next_cursor = order_feed_page(after, updated_since, limit)
+    body = "".join(ndjson_lines(orders)).encode()
+    response = HttpResponse(gzip.compress(body), content_type="application/x-ndjson")
+    response["Content-Encoding"] = "gzip"
+    response["X-Record-Count"] = str(len(orders))
+    if next_cursor:
+        response["X-Next-Cursor"] = next_cursor
+    return response
+
+
+def _queue_export_job(request):
+    start_date, end_date = parse_date_range(
+        request.POST.get("start"), request.POST.get("end")
+    )
+    if not start_date or not end_date or start_date > end_date:
+        return JsonResponse(
+            {"error": "A valid start and end date are required."}, status=400
+        )
+    partition = request.POST.get("partition", ExportJob.PARTITION_WEEK)
+    if partition not in dict(ExportJob.PARTITION_CHOICES):
+        return JsonResponse({"error": "Unknown partition."}, status=400)
+
+    job = ExportJob.objects.create(
+        requested_by=request.user,
+        start_date=start_date,
+        end_date=end_date,
+        partition=partition,
     )
+    return redirect("orders:export_job_detail", pk=job.pk)
 
-    for o in qs:
-        total_items = sum(i.quantity for i in o.items.all())
-        total_amount = sum(i.unit_price * i.quantity for i in o.items.all())
-        writer.writerow(
-            [
-                o.id,
-                timezone.localtime(o.created_at).isoformat(),
-                getattr(o.user, "username", ""),
-                getattr(o.restaurant, "name", ""),
-                o.status,
-                total_items,
-                f"{total_amount:.2f}",
-            ]
+
+@staff_member_required
+def export_job_detail(request, pk):
+    """Job progress page; ``?format=json`` returns the same data for polling."""
+    job = get_object_or_404(ExportJob, pk=pk)
+    if request.GET.get("format") == "json":
+        return JsonResponse(
+            {
+                "id": job.id,
+                "status": job.status,
+                "progress": job.progress,
+                "partitions_done": job.partitions_done,
+                "partitions_total": job.partitions_total,
+                "error": job.error,
+                "download_url": (
+                    reverse("orders:export_job_download", args=[job.id])
+                    if job.status == ExportJob.STATUS_DONE
+                    else None
+                ),
+            }
         )
+    return render(request, "orders/export_job.html", {"job": job})
 
-    return response
+
+@staff_member_required
+def export_job_download(request, pk):
+    job = get_object_or_404(ExportJob, pk=pk, status=ExportJob.STATUS_DONE)
+    try:
+        fh = export_storage().open(job.file_path, "rb")
+    except OSError:
+        raise Http404("Export file is no longer available.")
+    return FileResponse(
+        fh,
+        as_attachment=True,
+        filename=job.download_name,
+        content_type="application/gzip",
+    )
 
 
 def owner_orders(request):
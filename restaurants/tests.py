@@ -1,7 +1,13 @@
+import re
+from decimal import Decimal
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
-from django.urls import reverse
+from django.test import TestCase, override_settings
+from django.urls import include, path, reverse
 
+from foodhub.urls import urlpatterns as project_urlpatterns
+from menu.models import Dish
+from restaurants import urls as restaurants_urls, views
 from restaurants.models import Restaurant
 
 User = get_user_model()
@@ -43,3 +49,86 @@ class OwnerOnlyViewsTests(TestCase):
         self.assertTrue(
             Restaurant.objects.filter(name="New Spot", owner=self.owner).exists()
         )
+
+
+# Project URLs with the async public views in front (as routed by
+# ASYNC_READ_VIEWS)
+urlpatterns = [
+    path(
+        "restaurants/",
+        include(
+            (
+                [
+                    path(
+                        "",
+                        views.AsyncRestaurantListView.as_view(),
+                        name="public_list",
+                    ),
+                    path(
+                        "<int:pk>/",
+                        views.AsyncRestaurantDetailView.as_view(),
+                        name="public_detail",
+                    ),
+                ]
+                + restaurants_urls.urlpatterns,
+                "restaurants",
+            )
+        ),
+    )
+] + [p for p in project_urlpatterns if str(p.pattern) != "restaurants/"]
+
+CSRF_TOKEN = re.compile(rb'name="csrfmiddlewaretoken" value="[^"]+"')
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncPublicViewsTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(username="owner", password="pass1234")
+        for i in range(14):
+            Restaurant.objects.create(
+                owner=owner,
+                name=f"Place {i:02}",
+                address="A",
+                opening_hours="09:00-18:00",
+                is_active=i != 3,
+            )
+        self.restaurant = Restaurant.objects.get(name="Place 00")
+        Dish.objects.create(
+            restaurant=self.restaurant, name="Soup", price=Decimal("4.00")
+        )
+        Dish.objects.create(
+            restaurant=self.restaurant,
+            name="Hidden",
+            price=Decimal("4.00"),
+            available=False,
+        )
+
+    def _assert_same(self, url):
+        with override_settings(ROOT_URLCONF="foodhub.urls"):
+            expected = self.client.get(url)
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, expected.status_code)
+        self.assertEqual(
+            CSRF_TOKEN.sub(b"", resp.content), CSRF_TOKEN.sub(b"", expected.content)
+        )
+        return resp
+
+    def test_list_pages_match_sync_view(self):
+        url = reverse("restaurants:public_list")
+        self.assertContains(self._assert_same(url), "Page 1 of 2")
+        self._assert_same(url + "?page=2")
+        self._assert_same(url + "?page=last")
+        self.assertEqual(self._assert_same(url + "?page=9").status_code, 404)
+        self.assertEqual(self._assert_same(url + "?page=x").status_code, 404)
+
+    def test_detail_matches_sync_view(self):
+        resp = self._assert_same(
+            reverse("restaurants:public_detail", args=[self.restaurant.pk])
+        )
+        self.assertContains(resp, "Soup")
+        self.assertNotContains(resp, "Hidden")
+        inactive = Restaurant.objects.get(name="Place 03")
+        resp = self._assert_same(
+            reverse("restaurants:public_detail", args=[inactive.pk])
+        )
+        self.assertEqual(resp.status_code, 404)
@@ -1,8 +1,17 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = "restaurants"
 
+# Async implementations of the public pages, for foodhub.asgi deployments
+if getattr(settings, "ASYNC_READ_VIEWS", False):
+    public_list = views.AsyncRestaurantListView.as_view()
+    public_detail = views.AsyncRestaurantDetailView.as_view()
+else:
+    public_list = views.RestaurantListView.as_view()
+    public_detail = views.RestaurantDetailView.as_view()
+
 urlpatterns = [
     # --- Owner dashboard ---
     path("my/", views.OwnerRestaurantListView.as_view(), name="owner_list"),
@@ -16,6 +25,6 @@ urlpatterns = [
         name="owner_delete",
     ),
     # --- Public ---
-    path("", views.RestaurantListView.as_view(), name="public_list"),
-    path("<int:pk>/", views.RestaurantDetailView.as_view(), name="public_detail"),
+    path("", public_list, name="public_list"),
+    path("<int:pk>/", public_detail, name="public_detail"),
 ]
@@ -1,13 +1,18 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404
 from django.urls import reverse_lazy
+from django.utils.translation import gettext as _
 from django.views.generic import (
     ListView,
     CreateView,
     DeleteView,
     DetailView,
     UpdateView,
+    View,
 )
-from django.shortcuts import get_object_or_404
+from django.shortcuts import get_object_or_404, render
 
 
 from .forms import RestaurantForm
@@ -84,6 +89,17 @@ class RestaurantDeleteView(OwnerMixin, DeleteView):
         return Restaurant.objects.filter(owner=self.request.user)
 
 
+def _public_restaurants():
+    return Restaurant.objects.filter(is_active=True).order_by("name")
+
+
+def _menu_dishes(restaurant):
+    # Only available dishes, sorted by category -> name
+    return Dish.objects.filter(restaurant=restaurant, available=True).order_by(
+        "category", "name"
+    )
+
+
 class RestaurantListView(ListView):
     model = Restaurant
     template_name = "restaurants/public_list.html"
@@ -91,7 +107,7 @@ class RestaurantListView(ListView):
     paginate_by = 12
 
     def get_queryset(self):
-        return Restaurant.objects.filter(is_active=True).order_by("name")
+        return _public_restaurants()
 
 
 class RestaurantDetailView(DetailView):
@@ -105,9 +121,69 @@ class RestaurantDetailView(DetailView):
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        # Only available dishes, sorted by category -> name
-        dishes = Dish.objects.filter(restaurant=self.object, available=True).order_by(
-            "category", "name"
-        )
-        ctx["dishes"] = dishes
+        ctx["dishes"] = _menu_dishes(self.object)
         return ctx
+
+
+# Async versions of the public pages (ASYNC_READ_VIEWS, under foodhub.asgi).
+# Queries run on the async ORM and are fully loaded before rendering; the
+# template (whose context processors query the database) is rendered in
+# the request's sync thread. Templates and context match the sync views.
+
+
+class AsyncRestaurantListView(View):
+    template_name = RestaurantListView.template_name
+    paginate_by = RestaurantListView.paginate_by
+
+    async def get(self, request, *args, **kwargs):
+        queryset = _public_restaurants()
+        paginator = Paginator(queryset, self.paginate_by)
+        # Counted here so the paginator never queries synchronously
+        paginator.count = await queryset.acount()
+        page = self._get_page(paginator)
+        page.object_list = [restaurant async for restaurant in page.object_list]
+        context = {
+            "paginator": paginator,
+            "page_obj": page,
+            "is_paginated": page.has_other_pages(),
+            "object_list": page.object_list,
+            "restaurants": page.object_list,
+            "view": self,
+        }
+        return await sync_to_async(render)(request, self.template_name, context)
+
+    def _get_page(self, paginator):
+        """Same page lookup and 404s as ``ListView.paginate_queryset``."""
+        page = self.kwargs.get("page") or self.request.GET.get("page") or 1
+        try:
+            page_number = int(page)
+        except ValueError:
+            if page != "last":
+                raise Http404(
+                    _("Page is not “last”, nor can it be converted to an int.")
+                )
+            page_number = paginator.num_pages
+        try:
+            return paginator.page(page_number)
+        except InvalidPage as e:
+            raise Http404(
+                _("Invalid page (%(page_number)s): %(message)s")
+                % {"page_number": page_number, "message": str(e)}
+            )
+
+
+class AsyncRestaurantDetailView(View):
+    template_name = RestaurantDetailView.template_name
+
+    async def get(self, request, pk):
+        try:
+            restaurant = await Restaurant.objects.aget(pk=pk, is_active=True)
+        except Restaurant.DoesNotExist:
+            raise Http404("No Restaurant matches the given query.")
+        context = {
+            "object": restaurant,
+            "restaurant": restaurant,
+            "dishes": [dish async for dish in _menu_dishes(restaurant)],
+            "view": self,
+        }
+        return await sync_to_async(render)(request, self.template_name, context)